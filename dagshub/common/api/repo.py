@@ -13,7 +13,7 @@ from dagshub.common.api.responses import (
     StorageContentAPIResult,
 )
 from dagshub.data_engine.model.errors import LSInitializingError
-from dagshub.common.download import download_files
+from dagshub.common.download import download_files, ExpectedFile
 from dagshub.common.rich_util import get_rich_progress
 from dagshub.common.util import multi_urljoin
 from functools import partial
@@ -414,8 +414,8 @@ class RepoAPI:
                 | if ``True``: will download to ``<local_path>/src/data/test/file.txt``
                 | if ``False``: will download to ``<local_path>/test/file.txt``
             redownload: Whether to redownload files that already exist on the local filesystem.
-                The downloader doesn't do any hash comparisons and only checks
-                if a file already exists in the local filesystem or not.
+                Without it, only the files that are missing, or differ in size or hash from the files in the repo,
+                are downloaded.
             download_storages: If downloading the whole repo, by default we're not downloading the integrated storages
                 Toggle this to ``True`` to change this behavior
         """
@@ -453,7 +453,7 @@ class RepoAPI:
                     file_path = local_path
             else:
                 file_path = remote_path if keep_source_prefix else remote_path.name
-            file_tuples.append((f.download_url, file_path))
+            file_tuples.append((f.download_url, file_path, ExpectedFile.from_content_entry(f)))
         else:
             for f in files:
                 file_path_in_remote = PurePosixPath(f.path)
@@ -463,7 +463,7 @@ class RepoAPI:
                 else:
                     file_path = file_path_in_remote
                 file_path = local_path / file_path
-                file_tuples.append((f.download_url, file_path))
+                file_tuples.append((f.download_url, file_path, ExpectedFile.from_content_entry(f)))
         download_files(file_tuples, skip_if_exists=not redownload)
         log_message(f"Downloaded {len(files)} file(s) to {local_path.resolve()}")
 
@@ -57,6 +57,28 @@ recommended_annotate_limit = int(os.environ.get(RECOMMENDED_ANNOTATE_LIMIT_KEY,
 DATAENGINE_METADATA_UPLOAD_BATCH_SIZE_KEY = "DAGSHUB_DE_METADATA_UPLOAD_BATCH_SIZE"
 dataengine_metadata_upload_batch_size = int(os.environ.get(DATAENGINE_METADATA_UPLOAD_BATCH_SIZE_KEY, 15000))
 
+# Number of buffered metadata entries after which the buffer starts storing them in a temporary file. 0 to disable
+DATAENGINE_METADATA_BUFFER_SPILL_THRESHOLD_KEY = "DAGSHUB_DE_METADATA_BUFFER_SPILL_THRESHOLD"
+dataengine_metadata_buffer_spill_threshold = int(
+    os.environ.get(DATAENGINE_METADATA_BUFFER_SPILL_THRESHOLD_KEY, 1_000_000)
+)
+
+# Machine-wide cache of the downloaded metadata blobs (annotations, documents etc.)
+DATAENGINE_BLOB_CACHE_LOCATION_KEY = "DAGSHUB_DE_BLOB_CACHE_LOCATION"
+DEFAULT_DATAENGINE_BLOB_CACHE_LOCATION = os.path.join(appdirs.user_cache_dir("dagshub"), "blobs")
+dataengine_blob_cache_location = os.environ.get(
+    DATAENGINE_BLOB_CACHE_LOCATION_KEY, DEFAULT_DATAENGINE_BLOB_CACHE_LOCATION
+)
+# Size budget of the blob cache in bytes, after which the least recently used blobs get deleted. 0 for no limit
+DATAENGINE_BLOB_CACHE_MAX_SIZE_KEY = "DAGSHUB_DE_BLOB_CACHE_MAX_SIZE"
+dataengine_blob_cache_max_size = int(os.environ.get(DATAENGINE_BLOB_CACHE_MAX_SIZE_KEY, 10 * 1024**3))
+
+# Number of processes that parse annotations of big query results. 1 (default) to parse them in the current process.
+# The worker processes are spawned, so they import the __main__ module of the program again:
+# scripts need to be guarded with `if __name__ == "__main__":` to use more than 1
+DATAENGINE_ANNOTATION_PARSE_PROCESSES_KEY = "DAGSHUB_DE_ANNOTATION_PARSE_PROCESSES"
+dataengine_annotation_parse_processes = int(os.environ.get(DATAENGINE_ANNOTATION_PARSE_PROCESSES_KEY, 1))
+
 DISABLE_ANALYTICS_KEY = "DAGSHUB_DISABLE_ANALYTICS"
 disable_analytics = "DAGSHUB_DISABLE_ANALYTICS" in os.environ
 
@@ -64,6 +86,24 @@ DOWNLOAD_THREADS_KEY = "DAGSHUB_DOWNLOAD_THREADS"
 DEFAULT_DOWNLOAD_THREADS = 32
 download_threads = int(os.environ.get(DOWNLOAD_THREADS_KEY, DEFAULT_DOWNLOAD_THREADS))
 
+# Record of the downloaded files, used to skip files that are already downloaded and unchanged. Empty to disable
+DOWNLOAD_MANIFEST_LOCATION_KEY = "DAGSHUB_DOWNLOAD_MANIFEST_LOCATION"
+DEFAULT_DOWNLOAD_MANIFEST_LOCATION = os.path.join(appdirs.user_cache_dir("dagshub"), "download_manifest.sqlite")
+download_manifest_location = os.environ.get(DOWNLOAD_MANIFEST_LOCATION_KEY, DEFAULT_DOWNLOAD_MANIFEST_LOCATION)
+
+# Cap of the total download rate in bytes per second. 0 for no cap
+DOWNLOAD_MAX_BYTES_PER_SECOND_KEY = "DAGSHUB_DOWNLOAD_MAX_BYTES_PER_SECOND"
+download_max_bytes_per_second = int(os.environ.get(DOWNLOAD_MAX_BYTES_PER_SECOND_KEY, 0))
+
+# Files of at least this size in bytes are downloaded in parts over multiple connections. 0 to disable
+DOWNLOAD_MULTIPART_THRESHOLD_KEY = "DAGSHUB_DOWNLOAD_MULTIPART_THRESHOLD"
+download_multipart_threshold = int(os.environ.get(DOWNLOAD_MULTIPART_THRESHOLD_KEY, 64 * 1024**2))
+DOWNLOAD_PART_SIZE_KEY = "DAGSHUB_DOWNLOAD_PART_SIZE"
+download_part_size = int(os.environ.get(DOWNLOAD_PART_SIZE_KEY, 16 * 1024**2))
+# Number of parts of a single file that are downloaded at the same time
+DOWNLOAD_PART_THREADS_KEY = "DAGSHUB_DOWNLOAD_PART_THREADS"
+download_part_threads = int(os.environ.get(DOWNLOAD_PART_THREADS_KEY, 8))
+
 UPLOAD_THREADS_KEY = "DAGSHUB_UPLOAD_THREADS"
 DEFAULT_UPLOAD_THREADS = 8
 upload_threads = int(os.environ.get(UPLOAD_THREADS_KEY, DEFAULT_UPLOAD_THREADS))
@@ -71,5 +111,6 @@ upload_threads = int(os.environ.get(UPLOAD_THREADS_KEY, DEFAULT_UPLOAD_THREADS))
 if download_threads > DEFAULT_DOWNLOAD_THREADS:
     logger.warning(
         f"Number of download threads was set to {download_threads}. "
-        f"We recommend lowering the value if you get met with rate limits"
+        f"Downloads slow down when the server rate limits them, but we recommend lowering the value "
+        f"if you get met with rate limits"
     )
@@ -1,13 +1,24 @@
+import hashlib
+import io
 import logging
 import os.path
 import signal
+import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from functools import partial
 from pathlib import Path
-from typing import Tuple, Callable, Optional, List, Union, Dict
-
-from httpx import Auth, Response
-from tenacity import stop_after_attempt, wait_exponential, before_sleep_log, retry, retry_if_exception
+from typing import Tuple, Callable, Optional, List, Union, Dict, TYPE_CHECKING, BinaryIO
+
+from httpx import Auth, Response, TransportError
+from tenacity import (
+    stop_after_attempt,
+    wait_exponential,
+    before_sleep_log,
+    retry,
+    retry_if_exception,
+    RetryCallState,
+)
 
 from dagshub.common import config
 
@@ -17,13 +28,20 @@ import re
 import rich.progress
 
 from dagshub.auth import get_authenticator
-from dagshub.common.helpers import http_request
+from dagshub.common.download_manifest import get_download_manifest, DownloadManifest, ManifestEntry
+from dagshub.common.download_scheduler import get_download_scheduler, DownloadRequest, THROTTLE_STATUS_CODES
+from dagshub.common.helpers import http_stream
 from dagshub.common.rich_util import get_rich_progress
 
+if TYPE_CHECKING:
+    from dagshub.common.api.responses import ContentAPIEntry
+
 logger = logging.getLogger(__name__)
 
 DownloadFunctionType = Callable[[str, Path], None]
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 storage_download_url_regex = re.compile(
     r".*/api/v1/repos/(?P<user>[\w\-_.]+)/(?P<repo>[\w\-_.]+)/storage/raw/(?P<proto>s3|gs|azure)/"
     r"(?P<bucket>[a-z0-9.-]+)/(?P<path>.*)"
@@ -48,12 +66,15 @@ def enable_gcs_bucket_downloader(client=None):
 
         client = storage.Client()
 
-    def get_fn(bucket_name, bucket_path) -> bytes:
+    def get_fn(bucket_name, bucket_path, f: BinaryIO):
         bucket = client.bucket(bucket_name)
-        blob = bucket.blob(bucket_path).download_as_bytes()
-        return blob
+        bucket.blob(bucket_path).download_to_file(f)
 
-    add_bucket_downloader("gs", get_fn)
+    def get_range_fn(bucket_name, bucket_path, f: BinaryIO, start: int, end: int):
+        bucket = client.bucket(bucket_name)
+        bucket.blob(bucket_path).download_to_file(f, start=start, end=end)
+
+    add_bucket_stream_downloader("gs", get_fn, get_range_fn)
 
 
 def enable_s3_bucket_downloader(client=None):
@@ -74,11 +95,17 @@ def enable_s3_bucket_downloader(client=None):
 
         client = boto3.client("s3")
 
-    def get_fn(bucket, path) -> bytes:
+    def get_fn(bucket, path, f: BinaryIO):
         resp = client.get_object(Bucket=bucket, Key=path)
-        return resp["Body"].read()
+        for chunk in resp["Body"].iter_chunks(DOWNLOAD_CHUNK_SIZE):
+            f.write(chunk)
+
+    def get_range_fn(bucket, path, f: BinaryIO, start: int, end: int):
+        resp = client.get_object(Bucket=bucket, Key=path, Range=f"bytes={start}-{end}")
+        for chunk in resp["Body"].iter_chunks(DOWNLOAD_CHUNK_SIZE):
+            f.write(chunk)
 
-    add_bucket_downloader("s3", get_fn)
+    add_bucket_stream_downloader("s3", get_fn, get_range_fn)
 
 
 def enable_azure_container_downloader(account_url=None, client=None):
@@ -99,21 +126,21 @@ def enable_azure_container_downloader(account_url=None, client=None):
     if account_url is None and client is None:
         raise TypeError("missing required argument 'account_url' or 'client'")
 
-    import io
-
     if client is None:
         from azure.storage.blob import BlobServiceClient
         from azure.identity import DefaultAzureCredential
 
         client = BlobServiceClient(account_url, credential=DefaultAzureCredential())
 
-    def get_fn(bucket, path) -> bytes:
+    def get_fn(bucket, path, f: BinaryIO):
+        blob_client = client.get_blob_client(container=bucket, blob=path)
+        blob_client.download_blob().readinto(f)
+
+    def get_range_fn(bucket, path, f: BinaryIO, start: int, end: int):
         blob_client = client.get_blob_client(container=bucket, blob=path)
-        stream = io.BytesIO()
-        blob_client.download_blob().readinto(stream)
-        return stream
+        blob_client.download_blob(offset=start, length=end - start + 1).readinto(f)
 
-    add_bucket_downloader("azure", get_fn)
+    add_bucket_stream_downloader("azure", get_fn, get_range_fn)
 
 
 def download_url_to_bucket_path(url: str) -> Optional[Tuple[str, str, str]]:
@@ -133,29 +160,257 @@ class DownloadError(Exception):
         super().__init__(f"Download failed with status code {response.status_code}")
 
 
+class DownloadIntegrityError(Exception):
+    def __init__(self, path: Path, reason: str):
+        self.path = path
+        self.reason = reason
+        super().__init__(f"Downloaded file {path} is corrupted: {reason}")
+
+
+class RangeNotSupportedError(Exception):
+    """
+    The server returned the whole file for a request of a range of the file
+
+    :meta private:
+    """
+
+
 def is_download_server_error(error: BaseException) -> bool:
     if not isinstance(error, DownloadError):
         return False
-    return error.response.status_code >= 500
+    # 429 - rate limited, the scheduler slows down the downloads before they get retried
+    return error.response.status_code >= 500 or error.response.status_code == 429
+
+
+def is_resumable_download_error(error: BaseException) -> bool:
+    # Connection errors are worth retrying too, because the download continues where it stopped
+    return is_download_server_error(error) or isinstance(error, TransportError)
+
+
+_server_error_wait = wait_exponential(multiplier=1, min=4, max=10)
+
+
+def _download_retry_wait(retry_state: RetryCallState) -> float:
+    error = retry_state.outcome.exception() if retry_state.outcome is not None else None
+    if (
+        isinstance(error, DownloadError)
+        and error.response.status_code in THROTTLE_STATUS_CODES
+        and "retry-after" in error.response.headers
+    ):
+        # The download scheduler has already lowered the concurrency and paused the requests for the Retry-After time
+        return 0
+    return _server_error_wait(retry_state)
+
+
+_hash_lengths = {"md5": 32, "git": 40}
+
+
+@dataclass
+class ExpectedFile:
+    """
+    What a downloaded file is expected to be.
+    Used to verify the downloaded files, and to find local files that differ from the remote ones.
+
+    :meta private:
+    """
+
+    size: Optional[int] = None
+    hash: Optional[str] = None
+    """Hash of the file, of the type in ``hash_type``"""
+    hash_type: Optional[Literal["md5", "git"]] = None
+    """``"md5"`` for the MD5 of the contents (DVC files), ``"git"`` for the git blob SHA1"""
+
+    @staticmethod
+    def from_content_entry(entry: "ContentAPIEntry") -> "ExpectedFile":
+        hash_type = {"dvc": "md5", "git": "git"}.get(entry.versioning)
+        if hash_type is not None and not _is_hex_hash(entry.hash, _hash_lengths[hash_type]):
+            hash_type = None
+        return ExpectedFile(size=entry.size, hash=entry.hash if hash_type else None, hash_type=hash_type)
+
+    def verify(self, path: Path):
+        """
+        Raises:
+            DownloadIntegrityError: The file at ``path`` differs from the expected file
+        """
+        size = os.path.getsize(path)
+        if self.size is not None and size != self.size:
+            raise DownloadIntegrityError(path, f"expected size {self.size}, got {size}")
+        if self.hash_type is not None:
+            actual = file_hash(path, self.hash_type)
+            if actual != self.hash:
+                raise DownloadIntegrityError(path, f"expected {self.hash_type} hash {self.hash}, got {actual}")
+
+    def matches(self, path: Path) -> bool:
+        try:
+            self.verify(path)
+            return True
+        except DownloadIntegrityError:
+            return False
+
+
+def _is_hex_hash(val: Optional[str], length: int) -> bool:
+    if val is None or len(val) != length:
+        return False
+    try:
+        int(val, 16)
+        return True
+    except ValueError:
+        return False
+
+
+def file_hash(path: Path, hash_type: Literal["md5", "git"]) -> str:
+    """
+    Hashes the file the same way the remote does: the MD5 of the contents for DVC, or the git blob SHA1.
+
+    :meta private:
+    """
+    if hash_type == "md5":
+        hasher = hashlib.md5()
+    else:
+        hasher = hashlib.sha1()
+        hasher.update(f"blob {os.path.getsize(path)}\0".encode())
+    with open(path, "rb") as f:
+        while chunk := f.read(DOWNLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
 
 
 @retry(
     retry=retry_if_exception(is_download_server_error),
     stop=stop_after_attempt(5),
-    wait=wait_exponential(multiplier=1, min=4, max=10),
+    wait=_download_retry_wait,
     before_sleep=before_sleep_log(logger, logging.WARNING),
 )
+def _dagshub_download_stream(url: str, auth: Auth, f: BinaryIO):
+    """
+    Downloads the file from DagsHub, writing it into ``f`` chunk by chunk
+    """
+    with get_download_scheduler().request() as req, http_stream("GET", url, auth=auth, timeout=600) as resp:
+        req.response(resp)
+        if resp.status_code != 200:
+            resp.read()
+            raise DownloadError(resp)
+        # Start over if it's a retry
+        f.seek(0)
+        f.truncate()
+        for chunk in resp.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+            f.write(chunk)
+            req.received(len(chunk))
+
+
 def _dagshub_download(url: str, auth: Auth) -> bytes:
-    resp = http_request("GET", url, auth=auth, timeout=600)
-    if resp.status_code == 200:
-        return resp.content
-    raise DownloadError(resp)
+    """
+    Downloads the file from DagsHub into memory.
+    Kept for compatibility, prefer :func:`_dagshub_download_stream` that doesn't keep the whole file in memory.
+    """
+    buf = io.BytesIO()
+    _dagshub_download_stream(url, auth, buf)
+    return buf.getvalue()
+
+
+@retry(
+    retry=retry_if_exception(is_resumable_download_error),
+    stop=stop_after_attempt(5),
+    wait=_download_retry_wait,
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+)
+def _dagshub_download_resumable(
+    url: str, part_path: Path, auth: Auth, if_none_match: Optional[str] = None
+) -> Tuple[Optional[str], bool]:
+    """
+    Downloads the file into ``part_path``.
+    If ``part_path`` has a part of the file already, only the rest of the file is requested.
+
+    Args:
+        url: URL to download
+        part_path: Where to download the file
+        auth: Authentication for the request
+        if_none_match: ETag of the local copy of the file. The file isn't downloaded if it's unchanged on the server.
+
+    Returns:
+        ETag of the file (if the server returned one) and whether the file was unchanged on the server
+    """
+    start = part_path.stat().st_size if part_path.exists() else 0
+    headers = {}
+    if start:
+        headers["Range"] = f"bytes={start}-"
+    if if_none_match is not None:
+        headers["If-None-Match"] = if_none_match
+    with get_download_scheduler().request() as req, http_stream(
+        "GET", url, auth=auth, timeout=600, headers=headers
+    ) as resp:
+        req.response(resp)
+        etag = resp.headers.get("etag")
+        if resp.status_code == 304:
+            return etag, True
+        if resp.status_code == 416 and start:
+            # The part is the whole file already
+            return etag, False
+        if resp.status_code == 206 and resp.headers.get("content-range", "").startswith(f"bytes {start}-"):
+            mode = "ab"
+        elif resp.status_code == 200:
+            mode = "wb"
+        else:
+            resp.read()
+            raise DownloadError(resp)
+        with open(part_path, mode) as f:
+            for chunk in resp.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                req.received(len(chunk))
+        return etag, False
+
+
+@retry(
+    retry=retry_if_exception(is_resumable_download_error),
+    stop=stop_after_attempt(5),
+    wait=_download_retry_wait,
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+)
+def _dagshub_download_range(
+    url: str, auth: Auth, f: BinaryIO, start: int, end: int, if_none_match: Optional[str] = None
+) -> Tuple[Optional[str], bool]:
+    """
+    Downloads the bytes ``start``-``end`` (inclusive) of the file, writing them into ``f`` at the offset ``start``
+
+    Returns:
+        ETag of the file and whether the file was unchanged on the server
+
+    Raises:
+        RangeNotSupportedError: The server doesn't support range requests for this file
+    """
+    headers = {"Range": f"bytes={start}-{end}"}
+    if if_none_match is not None:
+        headers["If-None-Match"] = if_none_match
+    with get_download_scheduler().request() as req, http_stream(
+        "GET", url, auth=auth, timeout=600, headers=headers
+    ) as resp:
+        req.response(resp)
+        etag = resp.headers.get("etag")
+        if resp.status_code == 304:
+            return etag, True
+        if resp.status_code == 200:
+            raise RangeNotSupportedError(url)
+        if resp.status_code != 206 or not resp.headers.get("content-range", "").startswith(f"bytes {start}-{end}/"):
+            resp.read()
+            raise DownloadError(resp)
+        # Start over if it's a retry
+        f.seek(start)
+        for chunk in resp.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+            f.write(chunk)
+            req.received(len(chunk))
+        return etag, False
 
 
 BucketDownloaderFuncType = Callable[[str, str], bytes]
+BucketStreamDownloaderFuncType = Callable[[str, str, BinaryIO], None]
+BucketRangeDownloaderFuncType = Callable[[str, str, BinaryIO, int, int], None]
+# Downloads a range of the file into the file object: (f, start, end, if_none_match) -> (etag, unchanged)
+RangeDownloaderFuncType = Callable[[BinaryIO, int, int, Optional[str]], Tuple[Optional[str], bool]]
 
-_bucket_downloader_map: Dict[str, BucketDownloaderFuncType] = {}
+_bucket_downloader_map: Dict[str, BucketStreamDownloaderFuncType] = {}
+_bucket_range_downloader_map: Dict[str, BucketRangeDownloaderFuncType] = {}
 _default_downloader: Optional[Callable[[str], bytes]] = None
+_default_auth: Optional[Auth] = None
 
 
 def add_bucket_downloader(proto: Literal["gs", "s3", "azure"], func: BucketDownloaderFuncType):
@@ -168,51 +423,309 @@ def add_bucket_downloader(proto: Literal["gs", "s3", "azure"], func: BucketDownl
         func: Function that receives the name of the bucket and the path to the object and returns the object content\
             in ``bytes``.
 
+    .. warning::
+        The ``func`` function will be used in a ThreadPool, so it needs to be picklable.
+    """
+
+    def stream_fn(bucket: str, path: str, f: BinaryIO):
+        f.write(func(bucket, path))
+
+    add_bucket_stream_downloader(proto, stream_fn)
+
+
+def add_bucket_stream_downloader(
+    proto: Literal["gs", "s3", "azure"],
+    func: BucketStreamDownloaderFuncType,
+    range_func: Optional[BucketRangeDownloaderFuncType] = None,
+):
+    """
+    Add your own custom connected bucket downloader, that writes the object into a file as it's being downloaded.
+
+    Unlike :func:`add_bucket_downloader`, the object doesn't need to fit in memory,
+    which matters for big files downloaded in multiple threads.
+
+    Args:
+        proto: Protocol for which you're adding the downloader.\
+            This function will handle **all** download requests to this protocol.
+        func: Function that receives the name of the bucket, the path to the object\
+            and a binary file object opened for writing, and writes the object content into the file.
+        range_func: Optional function that downloads a byte range of the object. Receives the same arguments\
+            as ``func``, and the first and the last (inclusive) byte of the range to write into the file.\
+            If specified, big objects of known size are downloaded in parts in parallel,\
+            see the ``DAGSHUB_DOWNLOAD_MULTIPART_THRESHOLD`` environment variable.
+
+    Example::
+
+        def download_from_s3(bucket, path, f):
+            resp = s3_client.get_object(Bucket=bucket, Key=path)
+            for chunk in resp["Body"].iter_chunks():
+                f.write(chunk)
+
+        add_bucket_stream_downloader("s3", download_from_s3)
+
     .. warning::
         The ``func`` function will be used in a ThreadPool, so it needs to be picklable.
     """
     if proto in _bucket_downloader_map:
         logger.warning(f"Protocol {proto} already has a custom downloader function specified, overwriting it")
     _bucket_downloader_map[proto] = func
+    if range_func is not None:
+        _bucket_range_downloader_map[proto] = range_func
+    else:
+        _bucket_range_downloader_map.pop(proto, None)
 
 
-def _download_wrapper(url: str, location: Path, skip_if_exists: bool):
-    if skip_if_exists and os.path.exists(location):
+def _download_wrapper(url: str, location: Path, skip_if_exists: bool, expected: Optional[ExpectedFile] = None):
+    """
+    Downloads the file into a ``.part`` file next to ``location``, verifies it and moves it to ``location``.
+    An interrupted download leaves only the ``.part`` file, which the next download continues from.
+    """
+    manifest = get_download_manifest()
+    entry = manifest.get(location) if manifest is not None else None
+    if entry is not None and not manifest.is_unchanged_locally(location, entry):
+        entry = None
+
+    if skip_if_exists and _is_up_to_date(url, location, expected, manifest, entry):
         return
 
-    # Download the file
+    location.parent.mkdir(parents=True, exist_ok=True)
+    part_path = location.with_name(location.name + ".part")
+    # On forced redownloads, ask the server whether our copy is still up to date, instead of downloading it again.
+    # Otherwise we already know that it's outdated
+    if_none_match = None
+    if not skip_if_exists and entry is not None and entry.url == url:
+        if expected is None or expected.hash is None or expected.hash == entry.hash:
+            if_none_match = entry.etag
+    size = expected.size if expected is not None else None
+    for attempt in range(2):
+        try:
+            etag, unchanged = _download_to_part(url, part_path, if_none_match, size)
+            if unchanged:
+                return
+            if expected is not None:
+                expected.verify(part_path)
+            break
+        except DownloadIntegrityError as e:
+            _remove_part(part_path)
+            if attempt > 0:
+                raise
+            # Could have continued from a part of an older version of the file - download it from scratch
+            logger.warning(f"{e}, downloading it again")
+
+    os.replace(part_path, location)
+    _multipart_state_path(part_path).unlink(missing_ok=True)
+    if manifest is not None:
+        manifest.put(location, url, expected.hash if expected is not None else None, etag)
+
+
+def _is_up_to_date(
+    url: str,
+    location: Path,
+    expected: Optional[ExpectedFile],
+    manifest: Optional[DownloadManifest],
+    entry: Optional[ManifestEntry],
+) -> bool:
+    """
+    Checks whether the file at ``location`` doesn't need to be downloaded again
+    """
+    if not location.exists():
+        return False
+    if entry is not None:
+        # The file was downloaded by us and wasn't changed since
+        if expected is not None and expected.hash is not None and entry.hash is not None:
+            return expected.hash == entry.hash
+        return entry.url == url
+    if expected is None or expected.size is None:
+        # Nothing to compare the file against, trust that it's the right one
+        return True
+    # File that was downloaded before the manifest existed, or changed since - check it against the remote
+    if not expected.matches(location):
+        return False
+    if manifest is not None:
+        manifest.put(location, url, expected.hash)
+    return True
+
+
+def _download_to_part(
+    url: str, part_path: Path, if_none_match: Optional[str], size: Optional[int] = None
+) -> Tuple[Optional[str], bool]:
+    """
+    Downloads the file using the downloader for the url.
+    Files of known ``size`` above the multipart threshold are downloaded in parts in parallel, if the downloader can.
+
+    Returns:
+        ETag of the file and whether the file was unchanged on the server
+    """
+    multipart = (
+        size is not None and config.download_multipart_threshold > 0 and size >= config.download_multipart_threshold
+    )
+
     # Check if it's a bucket
     bucket_tuple = download_url_to_bucket_path(url)
-    assert _default_downloader is not None
-    if bucket_tuple is None:
-        # Not a bucket path - download regularly
-        content = _default_downloader(url)
-    else:
+    if bucket_tuple is not None:
         # Bucket path - try to look if there's a custom downloader
         proto, bucket_name, bucket_path = bucket_tuple
         bucket_downloader = _bucket_downloader_map.get(proto)
-        if bucket_downloader is None:
-            content = _default_downloader(url)
-        else:
-            content = bucket_downloader(bucket_name, bucket_path)
+        if bucket_downloader is not None:
+            range_downloader = _bucket_range_downloader_map.get(proto)
+            if multipart and range_downloader is not None:
 
-    location.parent.mkdir(parents=True, exist_ok=True)
-    with open(location, "wb") as f:
-        f.write(content)
+                def download_range(f: BinaryIO, start: int, end: int, _if_none_match: Optional[str]):
+                    with get_download_scheduler().request() as req:
+                        range_downloader(bucket_name, bucket_path, _ScheduledWriter(f, req), start, end)
+                    return None, False
+
+                return _download_multipart(part_path, size, download_range, None)
+
+            _remove_part(part_path)
+            with get_download_scheduler().request() as req, open(part_path, "wb") as f:
+                bucket_downloader(bucket_name, bucket_path, _ScheduledWriter(f, req))
+            return None, False
+
+    # Not a bucket path, or there's no custom downloader - download from DagsHub
+    assert _default_auth is not None
+    if multipart:
+        try:
+            return _download_multipart(
+                part_path, size, partial(_dagshub_download_range, url, _default_auth), if_none_match
+            )
+        except RangeNotSupportedError:
+            logger.debug(f"Server doesn't support range requests for {url}, downloading it in one request")
+            _remove_part(part_path)
+    elif _multipart_state_path(part_path).exists():
+        # The part was downloaded in parts, so it's not contiguous and can't be continued from its end
+        _remove_part(part_path)
+    return _dagshub_download_resumable(url, part_path, _default_auth, if_none_match)
+
+
+class _ScheduledWriter:
+    """
+    File wrapper that reports the written bytes to the download scheduler, for downloads done by bucket clients
+    """
+
+    def __init__(self, f: BinaryIO, req: DownloadRequest):
+        self._f = f
+        self._req = req
+
+    def write(self, data) -> int:
+        res = self._f.write(data)
+        self._req.received(len(data))
+        return res
+
+    def __getattr__(self, item):
+        return getattr(self._f, item)
+
+
+def _multipart_state_path(part_path: Path) -> Path:
+    return part_path.with_name(part_path.name + ".state")
+
+
+def _remove_part(part_path: Path):
+    part_path.unlink(missing_ok=True)
+    _multipart_state_path(part_path).unlink(missing_ok=True)
+
+
+def _read_multipart_state(state_path: Path, size: int, part_size: int) -> Optional[Dict[int, Optional[str]]]:
+    """
+    Reads the parts that were already downloaded, with their ETags.
+    Returns None if there's no state, or it's of a download with a different layout of the parts.
+    """
+    try:
+        with open(state_path) as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return None
+    if not lines or lines[0] != f"{size} {part_size}":
+        return None
+    done = {}
+    for line in lines[1:]:
+        # The last line can be cut off by an interruption
+        index, _, etag = line.partition(" ")
+        if index.isdigit() and etag:
+            done[int(index)] = etag if etag != "-" else None
+    return done
+
+
+def _download_multipart(
+    part_path: Path, size: int, download_range: RangeDownloaderFuncType, if_none_match: Optional[str]
+) -> Tuple[Optional[str], bool]:
+    """
+    Downloads the file into ``part_path`` in parts of ``config.download_part_size``,
+    with up to ``config.download_part_threads`` parts downloaded at the same time.
+    The parts are written directly into their place in the preallocated file.
+
+    The finished parts are recorded in a ``.state`` file next to the part file,
+    so an interrupted download continues with the parts that are left.
+
+    Returns:
+        ETag of the file and whether the file was unchanged on the server
+    """
+    part_size = max(config.download_part_size, 1)
+    ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+    state_path = _multipart_state_path(part_path)
+
+    done = _read_multipart_state(state_path, size, part_size)
+    if done is None or not part_path.exists() or part_path.stat().st_size != size:
+        with open(part_path, "wb") as f:
+            f.truncate(size)
+        with open(state_path, "w") as f:
+            f.write(f"{size} {part_size}\n")
+        done = {}
+    etags = dict(done)
+    state_lock = threading.Lock()
+
+    def download_part(index: int, part_if_none_match: Optional[str] = None) -> bool:
+        start, end = ranges[index]
+        with open(part_path, "r+b") as f:
+            f.seek(start)
+            etag, unchanged = download_range(f, start, end, part_if_none_match)
+            if unchanged:
+                return True
+            written = f.tell() - start
+        if written != end - start + 1:
+            raise DownloadIntegrityError(part_path, f"got {written} bytes for the range {start}-{end}")
+        with state_lock:
+            etags[index] = etag
+            with open(state_path, "a") as f:
+                f.write(f"{index} {etag or '-'}\n")
+        return False
+
+    todo = [i for i in range(len(ranges)) if i not in done]
+    if if_none_match is not None and not done:
+        # Check that the file changed with the first part, before downloading the rest
+        if download_part(todo.pop(0), if_none_match):
+            _remove_part(part_path)
+            return if_none_match, True
+
+    if todo:
+        with ThreadPoolExecutor(max_workers=min(config.download_part_threads, len(todo))) as tp:
+            futures = [tp.submit(download_part, i) for i in todo]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+    known_etags = set(etag for etag in etags.values() if etag is not None)
+    if len(known_etags) > 1:
+        raise DownloadIntegrityError(part_path, "the file changed on the server while it was being downloaded")
+    return next(iter(known_etags), None), False
 
 
 def _ensure_default_downloader_exists():
     """
     Checks that the default dagshub download function exists and prepares it otherwise
     """
-    global _default_downloader
+    global _default_downloader, _default_auth
     if _default_downloader is None:
-        auth = get_authenticator()
-        _default_downloader = partial(_dagshub_download, auth=auth)
+        _default_auth = get_authenticator()
+        _default_downloader = partial(_dagshub_download, auth=_default_auth)
 
 
 def download_files(
-    files: List[Tuple[str, Union[str, Path]]],
+    files: List[Union[Tuple[str, Union[str, Path]], Tuple[str, Union[str, Path], Optional[ExpectedFile]]]],
     download_fn: Optional[DownloadFunctionType] = None,
     threads=config.download_threads,
     skip_if_exists=True,
@@ -220,24 +733,44 @@ def download_files(
     """
     Download files using multithreading
 
+    The default downloader downloads into ``.part`` files, which are moved to the destination once complete,
+    and continues interrupted downloads from where they stopped.
+    Files are verified against the :class:`ExpectedFile`, if it's given.
+    The downloaded files are recorded in a :class:`manifest <dagshub.common.download_manifest.DownloadManifest>`,
+    so repeated downloads only fetch the files that are missing or changed.
+    Big files of known size are downloaded in parts over multiple connections,
+    configured by the ``DAGSHUB_DOWNLOAD_MULTIPART_THRESHOLD``, ``DAGSHUB_DOWNLOAD_PART_SIZE``
+    and ``DAGSHUB_DOWNLOAD_PART_THREADS`` environment variables.
+
     Parameters:
-        files: list of (download_url: str, file_location: str or Path)
+        files: list of (download_url: str, file_location: str or Path), optionally with an ExpectedFile
+            as the third element of the tuple
         download_fn: Optional function that will download the file. Needs to receive the two arguments:
             download url and Path where to save the file
             If function is not specified, then a default function that downloads a file with DagsHub credentials is used
             CAUTION: function needs to be pickleable since we're using ThreadPool to execute
-        threads: number of threads to run this function on, defaults to the config value of download_threads (32)
-        skip_if_exists: skip the download if the file exists (only for the default downloader)
+        threads: number of threads to run this function on, defaults to the config value of download_threads (32).
+            With the default downloader, the number of concurrent requests is also limited by the download scheduler
+            shared by all downloads, which lowers it when the server rate limits the requests.
+        skip_if_exists: skip the download if the file exists and is up to date (only for the default downloader).
+            If False, files that the server reports as unchanged still aren't downloaded again.
     """
     _ensure_default_downloader_exists()
 
     # Convert string paths to Path objects
-    for i, file_tuple in enumerate(files):
-        if isinstance(file_tuple[1], str):
-            files[i] = (file_tuple[0], Path(file_tuple[1]))
+    files = [(f[0], Path(f[1]), f[2] if len(f) > 2 else None) for f in files]
 
     if download_fn is None:
         download_fn = partial(_download_wrapper, skip_if_exists=skip_if_exists)
+        with_expected = True
+    else:
+        with_expected = False
+
+    def download(url: str, location: Path, expected: Optional[ExpectedFile]):
+        if with_expected:
+            download_fn(url, location, expected=expected)
+        else:
+            download_fn(url, location)
 
     if len(files) > 1:
         # Multiple files - multithreaded download
@@ -259,7 +792,7 @@ def download_files(
                 except ValueError:
                     pass
 
-                futures = [tp.submit(download_fn, url, location) for (url, location) in files]
+                futures = [tp.submit(download, url, location, expected) for (url, location, expected) in files]
                 for f in as_completed(futures):
                     exc = f.exception()
                     if exc is not None:
@@ -271,8 +804,10 @@ def download_files(
 
     elif len(files) == 1:
         # Single file - don't bother with the multithreading, just download the file
-        url, location = files[0]
+        url, location, expected = files[0]
         try:
-            download_fn(url, location)
+            download(url, location, expected)
         except Exception as exc:
             logger.warning(f"Got exception {type(exc)} while downloading file: {exc}")
+
+    get_download_scheduler().log_summary()
@@ -0,0 +1,114 @@
+import logging
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Union
+
+from dagshub.common import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ManifestEntry:
+    url: str
+    """URL the file was downloaded from"""
+    size: int
+    """Size of the file when it was downloaded"""
+    mtime_ns: int
+    """Modification time of the file when it was downloaded, to find out if it was changed since"""
+    hash: Optional[str]
+    """Expected hash of the file at the time of downloading, if it was known"""
+    etag: Optional[str]
+    """ETag of the download response, for revalidating the file with the server"""
+
+
+class DownloadManifest:
+    """
+    Machine-wide record of the files downloaded by :func:`dagshub.common.download.download_files`.
+
+    Allows repeated downloads to tell apart the files that are already fully downloaded and unchanged
+    from the files that are missing, were changed locally, or have a different version on the remote.
+
+    The record is kept in an SQLite database, so it can be shared between threads and processes.
+
+    :meta private:
+    """
+
+    def __init__(self, location: Union[str, Path]):
+        self.location = Path(location)
+        self.location.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.location, timeout=30, check_same_thread=False, isolation_level=None)
+        # WAL doesn't block readers while writing, and with synchronous=NORMAL doesn't fsync on every write.
+        # Losing the latest entries on a power loss is fine, the files just get verified again
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "path TEXT PRIMARY KEY, url TEXT, size INTEGER, mtime_ns INTEGER, hash TEXT, etag TEXT)"
+        )
+
+    def get(self, path: Union[str, Path]) -> Optional[ManifestEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, size, mtime_ns, hash, etag FROM files WHERE path = ?", (self._key(path),)
+            ).fetchone()
+        if row is None:
+            return None
+        return ManifestEntry(*row)
+
+    def put(self, path: Union[str, Path], url: str, file_hash: Optional[str] = None, etag: Optional[str] = None):
+        """
+        Records a file that was just downloaded and verified
+        """
+        stat = os.stat(path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                (self._key(path), url, stat.st_size, stat.st_mtime_ns, file_hash, etag),
+            )
+
+    def remove(self, path: Union[str, Path]):
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (self._key(path),))
+
+    def is_unchanged_locally(self, path: Union[str, Path], entry: ManifestEntry) -> bool:
+        """
+        Checks that the file is the same as when it was recorded in the manifest
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+        return stat.st_size == entry.size and stat.st_mtime_ns == entry.mtime_ns
+
+    @staticmethod
+    def _key(path: Union[str, Path]) -> str:
+        return os.path.abspath(path)
+
+
+_manifest: Optional[DownloadManifest] = None
+_manifest_lock = threading.Lock()
+
+
+def get_download_manifest() -> Optional[DownloadManifest]:
+    """
+    Returns the download manifest at the configured location.
+    Returns None if the manifest is disabled or can't be opened, in which case downloads aren't tracked.
+
+    :meta private:
+    """
+    global _manifest
+    if not config.download_manifest_location:
+        return None
+    with _manifest_lock:
+        if _manifest is None or _manifest.location != Path(config.download_manifest_location):
+            try:
+                _manifest = DownloadManifest(config.download_manifest_location)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Couldn't open the download manifest, downloads won't be tracked: {e}")
+                return None
+        return _manifest
@@ -0,0 +1,201 @@
+import datetime
+import email.utils
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from httpx import Response
+
+from dagshub.common import config
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUS_CODES = (429, 503)
+# Don't trust the server to pause all downloads for longer than this
+MAX_RETRY_AFTER = 300.0
+
+
+class DownloadRequest:
+    """
+    A download request running under a :class:`DownloadScheduler`.
+
+    :meta private:
+    """
+
+    def __init__(self, scheduler: "DownloadScheduler"):
+        self._scheduler = scheduler
+        self.started_at = time.monotonic()
+
+    def response(self, resp: Response):
+        """
+        Reports the response of the request to the scheduler
+        """
+        if resp.status_code in THROTTLE_STATUS_CODES:
+            self._scheduler.on_throttled(self.started_at, parse_retry_after(resp.headers.get("retry-after")))
+        elif resp.status_code < 400:
+            self._scheduler.on_success()
+
+    def received(self, nbytes: int):
+        """
+        Reports received bytes of the response, waits if the download rate is over the limit
+        """
+        self._scheduler.consume(nbytes)
+
+
+class DownloadScheduler:
+    """
+    Limits the number of concurrent download requests of the process, adapting the limit to the server's responses.
+
+    The limit starts at ``max_concurrency``.
+    When the server responds that it's rate limiting or overloaded (429 or 503), the limit is halved,
+    and the requests are paused for the ``Retry-After`` time of the response.
+    The limit then grows back by about one for every ``limit`` successful requests (AIMD, like TCP congestion control).
+
+    Optionally also caps the download rate of all the requests together.
+
+    :meta private:
+    """
+
+    def __init__(self, max_concurrency: int, max_bytes_per_second: int = 0, min_concurrency: int = 1):
+        self.max_concurrency = max(max_concurrency, 1)
+        self.min_concurrency = max(min(min_concurrency, self.max_concurrency), 1)
+        self.max_bytes_per_second = max_bytes_per_second
+        self.throttled_count = 0
+        """Number of the responses that told us to slow down, since the last :func:`log_summary`"""
+        self._limit = float(self.max_concurrency)
+        self._active = 0
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+        self._cond = threading.Condition()
+        self._rate_lock = threading.Lock()
+        self._rate_next = 0.0
+
+    @property
+    def concurrency(self) -> int:
+        """Number of requests that are currently allowed to run at the same time"""
+        return int(self._limit)
+
+    @contextmanager
+    def request(self) -> Iterator[DownloadRequest]:
+        """
+        Waits for a free slot, and holds it while the request is running.
+        Report the response with :func:`DownloadRequest.response` and the received data with
+        :func:`DownloadRequest.received`.
+        """
+        with self._cond:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause <= 0 and self._active < self.concurrency:
+                    break
+                self._cond.wait(timeout=pause if pause > 0 else None)
+            self._active += 1
+        try:
+            yield DownloadRequest(self)
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify()
+
+    def on_success(self):
+        with self._cond:
+            if self._limit < self.max_concurrency:
+                old = self.concurrency
+                self._limit = min(self._limit + 1 / self._limit, self.max_concurrency)
+                if self.concurrency > old:
+                    self._cond.notify(self.concurrency - old)
+
+    def on_throttled(self, started_at: float, retry_after: Optional[float] = None):
+        """
+        Args:
+            started_at: When the throttled request started.
+                Requests that were running before the last decrease don't decrease the limit again,
+                they're the same burst that the server already pushed back against.
+            retry_after: Seconds to wait with all the requests
+        """
+        with self._cond:
+            self.throttled_count += 1
+            now = time.monotonic()
+            if started_at >= self._last_decrease:
+                self._limit = max(self._limit / 2, self.min_concurrency)
+                self._last_decrease = now
+                logger.debug(f"Downloads are throttled by the server, lowering the concurrency to {self.concurrency}")
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + min(retry_after, MAX_RETRY_AFTER))
+
+    def consume(self, nbytes: int):
+        """
+        Accounts for received bytes, sleeping for as long as needed to keep the total rate under the cap
+        """
+        if self.max_bytes_per_second <= 0:
+            return
+        with self._rate_lock:
+            now = time.monotonic()
+            self._rate_next = max(self._rate_next, now) + nbytes / self.max_bytes_per_second
+            delay = self._rate_next - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def log_summary(self):
+        """
+        Reports the concurrency the downloads settled on, if the server throttled them since the last summary
+        """
+        with self._cond:
+            throttled, self.throttled_count = self.throttled_count, 0
+        if throttled:
+            logger.info(
+                f"The server throttled {throttled} download requests, "
+                f"downloading with {self.concurrency} concurrent requests (at most {self.max_concurrency})"
+            )
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parses the ``Retry-After`` header, which is either a number of seconds or an HTTP date
+
+    :meta private:
+    """
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return max((date - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
+
+
+_scheduler: Optional[DownloadScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_download_scheduler() -> DownloadScheduler:
+    """
+    Returns the download scheduler shared by all the downloads of the process
+
+    :meta private:
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = DownloadScheduler(config.download_threads, config.download_max_bytes_per_second)
+        return _scheduler
+
+
+def _reset_after_fork():
+    # A forked child has only the thread that forked it. The requests of the other threads of the parent
+    # will never release their slots in the child, and the locks might've been held by them at the time of the fork
+    global _scheduler, _scheduler_lock
+    _scheduler = None
+    _scheduler_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):  # Not on Windows, where there's no fork
+    os.register_at_fork(after_in_child=_reset_after_fork)
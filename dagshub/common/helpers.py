@@ -2,6 +2,7 @@ import logging
 import urllib
 from os.path import ismount
 from pathlib import Path
+from typing import Any, ContextManager, Dict
 
 import httpx
 
@@ -37,6 +38,18 @@ def get_default_branch(owner, reponame, auth, host=config.host):
     return res.json().get("default_branch")
 
 
+def _add_mixin_args(kwargs: Dict[str, Any]):
+    mixin_args = {"timeout": config.http_timeout, "follow_redirects": True}
+    # Set only if it's not set previously
+    for arg in mixin_args:
+        if arg not in kwargs:
+            kwargs[arg] = mixin_args[arg]
+    # Add the config headers to the headers being sent out
+    headers = kwargs.get("headers", {})
+    headers.update(config.requests_headers)
+    kwargs["headers"] = headers
+
+
 def http_request(method, url, **kwargs):
     """
     Perform an HTTP request using the specified method and URL.
@@ -48,25 +61,24 @@ def http_request(method, url, **kwargs):
     Returns:
         httpx.Response: The HTTP response object containing the result of the request.
     """
-    mixin_args = {"timeout": config.http_timeout, "follow_redirects": True}
-    # Set only if it's not set previously
-    for arg in mixin_args:
-        if arg not in kwargs:
-            kwargs[arg] = mixin_args[arg]
-    # Add the config headers to the headers being sent out
-    headers = kwargs.get("headers", {})
-    headers.update(config.requests_headers)
-    kwargs["headers"] = headers
+    _add_mixin_args(kwargs)
     return httpx.request(method, url, **kwargs)
 
 
+def http_stream(method, url, **kwargs) -> ContextManager[httpx.Response]:
+    """
+    Same as :func:`http_request`, but doesn't read the response body into memory.
+    Use as a context manager, and read the body with ``resp.iter_bytes()``.
+    """
+    _add_mixin_args(kwargs)
+    return httpx.stream(method, url, **kwargs)
+
+
 def get_project_root(root):
     while not (root / ".git").is_dir():
         if ismount(root):
-            raise ValueError(
-                f"No git project found! (stopped at mountpoint {root}). \
-                               Please run this command in a git repository."
-            )
+            raise ValueError(f"No git project found! (stopped at mountpoint {root}). \
+                               Please run this command in a git repository.")
         root = root / ".."
     return Path(root)
 
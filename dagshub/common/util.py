@@ -1,5 +1,7 @@
+import contextlib
 import datetime
 import functools
+import gc
 import types
 import logging
 import importlib
@@ -36,6 +38,23 @@ def removeprefix(val: str, prefix: str) -> str:
     return val
 
 
+@contextlib.contextmanager
+def paused_gc():
+    """
+    Disables the cyclic garbage collector inside the block.
+
+    Use when creating millions of small objects at once,
+    otherwise the collector keeps rescanning them while they're being created.
+    """
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
 def lazy_load(module_name, source_package=None, callback=None):
     if source_package is None:
         # TODO: need to have a map for commonly used imports here. Also handle dots
@@ -0,0 +1,76 @@
+"""
+Parsing of Label Studio tasks in worker processes.
+
+Parsing the tasks is CPU-bound pure-python work,
+so for big query results it's split between multiple processes instead of threads.
+"""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple, Dict, Sequence, TYPE_CHECKING, Callable
+
+from dagshub_annotation_converter.formats.label_studio.task import parse_ls_task
+from pydantic import ValidationError
+
+if TYPE_CHECKING:
+    from dagshub_annotation_converter.ir.image.annotations.base import IRAnnotationBase
+
+logger = logging.getLogger(__name__)
+
+ParsedTask = Optional[Tuple[List["IRAnnotationBase"], Dict]]
+"""Annotations and meta of the task, or None if the task is invalid"""
+
+PARSE_CHUNK_SIZE = 256
+"""How many tasks are sent to a worker process at once"""
+
+
+def parse_ls_tasks(tasks: Sequence[Tuple[bytes, str]]) -> List[ParsedTask]:
+    """
+    Parses Label Studio tasks into IR annotations
+
+    Args:
+        tasks: Tuples of (task, filename of the datapoint)
+
+    Returns:
+        (annotations, meta) for each task, or None for the tasks that failed validation
+    """
+    res: List[ParsedTask] = []
+    for ls_task, filename in tasks:
+        try:
+            parsed = parse_ls_task(ls_task)
+            res.append((parsed.to_ir_annotations(filename=filename), parsed.meta))
+        except ValidationError:
+            res.append(None)
+    return res
+
+
+def parse_ls_tasks_parallel(
+    tasks: Sequence[Tuple[bytes, str]],
+    num_proc: int,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> List[ParsedTask]:
+    """
+    Same as :func:`parse_ls_tasks`, but splits the work between ``num_proc`` processes.
+    Falls back to parsing in the current process if the processes can't be started.
+
+    Args:
+        tasks: Tuples of (task, filename of the datapoint)
+        num_proc: Number of worker processes
+        on_progress: Gets called with the number of parsed tasks every time a chunk is done
+    """
+    chunks = [tasks[i : i + PARSE_CHUNK_SIZE] for i in range(0, len(tasks), PARSE_CHUNK_SIZE)]
+    res: List[ParsedTask] = []
+    try:
+        # Spawn instead of fork, because forking a process that has other threads running can deadlock
+        with ProcessPoolExecutor(max_workers=num_proc, mp_context=multiprocessing.get_context("spawn")) as pool:
+            # map() keeps the order of the chunks
+            for parsed_chunk in pool.map(parse_ls_tasks, chunks):
+                res.extend(parsed_chunk)
+                if on_progress is not None:
+                    on_progress(len(parsed_chunk))
+    except (BrokenProcessPool, OSError) as e:
+        logger.warning(f"Couldn't parse annotations in parallel ({e}), parsing them in the current process")
+        res = res + parse_ls_tasks(tasks[len(res) :])
+    return res
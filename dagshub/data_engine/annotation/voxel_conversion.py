@@ -1,6 +1,10 @@
+import hashlib
 import json
 import logging
-from typing import TYPE_CHECKING
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Set, Tuple
+
+from dagshub.data_engine.annotation.metadata import MetadataAnnotations
 
 if TYPE_CHECKING:
     from dagshub.data_engine.client.models import Datapoint
@@ -49,8 +53,10 @@ def add_ls_annotations(sample: "fo.Sample", datapoint: "Datapoint", *annotation_
 
     for field in annotation_fields:
         annotations = datapoint.metadata.get(field)
+        if isinstance(annotations, MetadataAnnotations):
+            annotations = annotations.value
         if type(annotations) is not bytes:
-            return
+            continue
         ann_dict = json.loads(annotations.decode())
         for ann in ann_dict.get("annotations", {}):
             if "result" not in ann:
@@ -95,3 +101,60 @@ def add_ls_annotations(sample: "fo.Sample", datapoint: "Datapoint", *annotation_
 
             for label in labels:
                 sample.add_labels(label, label_field=field)
+
+
+VOXEL_DIGEST_FIELD = "dagshub_sync_digest"
+"""Sample field with the digest of the datapoint the sample was created from"""
+
+
+def sample_digest(datapoint: "Datapoint", filepath: Path, label_format: str, annotation_fields: Sequence[str]) -> str:
+    """
+    Digest of everything the voxel sample of the datapoint is created from.
+    If it didn't change since the dataset was synced last time, the sample doesn't need to be created again.
+
+    Args:
+        datapoint: Data Engine datapoint of the sample
+        filepath: Path to the local file of the sample
+        label_format: How the annotations are converted to labels
+        annotation_fields: Fields the labels are created from
+    """
+    h = hashlib.sha1(json.dumps([str(filepath), datapoint.path, label_format, list(annotation_fields)]).encode())
+    for key in sorted(datapoint.metadata):
+        value = datapoint.metadata[key]
+        if isinstance(value, MetadataAnnotations):
+            value = value.value
+        h.update(key.encode())
+        h.update(b"\0")
+        h.update(hashlib.sha1(value if isinstance(value, bytes) else repr(value).encode()).digest())
+    return h.hexdigest()
+
+
+def plan_sync(
+    existing: Sequence[Tuple[str, Optional[int], Optional[str]]], digests: Dict[int, str]
+) -> Tuple[List[str], Dict[int, str], Set[int]]:
+    """
+    Compares the samples of a voxel dataset with the datapoints it's synced with.
+
+    Args:
+        existing: (sample id, datapoint id, digest) of the samples in the dataset
+        digests: Digests of the datapoints, by datapoint id
+
+    Returns:
+        Ids of the samples to delete (removed datapoints and duplicates),
+        ids of the samples to update by the ids of their changed datapoints,
+        and ids of the new datapoints to create samples for
+    """
+    to_delete: List[str] = []
+    to_update: Dict[int, str] = {}
+    synced: Set[int] = set()
+    for sample_id, datapoint_id, digest in existing:
+        if datapoint_id is None:
+            # Samples that weren't created from datapoints are left alone
+            continue
+        if datapoint_id in synced or datapoint_id not in digests:
+            to_delete.append(sample_id)
+            continue
+        if digests[datapoint_id] != digest:
+            to_update[datapoint_id] = sample_id
+        synced.add(datapoint_id)
+    return to_delete, to_update, set(digests) - synced
@@ -0,0 +1,389 @@
+import asyncio
+import contextlib
+import contextvars
+import json
+import logging
+import time
+import weakref
+from typing import Any, AsyncIterator, Optional, List, Dict, Union, TYPE_CHECKING, Tuple
+
+import dacite
+import gql
+from gql.transport.exceptions import TransportQueryError
+
+import dagshub.auth
+from dagshub.common import config
+from dagshub.common.analytics import send_analytics_event
+from dagshub.data_engine.client.data_client import DataClient
+from dagshub.data_engine.client.gql_introspections import GqlIntrospections, TypesIntrospection
+from dagshub.data_engine.client.gql_mutations import GqlMutations
+from dagshub.data_engine.client.gql_queries import GqlQueries
+from dagshub.data_engine.client.models import DatasourceResult, DatasetResult
+from dagshub.data_engine.client.query_builder import GqlQuery
+from dagshub.data_engine.client.serialization import SerializedEntry, serialize_metadata_update_entries
+from dagshub.data_engine.client.stats import RequestStats, QueryStats, emit_request_stats
+from dagshub.data_engine.model.errors import DataEngineGqlError
+from dagshub.data_engine.model.query_result import QueryResult
+from dagshub.data_engine.model.schema_util import dacite_config
+
+if TYPE_CHECKING:
+    from gql.client import AsyncClientSession
+    from dagshub.data_engine.model.datasource import Datasource, DatapointMetadataUpdateEntry
+
+logger = logging.getLogger(__name__)
+
+# Requests of different coroutines are executed by the same transport, so the state of a request is kept in the context
+_request_stats: "contextvars.ContextVar[Optional[RequestStats]]" = contextvars.ContextVar("request_stats", default=None)
+_request_start: "contextvars.ContextVar[Optional[float]]" = contextvars.ContextVar("request_start", default=None)
+_support_id: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar("support_id", default=None)
+
+
+class AsyncDataClient:
+    """
+    asyncio version of the Data Engine client.
+
+    All the requests are executed on the event loop that they're awaited from,
+    so multiple queries and uploads can be in flight at the same time without using threads.
+
+    The connection is opened on the first request. Use the client as an async context manager,
+    or call :func:`close` when you're done with it to close the connection::
+
+        async with AsyncDataClient("user/repo") as client:
+            results = await asyncio.gather(client.head(ds1), client.head(ds2))
+    """
+
+    HEAD_QUERY_SIZE = DataClient.HEAD_QUERY_SIZE
+    FULL_LIST_PAGE_SIZE = DataClient.FULL_LIST_PAGE_SIZE
+
+    def __init__(self, repo: str):
+        self.repo = repo
+        self.host = config.host
+        self._sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Future]" = (
+            weakref.WeakKeyDictionary()
+        )
+        # How many connection() blocks are running on each loop
+        self._connection_users: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, int]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_sessions"]
+        del state["_connection_users"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._sessions = weakref.WeakKeyDictionary()
+        self._connection_users = weakref.WeakKeyDictionary()
+
+    async def __aenter__(self) -> "AsyncDataClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def _init_client(self) -> gql.Client:
+        from gql.transport.httpx import HTTPXAsyncTransport
+
+        url = f"{self.host}/api/v1/repos/{self.repo}/data-engine/graphql"
+        auth = dagshub.auth.get_authenticator(host=self.host)
+        transport = HTTPXAsyncTransport(
+            url=url,
+            auth=auth,
+            headers=config.requests_headers,
+            # Same as the synchronous client - big queries can take a while
+            timeout=None,
+            json_deserialize=self._timed_json_loads,
+            event_hooks={"request": [self._record_request_start], "response": [self._record_response_stats]},
+        )
+        return gql.Client(transport=transport)
+
+    async def _get_session(self) -> "AsyncClientSession":
+        """
+        Returns the session of the running event loop, connecting it if this is the first request on this loop.
+        """
+        loop = asyncio.get_running_loop()
+        session_future = self._sessions.get(loop)
+        if session_future is None:
+            session_future = asyncio.ensure_future(self._init_client().connect_async())
+            self._sessions[loop] = session_future
+        try:
+            return await session_future
+        except Exception:
+            self._sessions.pop(loop, None)
+            raise
+
+    async def close(self):
+        """
+        Closes the connection of the running event loop
+        """
+        session_future = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session_future is None:
+            return
+        session = await session_future
+        await session.client.close_async()
+
+    async def aclose(self):
+        """
+        Same as :func:`close`, for use with ``contextlib.aclosing()``
+        """
+        await self.close()
+
+    @contextlib.asynccontextmanager
+    async def connection(self) -> AsyncIterator["AsyncDataClient"]:
+        """
+        Keeps the connection of the running event loop open inside the block.
+        The connection is closed when the last block running on the loop exits,
+        so concurrent blocks on the same loop share one connection.
+        """
+        loop = asyncio.get_running_loop()
+        self._connection_users[loop] = self._connection_users.get(loop, 0) + 1
+        try:
+            yield self
+        finally:
+            self._connection_users[loop] -= 1
+            if self._connection_users[loop] == 0:
+                del self._connection_users[loop]
+                await self.close()
+
+    @staticmethod
+    async def _record_request_start(request):
+        _request_start.set(time.perf_counter())
+
+    @staticmethod
+    async def _record_response_stats(response):
+        _support_id.set(response.headers.get("X-DagsHub-Support-Id"))
+        stats = _request_stats.get()
+        if stats is None:
+            return
+        request_start = _request_start.get()
+        if request_start is not None:
+            stats.time_to_headers = time.perf_counter() - request_start
+        start = time.perf_counter()
+        content = await response.aread()
+        stats.download_time = time.perf_counter() - start
+        stats.response_bytes = len(content)
+        stats.request_bytes = len(response.request.content)
+
+    @staticmethod
+    def _timed_json_loads(text: str) -> Any:
+        start = time.perf_counter()
+        res = json.loads(text)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.json_decode_time = time.perf_counter() - start
+        return res
+
+    async def _exec(
+        self,
+        query: GqlQuery,
+        params: Optional[Dict[str, Any]] = None,
+        validate=True,
+        stats: Optional[RequestStats] = None,
+    ) -> Dict[str, Any]:
+        """
+        Args:
+            stats: Stats object to record the stats of the request into.
+                If specified, the caller is responsible for emitting the stats with :func:`emit_request_stats`,
+                otherwise they're emitted once the request is done.
+        """
+        logger.debug(f"Executing query: {query}")
+        if params is not None and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Params: {params}")
+        if validate:
+            query.validate_params(params if params else {}, await self.get_query_introspection())
+        q = gql.gql(query.generate())
+        session = await self._get_session()
+        emit_stats = stats is None
+        if stats is None:
+            stats = RequestStats(operation=query.operation_name)
+        stats_token = _request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            resp = await session.execute(q, variable_values=params)
+        except TransportQueryError as e:
+            raise DataEngineGqlError(e, _support_id.get())
+        finally:
+            stats.total_time = time.perf_counter() - start
+            _request_stats.reset(stats_token)
+            if emit_stats:
+                emit_request_stats(stats)
+        return resp
+
+    async def get_query_introspection(self) -> TypesIntrospection:
+        """
+        Async counterpart of :attr:`DataClient.query_introspection`. The schema is shared with the synchronous client.
+        """
+        known_introspections = DataClient._known_introspections
+        if self.host not in known_introspections:
+            introspection = GqlIntrospections.obj_fields()
+            # Keep validate = False otherwise you get into an infinite loop
+            introspection_dict = await self._exec(introspection, validate=False)
+            known_introspections[self.host] = dacite.from_dict(
+                data_class=TypesIntrospection, data=introspection_dict["__schema"]
+            )
+        return known_introspections[self.host]
+
+    async def head(self, datasource: "Datasource", size: Optional[int] = None) -> QueryResult:
+        """
+        Retrieve the first ``size`` datapoints of the datasource (100 by default).
+        """
+        if size is None:
+            size = self.HEAD_QUERY_SIZE
+        stats = QueryStats()
+        _, res = await self._query_page(datasource, True, size, None, stats)
+        res.stats = stats
+        return res
+
+    async def sample(self, datasource: "Datasource", n: Optional[int], include_metadata: bool) -> QueryResult:
+        """
+        Retrieve ``n`` datapoints of the datasource. If ``n`` is None, retrieves all datapoints.
+        """
+        if n is None:
+            return await self._get_all(datasource, include_metadata)
+
+        has_next_page = True
+        after = None
+        res = QueryResult([], datasource, [], stats=QueryStats())
+        left = n
+
+        while has_next_page and left > 0:
+            take = min(left, self.FULL_LIST_PAGE_SIZE)
+            resp, new_entries = await self._query_page(datasource, include_metadata, take, after, res.stats)
+            has_next_page = resp["pageInfo"]["hasNextPage"]
+            after = resp["pageInfo"]["endCursor"]
+            res._extend_entries(new_entries.entries)
+            res.fields = new_entries.fields
+            res.query_data_time = new_entries.query_data_time
+            left -= take
+        return res
+
+    async def get_datapoints(self, datasource: "Datasource") -> QueryResult:
+        res = await self._get_all(datasource, True)
+        # Remember the query, so the result can be refined locally
+        res._full_query = datasource.get_query().__deepcopy__()
+        return res
+
+    async def _get_all(self, datasource: "Datasource", include_metadata: bool) -> QueryResult:
+        has_next_page = True
+        after = None
+        res = QueryResult([], datasource, [], stats=QueryStats())
+
+        while has_next_page:
+            resp, new_entries = await self._query_page(
+                datasource, include_metadata, self.FULL_LIST_PAGE_SIZE, after, res.stats
+            )
+            has_next_page = resp["pageInfo"]["hasNextPage"]
+            after = resp["pageInfo"]["endCursor"]
+
+            res._extend_entries(new_entries.entries)
+            res.fields = new_entries.fields
+            res.query_data_time = new_entries.query_data_time
+
+        return res
+
+    async def _query_page(
+        self,
+        datasource: "Datasource",
+        include_metadata: bool,
+        limit: Optional[int],
+        after: Optional[str],
+        stats: QueryStats,
+    ) -> Tuple[Dict[str, Any], QueryResult]:
+        request_stats = RequestStats(operation="datasourceQuery")
+        try:
+            resp = await self._datasource_query(datasource, include_metadata, limit, after, stats=request_stats)
+            start = time.perf_counter()
+            page = QueryResult.from_gql_query(resp, datasource)
+            request_stats.parse_time = time.perf_counter() - start
+        finally:
+            stats.requests.append(request_stats)
+            emit_request_stats(request_stats)
+        return resp, page
+
+    async def _datasource_query(
+        self,
+        datasource: "Datasource",
+        include_metadata: bool,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        stats: Optional[RequestStats] = None,
+    ):
+        send_analytics_event("Client_DataEngine_QueryRun", repo=datasource.source.repoApi)
+
+        q = GqlQueries.datasource_query(include_metadata, await self.get_query_introspection())
+
+        params = GqlQueries.datasource_query_params(
+            datasource_id=datasource.source.id,
+            query_input=datasource.serialize_gql_query_input(),
+            first=limit,
+            after=after,
+        )
+        return (await self._exec(q, params, stats=stats))["datasourceQuery"]
+
+    async def update_metadata(
+        self, datasource: "Datasource", entries: List[Union["DatapointMetadataUpdateEntry", SerializedEntry]]
+    ):
+        """
+        Update the Datasource with the metadata entries.
+        Entries can also be already serialized dictionaries.
+        """
+        q = GqlMutations.update_metadata()
+
+        assert datasource.source.id is not None
+        assert len(entries) > 0
+
+        params = GqlMutations.update_metadata_params(
+            datasource_id=datasource.source.id, datapoints=serialize_metadata_update_entries(entries)
+        )
+        return await self._exec(q, params)
+
+    async def get_datasources(self, id: Optional[str], name: Optional[str]) -> List[DatasourceResult]:
+        """
+        Retrieve a list of datasources based on optional filtering criteria.
+        """
+        q = GqlQueries.datasource()
+        params = GqlQueries.datasource_params(id=id, name=name)
+
+        res = (await self._exec(q, params))["datasource"]
+        if res is None:
+            return []
+        return [dacite.from_dict(DatasourceResult, val, config=dacite_config) for val in res]
+
+    async def save_dataset(self, datasource: "Datasource", name: str):
+        """
+        Save the query of the datasource as a dataset with the name ``name``.
+        """
+        q = GqlMutations.save_dataset()
+
+        assert name is not None
+
+        params = GqlMutations.save_dataset_params(
+            datasource_id=datasource.source.id, name=name, query_input=datasource.serialize_gql_query_input()
+        )
+        return await self._exec(q, params)
+
+    async def delete_dataset(self, dataset_id: Union[str, int]):
+        """
+        Removes a dataset. This doesn't remove the underlying source.
+        """
+        q = GqlMutations.delete_dataset()
+
+        assert dataset_id is not None
+
+        params = GqlMutations.delete_dataset_params(dataset_id=dataset_id)
+        return await self._exec(q, params)
+
+    async def get_datasets(self, id: Optional[Union[str, int]], name: Optional[str]) -> List[DatasetResult]:
+        """
+        Retrieve a list of datasets based on optional filtering criteria.
+        """
+        q = GqlQueries.dataset()
+        params = GqlQueries.dataset_params(id=id, name=name)
+
+        res = (await self._exec(q, params))["dataset"]
+        if res is None:
+            return []
+
+        return [dacite.from_dict(DatasetResult, val, config=dacite_config) for val in res]
@@ -1,9 +1,13 @@
 import datetime
+import json
 import logging
-from typing import Any, Optional, List, Dict, Union, TYPE_CHECKING, Tuple
+import threading
+import time
+from typing import Any, Optional, List, Dict, Union, TYPE_CHECKING, Tuple, Iterator
 
 import dacite
 import gql
+import requests
 import rich.progress
 from gql.transport.exceptions import TransportQueryError
 from gql.transport.requests import RequestsHTTPTransport
@@ -24,6 +28,13 @@ from dagshub.data_engine.client.models import ScanOption
 from dagshub.data_engine.client.gql_mutations import GqlMutations
 from dagshub.data_engine.client.gql_queries import GqlQueries
 from dagshub.data_engine.client.query_builder import GqlQuery
+from dagshub.data_engine.client.stats import RequestStats, QueryStats, emit_request_stats
+from dagshub.data_engine.client.serialization import (
+    SerializedEntry,
+    serialize_metadata_update_entries,
+    serialize_delete_metadata_entries,
+    serialize_delete_entries,
+)
 from dagshub.data_engine.model.errors import DataEngineGqlError
 from dagshub.data_engine.model.query_result import QueryResult
 
@@ -54,15 +65,65 @@ class DataClient:
     def __init__(self, repo: str):
         self.repo = repo
         self.host = config.host
-        self.client = self._init_client()
+        self._thread_local = threading.local()
+
+    @property
+    def client(self) -> gql.Client:
+        """
+        GraphQL client of the current thread.
+        Clients can't be shared between threads, because the transport is connected for the duration of a request.
+        """
+        client = getattr(self._thread_local, "client", None)
+        if client is None:
+            client = self._init_client()
+            self._thread_local.client = client
+        return client
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_thread_local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._thread_local = threading.local()
 
     def _init_client(self):
         url = f"{self.host}/api/v1/repos/{self.repo}/data-engine/graphql"
         auth = dagshub.auth.get_authenticator(host=self.host)
-        transport = RequestsHTTPTransport(url=url, auth=auth, headers=config.requests_headers)
+        transport = RequestsHTTPTransport(
+            url=url,
+            auth=auth,
+            headers=config.requests_headers,
+            json_deserialize=self._timed_json_loads,
+            hooks={"response": self._record_response_stats},
+        )
         client = gql.Client(transport=transport)
         return client
 
+    def _record_response_stats(self, response: requests.Response, *args, **kwargs):
+        stats: Optional[RequestStats] = getattr(self._thread_local, "request_stats", None)
+        if stats is None:
+            return
+        stats.time_to_headers = response.elapsed.total_seconds()
+        start = time.perf_counter()
+        # Reading the body here instead of letting requests do it afterwards, so the download can be timed
+        content = response.content
+        stats.download_time = time.perf_counter() - start
+        stats.response_bytes = len(content)
+        body = response.request.body
+        stats.request_bytes = len(body) if body is not None else 0
+        retries = getattr(response.raw, "retries", None)
+        stats.retries = len(retries.history) if retries is not None else 0
+
+    def _timed_json_loads(self, text: str) -> Any:
+        start = time.perf_counter()
+        res = json.loads(text)
+        stats: Optional[RequestStats] = getattr(self._thread_local, "request_stats", None)
+        if stats is not None:
+            stats.json_decode_time = time.perf_counter() - start
+        return res
+
     def create_datasource(self, ds: "DatasourceState") -> DatasourceResult:
         """
         Create a new datasource using the provided datasource state.
@@ -102,11 +163,13 @@ class DataClient:
         progress = get_rich_progress(rich.progress.MofNCompleteColumn())
         total_task = progress.add_task("Downloading metadata...", total=size)
 
+        stats = QueryStats()
         with progress:
-            resp = self._datasource_query(datasource, True, size)
+            _, res = self._query_page(datasource, True, size, None, stats)
             progress.update(total_task, advance=size, refresh=True)
 
-        return QueryResult.from_gql_query(resp, datasource)
+        res.stats = stats
+        return res
 
     def sample(self, datasource: "Datasource", n: Optional[int], include_metadata: bool) -> QueryResult:
         """
@@ -125,7 +188,7 @@ class DataClient:
 
         has_next_page = True
         after = None
-        res = QueryResult([], datasource, [])
+        res = QueryResult([], datasource, [], stats=QueryStats())
         left = n
 
         progress = get_rich_progress(rich.progress.MofNCompleteColumn())
@@ -134,11 +197,10 @@ class DataClient:
         with progress:
             while has_next_page and left > 0:
                 take = min(left, self.FULL_LIST_PAGE_SIZE)
-                resp = self._datasource_query(datasource, include_metadata, take, after)
+                resp, new_entries = self._query_page(datasource, include_metadata, take, after, res.stats)
                 has_next_page = resp["pageInfo"]["hasNextPage"]
                 after = resp["pageInfo"]["endCursor"]
-                new_entries = QueryResult.from_gql_query(resp, datasource)
-                res.entries += new_entries.entries
+                res._extend_entries(new_entries.entries)
                 res.fields = new_entries.fields
                 res.query_data_time = new_entries.query_data_time
                 left -= take
@@ -146,52 +208,118 @@ class DataClient:
         return res
 
     def get_datapoints(self, datasource: "Datasource") -> QueryResult:
-        return self._get_all(datasource, True)
+        res = self._get_all(datasource, True)
+        # Remember the query, so the result can be refined locally
+        res._full_query = datasource.get_query().__deepcopy__()
+        return res
 
     def _get_all(self, datasource: "Datasource", include_metadata: bool) -> QueryResult:
-        has_next_page = True
-        after = None
-        res = QueryResult([], datasource, [])
-        # TODO: smarter batch sizing. Query a constant size at first
-        #       On next queries adjust depending on the amount of metadata columns
+        res = QueryResult([], datasource, [], stats=QueryStats())
 
         progress = get_rich_progress(rich.progress.MofNCompleteColumn())
         total_task = progress.add_task("Downloading metadata...", total=None)
 
         with progress:
-            while has_next_page:
-                resp = self._datasource_query(datasource, include_metadata, self.FULL_LIST_PAGE_SIZE, after)
-                has_next_page = resp["pageInfo"]["hasNextPage"]
-                after = resp["pageInfo"]["endCursor"]
-
-                new_entries = QueryResult.from_gql_query(resp, datasource)
-                res.entries += new_entries.entries
+            for new_entries in self.iter_pages(datasource, include_metadata, res.stats):
+                res._extend_entries(new_entries.entries)
                 res.fields = new_entries.fields
                 res.query_data_time = new_entries.query_data_time
                 progress.update(total_task, advance=len(new_entries.entries), refresh=True)
 
         return res
 
+    def iter_pages(
+        self, datasource: "Datasource", include_metadata: bool = True, stats: Optional[QueryStats] = None
+    ) -> Iterator[QueryResult]:
+        """
+        Queries all datapoints of the datasource, returning them page by page.
+        The pages are requested as they're iterated over, so only one page needs to be in memory at a time.
+
+        Args:
+            datasource: Datasource to query
+            include_metadata: Whether to include the metadata of the datapoints
+            stats: Stats object to record the stats of the requests into
+        """
+        has_next_page = True
+        after = None
+        if stats is None:
+            stats = QueryStats()
+        # TODO: smarter batch sizing. Query a constant size at first
+        #       On next queries adjust depending on the amount of metadata columns
+        while has_next_page:
+            resp, page = self._query_page(datasource, include_metadata, self.FULL_LIST_PAGE_SIZE, after, stats)
+            has_next_page = resp["pageInfo"]["hasNextPage"]
+            after = resp["pageInfo"]["endCursor"]
+            yield page
+
     def _exec(
         self,
         query: GqlQuery,
         params: Optional[Dict[str, Any]] = None,
         validate=True,
+        stats: Optional[RequestStats] = None,
     ) -> Dict[str, Any]:
+        """
+        Args:
+            stats: Stats object to record the stats of the request into.
+                If specified, the caller is responsible for emitting the stats with :func:`emit_request_stats`,
+                otherwise they're emitted once the request is done.
+        """
         logger.debug(f"Executing query: {query}")
-        if params is not None:
+        # Params of mutations can have tens of thousands of entries, only format them if they're going to be logged
+        if params is not None and logger.isEnabledFor(logging.DEBUG):
             logger.debug(f"Params: {params}")
         if validate:
             query.validate_params(params if params else {}, self.query_introspection)
         q = gql.gql(query.generate())
+        emit_stats = stats is None
+        if stats is None:
+            stats = RequestStats(operation=query.operation_name)
+        self._thread_local.request_stats = stats
+        start = time.perf_counter()
         try:
             resp = self.client.execute(q, variable_values=params)
         except TransportQueryError as e:
             raise DataEngineGqlError(e, self.client.transport.response_headers.get("X-DagsHub-Support-Id"))
+        finally:
+            stats.total_time = time.perf_counter() - start
+            self._thread_local.request_stats = None
+            if emit_stats:
+                emit_request_stats(stats)
         return resp
 
+    def _query_page(
+        self,
+        datasource: "Datasource",
+        include_metadata: bool,
+        limit: Optional[int],
+        after: Optional[str],
+        stats: QueryStats,
+    ) -> Tuple[Dict[str, Any], QueryResult]:
+        """
+        Queries a page of datapoints, recording the stats of the request into ``stats``
+
+        Returns:
+            The raw response + the parsed QueryResult of this page
+        """
+        request_stats = RequestStats(operation="datasourceQuery")
+        try:
+            resp = self._datasource_query(datasource, include_metadata, limit, after, stats=request_stats)
+            start = time.perf_counter()
+            page = QueryResult.from_gql_query(resp, datasource)
+            request_stats.parse_time = time.perf_counter() - start
+        finally:
+            stats.requests.append(request_stats)
+            emit_request_stats(request_stats)
+        return resp, page
+
     def _datasource_query(
-        self, datasource: "Datasource", include_metadata: bool, limit: Optional[int] = None, after: Optional[str] = None
+        self,
+        datasource: "Datasource",
+        include_metadata: bool,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        stats: Optional[RequestStats] = None,
     ):
         send_analytics_event("Client_DataEngine_QueryRun", repo=datasource.source.repoApi)
 
@@ -203,7 +331,7 @@ class DataClient:
             first=limit,
             after=after,
         )
-        return self._exec(q, params)["datasourceQuery"]
+        return self._exec(q, params, stats=stats)["datasourceQuery"]
 
     @property
     def query_introspection(self) -> TypesIntrospection:
@@ -216,13 +344,16 @@ class DataClient:
             )
         return self._known_introspections[self.host]
 
-    def update_metadata(self, datasource: "Datasource", entries: List["DatapointMetadataUpdateEntry"]):
+    def update_metadata(
+        self, datasource: "Datasource", entries: List[Union["DatapointMetadataUpdateEntry", SerializedEntry]]
+    ):
         """
         Update the Datasource with the metadata entry
 
         Args:
             datasource (Datasource): The datasource instance to be updated
-            entries (List[DatapointMetadataUpdateEntry]): The new metadata entries
+            entries (List[DatapointMetadataUpdateEntry]): The new metadata entries.
+                Entries can also be already serialized dictionaries.
 
         Returns:
             Updates the Datasource.
@@ -234,11 +365,13 @@ class DataClient:
         assert len(entries) > 0
 
         params = GqlMutations.update_metadata_params(
-            datasource_id=datasource.source.id, datapoints=[e.to_dict() for e in entries]
+            datasource_id=datasource.source.id, datapoints=serialize_metadata_update_entries(entries)
         )
         return self._exec(q, params)
 
-    def delete_metadata_for_datapoint(self, datasource: "Datasource", entries: List["DatapointDeleteMetadataEntry"]):
+    def delete_metadata_for_datapoint(
+        self, datasource: "Datasource", entries: List[Union["DatapointDeleteMetadataEntry", SerializedEntry]]
+    ):
         """
         Delete a metadata from a datapoint
 
@@ -256,11 +389,13 @@ class DataClient:
         assert len(entries) > 0
 
         params = GqlMutations.delete_metadata_params(
-            datasource_id=datasource.source.id, datapoints=[e.to_dict() for e in entries]
+            datasource_id=datasource.source.id, datapoints=serialize_delete_metadata_entries(entries)
         )
         return self._exec(q, params)
 
-    def delete_datapoints(self, datasource: "Datasource", entries: List["DatapointDeleteEntry"]):
+    def delete_datapoints(
+        self, datasource: "Datasource", entries: List[Union["DatapointDeleteEntry", SerializedEntry]]
+    ):
         """
         Delete a datapoints from the datasource.
 
@@ -275,7 +410,7 @@ class DataClient:
         assert len(entries) > 0
 
         params = GqlMutations.delete_datapoints_params(
-            datasource_id=datasource.source.id, datapoints=[e.to_dict() for e in entries]
+            datasource_id=datasource.source.id, datapoints=serialize_delete_entries(entries)
         )
         return self._exec(q, params)
 
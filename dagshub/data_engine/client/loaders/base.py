@@ -1,14 +1,97 @@
+import hashlib
 import logging
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from types import FunctionType
-from typing import List, Union
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple, Union
 
 from pathlib import Path
-from multiprocessing import Pool, Process
 
 from dagshub.common.api.repo import PathNotFoundError
+from dagshub.common.download import _dagshub_download_stream
 
 logger = logging.getLogger(__name__)
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Directory in the savedir with the lock files that keep processes from downloading the same file at the same time
+_LOCKS_DIR_NAME = ".dagshub_locks"
+
+
+@contextmanager
+def _file_lock(lock_path: Path):
+    """
+    Prevents multiple processes from holding the lock at the same time.
+    On Windows there's no locking between processes.
+    """
+    if fcntl is None:
+        yield
+        return
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class _OrderedPrefetcher:
+    """
+    Downloads the datapoints that are going to be accessed next, keeping ``window`` of them ahead of the accesses.
+
+    Args:
+        order: Indices of the datapoints, in the order they're going to be accessed
+        fetch: Function that downloads the datapoint at an index
+        window: How many datapoints to download ahead
+        num_threads: How many datapoints to download at the same time
+    """
+
+    def __init__(self, order: Sequence[int], fetch: Callable[[int], None], window: int, num_threads: int):
+        self._order = order
+        self._positions: Dict[int, int] = {}
+        for pos, idx in enumerate(order):
+            self._positions.setdefault(idx, pos)
+        self._fetch = fetch
+        self._window = window
+        self._cursor = 0
+        self._scheduled = 0
+        self._pending: Deque[Future] = deque()
+        self._executor = ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix="dataset-prefetch")
+
+    def on_access(self, idx: int):
+        if self._cursor < len(self._order) and self._order[self._cursor] == idx:
+            self._cursor += 1
+        elif idx in self._positions:
+            # The accesses went out of the expected order, continue from the accessed datapoint
+            self._cursor = self._positions[idx] + 1
+        self._scheduled = max(self._scheduled, self._cursor)
+
+        while self._pending and self._pending[0].done():
+            self._pending.popleft()
+        end = min(self._cursor + self._window, len(self._order))
+        while self._scheduled < end:
+            self._pending.append(self._executor.submit(self._prefetch, self._order[self._scheduled]))
+            self._scheduled += 1
+
+    def _prefetch(self, idx: int):
+        try:
+            self._fetch(idx)
+        except Exception as e:
+            # The access of the datapoint downloads it again and raises the error
+            logger.debug(f"Couldn't prefetch datapoint {idx}: {e}")
+
+    def close(self):
+        for future in self._pending:
+            future.cancel()
+        self._executor.shutdown(wait=False)
+
 
 class DagsHubDataset:
     def __init__(
@@ -21,6 +104,7 @@ class DagsHubDataset:
         savedir: str = None,
         processes: int = 8,
         for_dataloader: bool = False,
+        prefetch_window: int = 32,
     ):
         """
         Initialize a dataset using the specified parameters.
@@ -34,8 +118,10 @@ class DagsHubDataset:
         tensorizers (Union[str, List[Union[str, FunctionType]], FunctionType], optional):
             Tensorization strategy - auto|image|<function>. Defaults to "auto".
         savedir (str, optional): Location where the dataset is stored. Defaults to None.
-        processes (int, optional): number of parallel processes that download the dataset. Defaults to 8.
+        processes (int, optional): number of threads that download the dataset in parallel. Defaults to 8.
         for_dataloader (bool, optional): Whether the dataset is used in a dataloader context. Defaults to False.
+        prefetch_window (int, optional): When used in a dataloader, how many of the next datapoints of the sampler
+            every dataloader worker downloads ahead of accessing them. 0 to disable prefetching. Defaults to 32.
 
         """
         self.metadata_columns = metadata_columns
@@ -54,6 +140,10 @@ class DagsHubDataset:
         self.datasource_root = Path(self.entries[0].path_in_repo.as_posix()[: -len(self.entries[0].path)])
         self.processes = processes
         self.order = None
+        self.prefetch_window = prefetch_window
+        # Batches of indices of the current epoch, in the order of the sampler
+        self._epoch_batches: Optional[List[List[int]]] = None
+        self._init_download_state()
         self.file_columns = file_columns or self._get_file_columns()
 
         self.tensorizers = (
@@ -68,13 +158,37 @@ class DagsHubDataset:
         elif strategy == "background":
             if for_dataloader:
                 return
-            Process(target=self.pull).start()
+            self.pull_in_background()
         elif strategy != "lazy":
             logger.warning("Invalid download strategy (none from preload|background|lazy); defaulting to lazy.")
 
     def __len__(self) -> int:
         return len(self.entries)
 
+    def _init_download_state(self):
+        # Files that are being downloaded by a thread of this process. Other threads that need them wait for the event
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._in_flight_lock = threading.Lock()
+        self._download_state_pid = os.getpid()
+        self._prefetcher: Optional[_OrderedPrefetcher] = None
+
+    def _get_download_state(self):
+        # The state of the parent process isn't valid in a forked dataloader worker:
+        # the locks might've been held by threads that don't exist in the worker
+        if self._download_state_pid != os.getpid():
+            self._init_download_state()
+        return self._in_flight, self._in_flight_lock
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ("_in_flight", "_in_flight_lock", "_download_state_pid", "_prefetcher"):
+            state.pop(key, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_download_state()
+
     def _get_file_columns(self):
         logger.warning("Manually detecting file columns; this may take a second.")
 
@@ -99,6 +213,36 @@ class DagsHubDataset:
                 pass
         return res
 
+    def set_epoch_order(self, batches: List[List[int]]):
+        """
+        Sets the batches of indices that the dataloader is going to access in the current epoch,
+        so the datapoints can be downloaded ahead of the access.
+        Has to be called before the dataloader starts its workers.
+        """
+        self._epoch_batches = batches
+        if self._prefetcher is not None:
+            self._prefetcher.close()
+            self._prefetcher = None
+
+    def _worker_split(self) -> Tuple[int, int]:
+        """
+        Returns the id of the current dataloader worker, and the number of workers.
+        The batches are distributed to the workers round-robin.
+        """
+        return 0, 1
+
+    def _get_prefetcher(self) -> Optional[_OrderedPrefetcher]:
+        if self._epoch_batches is None or self.prefetch_window <= 0:
+            return None
+        self._get_download_state()
+        if self._prefetcher is None:
+            worker_id, num_workers = self._worker_split()
+            order = [idx for batch in self._epoch_batches[worker_id::num_workers] for idx in batch]
+            self._prefetcher = _OrderedPrefetcher(
+                order, lambda i: self._download(self.entries[i]), self.prefetch_window, self.processes
+            )
+        return self._prefetcher
+
     def get(self, idx: int) -> list:
         """
         Retrieve data associated with a specific index in the dataset.
@@ -112,6 +256,9 @@ class DagsHubDataset:
         out = []
         entry = self.entries[idx]
 
+        prefetcher = self._get_prefetcher()
+        if prefetcher is not None:
+            prefetcher.on_access(idx)
         self._download(entry)
         out.append((self.savedir / entry.path).as_posix())
         for idx, column in enumerate(self.metadata_columns):
@@ -130,36 +277,82 @@ class DagsHubDataset:
             return self.tensorizers(self.get(idx))
 
     def pull(self) -> None:
+        """
+        Downloads all the files of the dataset, in the order of the sampler if it's set, using ``processes`` threads.
+        Files that :func:`get` is already downloading aren't downloaded again, and vice versa.
+        """
         if self.order is not None:
             entries = [self.entries[idx] for idx in self.order]
             self.order = None
         else:
             entries = self.entries
 
-        with Pool(processes=self.processes) as p:
-            p.map(self._download, entries, 1)
+        with ThreadPoolExecutor(max_workers=self.processes, thread_name_prefix="dataset-pull") as tp:
+            for _ in tp.map(self._download, entries):
+                pass
         logger.info("Dataset download complete!")
 
+    def pull_in_background(self) -> threading.Thread:
+        """
+        Starts :func:`pull` in a background thread
+        """
+
+        def _pull():
+            try:
+                self.pull()
+            except Exception as e:
+                logger.warning(f"Background download of the dataset failed: {e}")
+
+        thread = threading.Thread(target=_pull, name="dataset-background-pull", daemon=True)
+        thread.start()
+        return thread
+
     def _download(self, datapoint) -> None:
         paths = [
             datapoint.path,
             *[datapoint.metadata.get(column) for column in self.file_columns],
         ]
-
         for path in paths:
-            (self.savedir / Path(path).parent).mkdir(parents=True, exist_ok=True)
-            if not (self.savedir / path).is_file():
-                if self.source == "repo":
-                    data = self.repo.get_file(f"{self.datasource_root}/{path}")
-                else:
-                    data = self.repo.get_storage_file(
-                        f"{'/'.join(list(self.datasource.source.path_parts().values())[:2])}"
-                        f"/{self.datasource_root}/{path}"
-                    )
+            self._download_file(path)
+
+    def _download_file(self, path: str) -> None:
+        filepath = self.savedir / path
+        in_flight, in_flight_lock = self._get_download_state()
+        while not filepath.is_file():
+            with in_flight_lock:
+                event = in_flight.get(path)
+                is_owner = event is None
+                if is_owner:
+                    event = in_flight[path] = threading.Event()
+            if not is_owner:
+                # Another thread is downloading the file. If it fails, one of the waiting threads tries again
+                event.wait()
+                continue
+            try:
+                # Other processes (dataloader workers, another dataset on the same savedir) might be downloading it too
+                lock_path = self.savedir / _LOCKS_DIR_NAME / (hashlib.sha1(path.encode()).hexdigest() + ".lock")
+                with _file_lock(lock_path):
+                    if not filepath.is_file():
+                        self._fetch(path, filepath)
+            finally:
+                with in_flight_lock:
+                    del in_flight[path]
+                event.set()
+
+    def _fetch(self, path: str, filepath: Path) -> None:
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        if self.source == "repo":
+            url = self.repo.raw_api_url(f"{self.datasource_root}/{path}")
+        else:
+            url = self.repo.storage_raw_api_url(
+                f"{'/'.join(list(self.datasource.source.path_parts().values())[:2])}" f"/{self.datasource_root}/{path}"
+            )
 
-                filepath = self.savedir / path
-                with open(filepath, "wb") as file:
-                    file.write(data)
+        # Streamed through the shared download scheduler, into a part file that's moved once it's complete
+        part_path = filepath.with_name(filepath.name + ".part")
+        with open(part_path, "wb") as file:
+            _dagshub_download_stream(url, self.repo.auth, file)
+        os.replace(part_path, filepath)
 
     def _get_tensorizers(self, datatypes: Union[str, List[Union[str, FunctionType]]]) -> FunctionType:
         if datatypes in ["auto", "guess"]:  # guess is an easter egg argument
@@ -1,5 +1,4 @@
 import random
-from multiprocessing import Process
 from typing import TYPE_CHECKING, Union
 
 from dagshub.common.util import lazy_load
@@ -46,7 +45,7 @@ class TensorFlowDataLoader(tf.keras.utils.Sequence):
 
         self.dataset.builder.order = self.indices
         if self.dataset.builder.strategy == "background":
-            Process(target=self.dataset.builder.pull).start()
+            self.dataset.builder.pull_in_background()
 
     def __len__(self) -> int:
         return self.dataset.__len__() // self.batch_size
@@ -1,6 +1,5 @@
-from multiprocessing import Process
 from dagshub.common.util import lazy_load
-from typing import TYPE_CHECKING, Union, Any
+from typing import TYPE_CHECKING, Union, Any, Iterable, List, Optional
 from dagshub.data_engine.client.loaders.base import DagsHubDataset
 
 torch = lazy_load("torch")
@@ -17,6 +16,34 @@ class PyTorchDataset(DagsHubDataset, torch.utils.data.Dataset):
         super().__init__(*args, **kwargs)
         self.type = "torch"
 
+    def _worker_split(self):
+        worker_info = torch.utils.data.get_worker_info()
+        if worker_info is None:
+            return 0, 1
+        return worker_info.id, worker_info.num_workers
+
+
+class _EpochOrderSampler:
+    """
+    Replays the batches of indices of the current epoch.
+
+    The dataloader iterates over its index sampler more than once per epoch
+    (the multiprocessing iterator does it again after starting the workers),
+    and a shuffling sampler would give a different order every time.
+    The order is generated once per epoch in :func:`PyTorchDataLoader.__iter__`,
+    and given to the dataset before the workers start, so the workers get it together with the dataset.
+    """
+
+    def __init__(self, sampler, batches: List[Any]):
+        self.sampler = sampler
+        self.batches = batches
+
+    def __iter__(self):
+        return iter(self.batches)
+
+    def __len__(self):
+        return len(self.sampler)
+
 
 class _BaseDataLoaderIter:
     def __next__(self) -> Any:
@@ -39,9 +66,27 @@ class PyTorchDataLoader(torch.utils.data.DataLoader):
     def __init__(self, *args, post_hook=lambda x: x, **kwargs):
         super().__init__(*args, **kwargs)
         self.post_hook = post_hook
+        self._epoch_batches: Optional[List[Any]] = None
         self.dataset.order = list(self.sampler)
         if self.dataset.strategy == "background":
-            Process(target=self.dataset.pull).start()
+            self.dataset.pull_in_background()
+
+    def __iter__(self):
+        if isinstance(self.dataset, DagsHubDataset):
+            # Workers that persist between epochs keep the order of the epoch they were started in
+            self._epoch_batches = None
+            batches = list(self._index_sampler)
+            self._epoch_batches = batches
+            self.dataset.set_epoch_order([list(batch) if isinstance(batch, Iterable) else [batch] for batch in batches])
+        return super().__iter__()
+
+    @property
+    def _index_sampler(self):
+        sampler = super()._index_sampler
+        # Also accessed from the constructor of the dataloader, before the attribute is set
+        if getattr(self, "_epoch_batches", None) is None:
+            return sampler
+        return _EpochOrderSampler(sampler, self._epoch_batches)
 
     def _get_iterator(self) -> "_BaseDataLoaderIter":
         if self.num_workers == 0:
@@ -19,6 +19,7 @@ class GqlQuery:
         self.return_field: str = ""
         self.query_field: str = ""
         self.operation_field: str = ""
+        self.operation_name: str = ""
         self.fragment_field: str = ""
         self.params_validators: List[ParamValidator] = []
 
@@ -83,6 +84,7 @@ class GqlQuery:
         self, query_type: str = "query", name: str = "", input: Dict[str, Union[str, int]] = {}, queries: List[str] = []
     ):
         self.operation_field = query_type
+        self.operation_name = name if name != "" else query_type
         if name != "":
             self.operation_field = f"{self.operation_field} {name}"
             self.operation_field = self.build_input(input, self.operation_field)
@@ -0,0 +1,50 @@
+"""
+Serialization of the entries sent in the Data Engine mutations.
+
+Produces the same dictionaries as ``DataClassJsonMixin.to_dict()`` of the entries,
+but without going through the generic (and slow for big batches) dataclasses_json machinery.
+Dictionaries that are already serialized are passed through as is.
+"""
+
+from typing import TYPE_CHECKING, Any, Dict, List, Union
+
+if TYPE_CHECKING:
+    from dagshub.data_engine.model.datasource import (
+        DatapointMetadataUpdateEntry,
+        DatapointDeleteMetadataEntry,
+        DatapointDeleteEntry,
+    )
+
+SerializedEntry = Dict[str, Any]
+
+
+def serialize_metadata_update_entries(
+    entries: List[Union["DatapointMetadataUpdateEntry", SerializedEntry]],
+) -> List[SerializedEntry]:
+    res = []
+    append = res.append
+    for e in entries:
+        if type(e) is dict:
+            append(e)
+            continue
+        d = {
+            "url": e.url,
+            "key": e.key,
+            "value": e.value,
+            "valueType": e.valueType.value,
+            "allowMultiple": e.allowMultiple,
+        }
+        if e.timeZone is not None:
+            d["timeZone"] = e.timeZone
+        append(d)
+    return res
+
+
+def serialize_delete_metadata_entries(
+    entries: List[Union["DatapointDeleteMetadataEntry", SerializedEntry]],
+) -> List[SerializedEntry]:
+    return [e if type(e) is dict else {"datapointId": e.datapointId, "key": e.key} for e in entries]
+
+
+def serialize_delete_entries(entries: List[Union["DatapointDeleteEntry", SerializedEntry]]) -> List[SerializedEntry]:
+    return [e if type(e) is dict else {"datapointId": e.datapointId} for e in entries]
@@ -0,0 +1,141 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+RequestStatsCallback = Callable[["RequestStats"], None]
+
+_request_stats_callbacks: List[RequestStatsCallback] = []
+
+
+@dataclass
+class RequestStats:
+    """
+    Timings and sizes of a single request to the Data Engine. All times are in seconds.
+    """
+
+    operation: str
+    """Name of the GraphQL operation"""
+    total_time: float = 0.0
+    """Time from sending the request until the response was decoded"""
+    time_to_headers: Optional[float] = None
+    """
+    Time until the headers of the response were received.
+    This is the time that the server took to process the request + the network latency.
+    """
+    download_time: Optional[float] = None
+    """Time it took to download the body of the response"""
+    json_decode_time: Optional[float] = None
+    """Time it took to decode the JSON of the response"""
+    parse_time: Optional[float] = None
+    """Time it took to convert the response into client objects (e.g. datapoints). None if there was nothing to parse"""
+    request_bytes: Optional[int] = None
+    """Size of the body of the request"""
+    response_bytes: Optional[int] = None
+    """Size of the body of the response"""
+    retries: int = 0
+    """Number of times the request was retried on the transport level"""
+
+    def __str__(self):
+        parts = [f"{self.operation}: total {self.total_time:.3f}s"]
+        if self.time_to_headers is not None:
+            parts.append(f"time to headers {self.time_to_headers:.3f}s")
+        if self.download_time is not None:
+            parts.append(f"download {self.download_time:.3f}s")
+        if self.json_decode_time is not None:
+            parts.append(f"json decode {self.json_decode_time:.3f}s")
+        if self.parse_time is not None:
+            parts.append(f"parse {self.parse_time:.3f}s")
+        if self.request_bytes is not None:
+            parts.append(f"sent {self.request_bytes}B")
+        if self.response_bytes is not None:
+            parts.append(f"received {self.response_bytes}B")
+        if self.retries:
+            parts.append(f"retries {self.retries}")
+        return ", ".join(parts)
+
+
+@dataclass
+class QueryStats:
+    """
+    Statistics of all the requests that were made to get a :class:`.QueryResult`
+    """
+
+    requests: List[RequestStats] = field(default_factory=list)
+    """Stats of each request, in the order they were made"""
+
+    @property
+    def pages(self) -> int:
+        """Number of requests (pages) that were made"""
+        return len(self.requests)
+
+    @property
+    def total_time(self) -> float:
+        """Time spent on the requests, including parsing the responses"""
+        return sum(r.total_time + (r.parse_time or 0.0) for r in self.requests)
+
+    @property
+    def time_to_headers(self) -> float:
+        return sum(r.time_to_headers or 0.0 for r in self.requests)
+
+    @property
+    def download_time(self) -> float:
+        return sum(r.download_time or 0.0 for r in self.requests)
+
+    @property
+    def json_decode_time(self) -> float:
+        return sum(r.json_decode_time or 0.0 for r in self.requests)
+
+    @property
+    def parse_time(self) -> float:
+        return sum(r.parse_time or 0.0 for r in self.requests)
+
+    @property
+    def response_bytes(self) -> int:
+        return sum(r.response_bytes or 0 for r in self.requests)
+
+    @property
+    def retries(self) -> int:
+        return sum(r.retries for r in self.requests)
+
+    def __str__(self):
+        return (
+            f"{self.pages} request(s): total {self.total_time:.3f}s, "
+            f"time to headers {self.time_to_headers:.3f}s, download {self.download_time:.3f}s, "
+            f"json decode {self.json_decode_time:.3f}s, parse {self.parse_time:.3f}s, "
+            f"received {self.response_bytes}B, retries {self.retries}"
+        )
+
+
+def add_request_stats_callback(callback: RequestStatsCallback):
+    """
+    Register a function that gets called with the :class:`RequestStats` of every request made to the Data Engine.
+
+    The callback is called from the thread that made the request.
+    The stats are also logged on the DEBUG level to the ``dagshub.data_engine.client.stats`` logger.
+
+    Args:
+        callback: function that receives the stats of a request
+    """
+    _request_stats_callbacks.append(callback)
+
+
+def remove_request_stats_callback(callback: RequestStatsCallback):
+    """
+    Unregister a callback registered with :func:`add_request_stats_callback`
+    """
+    _request_stats_callbacks.remove(callback)
+
+
+def emit_request_stats(stats: RequestStats):
+    """
+    :meta private:
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Data Engine request stats: {stats}", extra={"request_stats": stats})
+    for callback in _request_stats_callbacks:
+        try:
+            callback(stats)
+        except Exception as e:
+            logger.warning(f"Request stats callback {callback} failed: {e}")
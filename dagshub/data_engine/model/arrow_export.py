@@ -0,0 +1,171 @@
+"""
+Conversion of datapoints into Arrow record batches, to export query results without building a pandas dataframe.
+
+:meta private:
+"""
+
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+from dagshub.common.util import lazy_load
+from dagshub.data_engine.annotation import MetadataAnnotations
+from dagshub.data_engine.dtypes import MetadataFieldType
+from dagshub.data_engine.model.blob_ref import BlobRef
+
+if TYPE_CHECKING:
+    import datasets as hf_ds
+    import pyarrow as pa
+    from dagshub.data_engine.client.models import MetadataSelectFieldSchema
+    from dagshub.data_engine.model.datapoint import Datapoint
+else:
+    hf_ds = lazy_load("datasets")
+    pa = lazy_load("pyarrow")
+
+logger = logging.getLogger(__name__)
+
+# How many values of a column to look at to infer its type, when the field type doesn't determine it
+_INFER_SAMPLE_SIZE = 100
+
+
+def _arrow_type(value_type: MetadataFieldType) -> "pa.DataType":
+    if value_type == MetadataFieldType.BOOLEAN:
+        return pa.bool_()
+    if value_type == MetadataFieldType.INTEGER:
+        return pa.int64()
+    if value_type == MetadataFieldType.FLOAT:
+        return pa.float64()
+    if value_type == MetadataFieldType.DATETIME:
+        # Values can have different UTC offsets, a column can only have one time zone
+        return pa.timestamp("ms", tz="UTC")
+    return pa.string()
+
+
+def to_arrow_value(value: Any) -> Any:
+    """
+    Converts a metadata value into a value that Arrow can store
+    """
+    if isinstance(value, MetadataAnnotations):
+        task = value.to_ls_task()
+        return task.decode("utf-8") if task is not None else None
+    if isinstance(value, BlobRef):
+        return str(value.path()) if value.cache_on_disk else value.hash
+    if isinstance(value, Path):
+        return str(value)
+    if isinstance(value, memoryview):
+        return value.tobytes()
+    return value
+
+
+class ArrowBatchConverter:
+    """
+    Converts datapoints into Arrow record batches.
+
+    The schema is decided on the first batch, all the following batches are converted into the same schema,
+    so they can be written into one file.
+
+    Args:
+        fields: Fields of the query result, their types determine the types of the columns
+        columns: Metadata fields to convert into columns. By default, all the ``fields``
+        path_fn: Function that returns the value of the ``path`` column of a datapoint
+        with_ids: Add a ``datapoint_id`` column after the ``path`` column
+    """
+
+    def __init__(
+        self,
+        fields: List["MetadataSelectFieldSchema"],
+        columns: Optional[Sequence[str]] = None,
+        path_fn: Optional[Callable[["Datapoint"], str]] = None,
+        with_ids: bool = False,
+    ):
+        self._fields: Dict[str, "MetadataSelectFieldSchema"] = {f.name: f for f in fields}
+        if columns is None:
+            columns = sorted(self._fields.keys())
+        self.columns = [c for c in columns if c not in ("path", "datapoint_id")]
+        self.path_fn = path_fn if path_fn is not None else lambda dp: dp.path
+        self.with_ids = with_ids
+        self.schema: Optional["pa.Schema"] = None
+
+    def convert(self, datapoints: Sequence["Datapoint"]) -> "pa.RecordBatch":
+        values = {"path": [self.path_fn(dp) for dp in datapoints]}
+        if self.with_ids:
+            values["datapoint_id"] = [dp.datapoint_id for dp in datapoints]
+        for column in self.columns:
+            values[column] = [to_arrow_value(dp.metadata.get(column)) for dp in datapoints]
+        if self.schema is None:
+            self.schema = pa.schema([pa.field(name, self._column_type(name, vals)) for name, vals in values.items()])
+        arrays = [pa.array(values[f.name], type=f.type) for f in self.schema]
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+    def _column_type(self, name: str, values: List[Any]) -> "pa.DataType":
+        if name == "path":
+            return pa.string()
+        if name == "datapoint_id":
+            return pa.int64()
+        field = self._fields.get(name)
+        if field is not None and field.valueType != MetadataFieldType.BLOB:
+            value_type = _arrow_type(field.valueType)
+            return pa.list_(value_type) if field.multiple else value_type
+        # Blobs are hashes, paths or contents depending on how they were loaded, look at the values
+        sample = [v for v in values[:_INFER_SAMPLE_SIZE] if v is not None]
+        inferred = pa.array(sample).type
+        return inferred if inferred != pa.null() else pa.string()
+
+
+def convert_in_batches(
+    converter: ArrowBatchConverter, datapoints: Sequence["Datapoint"], batch_size: int
+) -> Iterable["pa.RecordBatch"]:
+    """
+    Converts the datapoints in batches of ``batch_size``. Always returns at least one (possibly empty) batch
+    """
+    if len(datapoints) == 0:
+        yield converter.convert([])
+    for start in range(0, len(datapoints), batch_size):
+        yield converter.convert(datapoints[start : start + batch_size])
+
+
+def hf_dataset_from_batches(
+    batches: Iterable["pa.RecordBatch"], cache_dir: Optional[Union[str, Path]] = None, name: Optional[str] = None
+) -> "hf_ds.Dataset":
+    """
+    Creates a HuggingFace dataset from the record batches.
+
+    Args:
+        batches: Record batches, all with the same schema
+        cache_dir: If specified, the batches are written into an Arrow file in this directory one by one,
+            and the dataset is memory-mapped from the file. Otherwise, the dataset is kept in memory.
+        name: Name of the Arrow file in ``cache_dir``. An existing file with this name is replaced,
+            once all the batches are written. If not specified, a new file with a unique name is created.
+    """
+    if cache_dir is None:
+        return hf_ds.Dataset(pa.Table.from_batches(list(batches)))
+
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_dir / f"dagshub-export-{uuid.uuid4().hex}.arrow"
+    writer = None
+    try:
+        for batch in batches:
+            if writer is None:
+                writer = pa.ipc.new_stream(str(path), batch.schema)
+            writer.write_batch(batch)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        path.unlink(missing_ok=True)
+        raise
+    if writer is None:
+        raise ValueError("No record batches to create the dataset from")
+    writer.close()
+    if name is not None:
+        # Datasets loaded from the replaced file keep reading the old contents from their memory map
+        named_path = cache_dir / f"{name}.arrow"
+        try:
+            os.replace(path, named_path)
+            path = named_path
+        except OSError as e:
+            # Windows doesn't allow replacing a file that's memory-mapped by a loaded dataset
+            logger.warning(f"Couldn't replace {named_path}, the dataset is stored in {path} instead: {e}")
+    return hf_ds.Dataset.from_file(str(path))
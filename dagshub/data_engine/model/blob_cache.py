@@ -0,0 +1,333 @@
+"""
+Machine-wide cache of metadata blobs (annotations, documents, binary fields).
+
+Blobs are content-addressed, so the same blob is stored only once,
+no matter how many datasources, datasets or processes use it.
+The cache is stored at ``<cache location>/<first 2 chars of hash>/<hash>``.
+
+When the cache grows over its size budget, the least recently used blobs get deleted.
+Recency is tracked with the modification time of the files, which is refreshed on every cache hit.
+"""
+
+import logging
+import mmap
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, List, Set, Tuple, Union, TYPE_CHECKING
+
+from dagshub.common import config
+from dagshub.common.helpers import sizeof_fmt
+from dagshub.common.util import lazy_load
+
+if TYPE_CHECKING:
+    import numpy as np
+else:
+    np = lazy_load("numpy")
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+_valid_blob_hash = re.compile(r"^[\w\-]+$")
+
+# Refreshing the recency of a blob on every hit would mean a write to the filesystem on every read
+_TOUCH_INTERVAL_SECONDS = 60
+# Evict down to this fraction of the budget, so the eviction doesn't run again right after the next write
+_EVICTION_LOW_WATERMARK = 0.9
+# Fraction of the budget that can be written before the size is recalculated, to account for other processes' writes
+_RESCAN_FRACTION = 0.05
+_TMP_PREFIX = ".tmp-"
+_LOCK_FILE_NAME = ".lock"
+_NPY_MAGIC = b"\x93NUMPY"
+
+
+class BlobCache:
+    """
+    Content-addressed blob cache with a size budget and LRU eviction.
+    Safe to use from multiple threads and processes at the same time.
+
+    Args:
+        location: Directory of the cache
+        max_size: Size budget of the cache in bytes. ``0`` or less means that the cache is unlimited
+    """
+
+    def __init__(self, location: Union[str, Path], max_size: int):
+        self.location = Path(location)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        # Estimate of the size of the cache. Other processes can also write to the cache,
+        # so the real size is recalculated every once in a while, and before the eviction
+        self._size: Optional[int] = None
+        self._written_since_scan = 0
+        # Blobs that were handed out while pinning() is active aren't evicted by this process until it ends
+        self._pin_depth = 0
+        self._pinned: Set[str] = set()
+
+    def path(self, blob_hash: str) -> Path:
+        """
+        Returns where the blob is (or would be) stored in the cache
+        """
+        if not _valid_blob_hash.match(blob_hash):
+            raise ValueError(f"Invalid blob hash {blob_hash!r}")
+        return self.location / blob_hash[:2] / blob_hash
+
+    def get_path(self, blob_hash: str) -> Optional[Path]:
+        """
+        Returns the path of the blob if it's in the cache, marking it as recently used, or None if it's not cached.
+
+        .. note::
+            The file can be deleted by the eviction later on,
+            so read it soon, or load it with :func:`read` instead.
+        """
+        path = self.path(blob_hash)
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        self._pin(path)
+        now = time.time()
+        if now - stat.st_mtime > _TOUCH_INTERVAL_SECONDS:
+            try:
+                os.utime(path, (now, now))
+            except FileNotFoundError:
+                return None
+        return path
+
+    def read(self, blob_hash: str, memory_map: bool = False) -> Optional[Union[bytes, memoryview]]:
+        """
+        Returns the contents of the blob, or None if it's not in the cache
+
+        Args:
+            blob_hash: hash of the blob
+            memory_map: return a read-only memoryview over the memory-mapped file, instead of reading it into memory.
+                The mapping stays valid even if the blob gets evicted afterwards.
+        """
+        path = self.get_path(blob_hash)
+        if path is None:
+            return None
+        try:
+            if memory_map:
+                return map_file(path)
+            with path.open("rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            # Got evicted in the meantime
+            return None
+
+    def put(self, blob_hash: str, content: bytes) -> Path:
+        """
+        Stores the blob in the cache, evicting least recently used blobs if the cache goes over the budget.
+
+        The write is atomic: other readers either see the whole blob, or don't see it at all.
+
+        Returns:
+            Path of the blob in the cache
+        """
+        path = self.path(blob_hash)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=_TMP_PREFIX)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        self._pin(path)
+        if self.max_size > 0:
+            with self._lock:
+                self._written_since_scan += len(content)
+                if self._size is None or self._written_since_scan > self.max_size * _RESCAN_FRACTION:
+                    self._size = self._scan_size()
+                    self._written_since_scan = 0
+                else:
+                    self._size += len(content)
+                over_budget = self._size > self.max_size
+            if over_budget:
+                self.evict()
+        return path
+
+    @contextmanager
+    def pinning(self):
+        """
+        While active, the blobs that are stored or looked up in the cache aren't evicted by this process,
+        so their paths stay valid until the operation that got them returns.
+        If the pinned blobs alone are over the budget, the cache stays over the budget until the pins are released.
+        """
+        with self._lock:
+            self._pin_depth += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pin_depth -= 1
+                if self._pin_depth == 0:
+                    self._pinned.clear()
+
+    def _pin(self, path: Path):
+        with self._lock:
+            if self._pin_depth > 0:
+                self._pinned.add(str(path))
+
+    def evict(self):
+        """
+        Deletes least recently used blobs until the size of the cache is under the budget.
+        Pinned blobs (see :func:`pinning`) aren't deleted.
+        """
+        target_size = int(self.max_size * _EVICTION_LOW_WATERMARK)
+        with self._lock, self._process_lock():
+            entries = self._scan()
+            size = sum(e[2] for e in entries)
+            if size > self.max_size:
+                entries.sort(key=lambda e: e[0])
+                evicted = 0
+                for _, path, file_size in entries:
+                    if size <= target_size:
+                        break
+                    if path in self._pinned:
+                        continue
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                    except PermissionError:
+                        # On Windows files that are memory-mapped can't be deleted
+                        continue
+                    size -= file_size
+                    evicted += 1
+                logger.debug(f"Evicted {evicted} blobs from the blob cache at {self.location}")
+                if size > self.max_size and self._pinned:
+                    logger.warning(
+                        f"The blobs in use are bigger than the size budget of the blob cache at {self.location} "
+                        f"({sizeof_fmt(size)} > {sizeof_fmt(self.max_size)}). "
+                        f"Increase DAGSHUB_DE_BLOB_CACHE_MAX_SIZE to keep the cache within the budget"
+                    )
+            self._size = size
+            self._written_since_scan = 0
+
+    def clear(self):
+        """
+        Deletes all blobs from the cache
+        """
+        with self._lock, self._process_lock():
+            for _, path, _ in self._scan():
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            self._size = 0
+
+    @property
+    def size(self) -> int:
+        """
+        Total size of the blobs in the cache in bytes
+        """
+        return self._scan_size()
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        """
+        Returns (last use time, path, size) of all blobs in the cache
+        """
+        res = []
+        try:
+            shards = list(os.scandir(self.location))
+        except FileNotFoundError:
+            return res
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            try:
+                files = list(os.scandir(shard.path))
+            except FileNotFoundError:
+                continue
+            for entry in files:
+                if entry.name.startswith(_TMP_PREFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                res.append((stat.st_mtime, entry.path, stat.st_size))
+        return res
+
+    def _scan_size(self) -> int:
+        return sum(e[2] for e in self._scan())
+
+    @contextmanager
+    def _process_lock(self):
+        """
+        Prevents multiple processes from running the eviction at the same time
+        """
+        if fcntl is None:
+            yield
+            return
+        self.location.mkdir(parents=True, exist_ok=True)
+        with open(self.location / _LOCK_FILE_NAME, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def map_file(path: Union[str, Path]) -> memoryview:
+    """
+    Returns a read-only memoryview over the memory-mapped file.
+    The pages are shared with the OS page cache, so reading the same file multiple times doesn't copy it.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files can't be mapped
+            return memoryview(b"")
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def map_array(path: Union[str, Path], dtype=None) -> "np.ndarray":
+    """
+    Returns a read-only NumPy array backed by the memory-mapped file.
+
+    Files in the ``.npy`` format (saved with ``numpy.save()``) are loaded with their dtype and shape.
+    Otherwise the file is treated as a flat array of ``dtype``.
+    """
+    with open(path, "rb") as f:
+        is_npy = f.read(len(_NPY_MAGIC)) == _NPY_MAGIC
+    if is_npy:
+        return np.load(path, mmap_mode="r")
+    if dtype is None:
+        raise ValueError(f"{path} is not an .npy file, specify the dtype of the array")
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+_blob_cache: Optional[BlobCache] = None
+_blob_cache_lock = threading.Lock()
+
+
+def get_blob_cache() -> BlobCache:
+    """
+    Returns the blob cache configured with
+    ``DAGSHUB_DE_BLOB_CACHE_LOCATION`` and ``DAGSHUB_DE_BLOB_CACHE_MAX_SIZE`` (in bytes).
+    """
+    global _blob_cache
+    with _blob_cache_lock:
+        location = Path(config.dataengine_blob_cache_location)
+        if (
+            _blob_cache is None
+            or _blob_cache.location != location
+            or _blob_cache.max_size != config.dataengine_blob_cache_max_size
+        ):
+            _blob_cache = BlobCache(location, config.dataengine_blob_cache_max_size)
+        return _blob_cache
@@ -0,0 +1,174 @@
+import logging
+import threading
+import weakref
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, List, Sequence, Union, TYPE_CHECKING
+
+from dagshub.data_engine.model.blob_cache import map_array
+
+if TYPE_CHECKING:
+    import numpy as np
+    from dagshub.data_engine.model.datapoint import Datapoint
+
+logger = logging.getLogger(__name__)
+
+
+class BlobRef:
+    """
+    Reference to a blob that gets downloaded on first access.
+
+    Get the contents with :func:`get` (or ``bytes(ref)``), or the path of the blob in the cache with :func:`path`.
+
+    The contents aren't kept in memory after they're returned, so holding many references doesn't take up memory.
+    If the blob is stored in the :mod:`blob cache <dagshub.data_engine.model.blob_cache>`,
+    repeated accesses read it from the disk.
+    """
+
+    def __init__(self, blob_hash: str, url: str, auth, cache_on_disk: bool = True):
+        self.hash = blob_hash
+        """Hash of the blob"""
+        self.url = url
+        """URL to download the blob from"""
+        self.cache_on_disk = cache_on_disk
+        """Whether the blob gets stored in the blob cache once downloaded"""
+        self._auth = auth
+        self._lock = threading.Lock()
+        self._prefetch_future: Optional[Future] = None
+        # Contents of a prefetched blob that isn't cached on disk.
+        # Released once returned, or when the prefetcher moves past the datapoint
+        self._prefetched: Optional[bytes] = None
+
+    def get(self, memory_map: bool = False) -> Union[bytes, memoryview]:
+        """
+        Returns the contents of the blob, downloading it if needed
+
+        Args:
+            memory_map: return a read-only ``memoryview`` over the memory-mapped file of the blob in the cache,
+                instead of reading it into a new ``bytes`` object. Requires the blob to be cached on disk.
+        """
+        if memory_map and not self.cache_on_disk:
+            raise ValueError("Memory mapping blobs requires them to be cached on disk")
+        self._wait_for_prefetch()
+        with self._lock:
+            content, self._prefetched = self._prefetched, None
+            if content is not None:
+                # Allow prefetching it again the next time
+                self._prefetch_future = None
+        if content is not None:
+            return content
+        return self._download(return_blob=True, memory_map=memory_map)
+
+    def as_array(self, dtype=None) -> "np.ndarray":
+        """
+        Returns the blob as a read-only NumPy array backed by the memory-mapped file of the blob in the cache.
+        See :func:`Datapoint.get_blob_array() <dagshub.data_engine.model.datapoint.Datapoint.get_blob_array>`.
+        """
+        return map_array(self.path(), dtype)
+
+    def path(self) -> Path:
+        """
+        Returns the path of the blob in the blob cache, downloading it if needed
+        """
+        if not self.cache_on_disk:
+            raise RuntimeError("Blob isn't cached on disk, use get() to get its contents")
+        self._wait_for_prefetch()
+        return self._download(return_blob=False)
+
+    def prefetch(self, executor: ThreadPoolExecutor):
+        """
+        Starts downloading the blob in the background on ``executor``, if it's not downloaded already.
+        """
+        with self._lock:
+            if self._prefetch_future is not None or self._prefetched is not None:
+                return
+            self._prefetch_future = executor.submit(self._prefetch)
+
+    def release_prefetched(self):
+        """
+        Drops the prefetched contents of the blob, and cancels its prefetch if it didn't start yet.
+        The blob gets downloaded again if it's accessed later.
+        """
+        with self._lock:
+            self._prefetched = None
+            future, self._prefetch_future = self._prefetch_future, None
+        if future is not None:
+            future.cancel()
+
+    def _prefetch(self):
+        if self.cache_on_disk:
+            self._download(return_blob=False)
+        else:
+            content = self._download(return_blob=True)
+            with self._lock:
+                # Don't keep the contents if the prefetch got released while downloading
+                if self._prefetch_future is not None:
+                    self._prefetched = content
+
+    def _wait_for_prefetch(self):
+        future = self._prefetch_future
+        if future is None:
+            return
+        try:
+            exc = future.exception()
+        except CancelledError:
+            return
+        if exc is not None:
+            # Download it again on the current thread, this will raise the error if it's not intermittent
+            logger.debug(f"Prefetching blob {self.hash} failed: {exc}")
+            with self._lock:
+                self._prefetch_future = None
+
+    def _download(self, return_blob: bool, memory_map: bool = False):
+        from dagshub.data_engine.model.datapoint import _get_blob
+
+        res = _get_blob(self.url, self.hash, self._auth, self.cache_on_disk, return_blob, memory_map=memory_map)
+        if type(res) is str:
+            raise RuntimeError(f"Error while downloading blob: {res}")
+        return res
+
+    def __bytes__(self):
+        return self.get()
+
+    def __repr__(self):
+        return f"BlobRef({self.hash})"
+
+
+class BlobPrefetcher:
+    """
+    Downloads the blobs of the next ``window`` datapoints in the background, while the datapoints are iterated over.
+
+    :meta private:
+    """
+
+    def __init__(self, entries: Sequence["Datapoint"], fields: List[str], window: int, num_proc: int):
+        self.entries = entries
+        self.fields = fields
+        self.window = window
+        self._executor = ThreadPoolExecutor(max_workers=num_proc, thread_name_prefix="blob-prefetch")
+        weakref.finalize(self, self._executor.shutdown, wait=False)
+        self._scheduled_until = 0
+        # Prefetched blobs of the datapoints in the window
+        self._scheduled: Dict[int, List[BlobRef]] = {}
+
+    def advance(self, index: int):
+        """
+        Called when the datapoint at ``index`` is reached, schedules the datapoints up to ``index + window``.
+        The blobs of the datapoints outside of the window get released,
+        so only the blobs of at most ``window + 1`` datapoints are kept in memory.
+        """
+        if index < self._scheduled_until - self.window:
+            # Iteration started over
+            self._scheduled_until = index
+        end = min(index + self.window + 1, len(self.entries))
+        for i in range(max(index, self._scheduled_until), end):
+            metadata = self.entries[i].metadata
+            refs = [value for value in (metadata.get(fld) for fld in self.fields) if isinstance(value, BlobRef)]
+            for ref in refs:
+                ref.prefetch(self._executor)
+            self._scheduled[i] = refs
+        self._scheduled_until = max(self._scheduled_until, end)
+
+        for i in [i for i in self._scheduled if not index <= i < end]:
+            for ref in self._scheduled.pop(i):
+                ref.release_prefetched()
@@ -1,4 +1,5 @@
 import datetime
+import io
 import logging
 from dataclasses import dataclass
 from os import PathLike
@@ -8,13 +9,20 @@ from typing import Optional, Union, List, Dict, Any, Callable, TYPE_CHECKING, Li
 from tenacity import Retrying, stop_after_attempt, wait_exponential, before_sleep_log, retry_if_exception_type
 
 from dagshub.common.download import download_files
+from dagshub.common.download_scheduler import get_download_scheduler
 from dagshub.common.helpers import http_request
+from dagshub.common.util import lazy_load
 from dagshub.data_engine.annotation import MetadataAnnotations
 from dagshub.data_engine.client.models import MetadataSelectFieldSchema, DatapointHistoryResult
 from dagshub.data_engine.dtypes import MetadataFieldType
+from dagshub.data_engine.model.blob_cache import get_blob_cache, map_file, map_array, _NPY_MAGIC
+from dagshub.data_engine.model.blob_ref import BlobRef
 
 if TYPE_CHECKING:
+    import numpy as np
     from dagshub.data_engine.model.datasource import Datasource
+else:
+    np = lazy_load("numpy")
 
 _generated_fields: Dict[str, Callable[["Datapoint"], Any]] = {
     "path": lambda dp: dp.path,
@@ -147,7 +155,9 @@ class Datapoint:
         res_dict.update({key: self.metadata.get(key) for key in metadata_keys})
         return res_dict
 
-    def get_blob(self, column: str, cache_on_disk=True, store_value=False) -> bytes:
+    def get_blob(
+        self, column: str, cache_on_disk=True, store_value=False, memory_map=False
+    ) -> Union[bytes, memoryview]:
         """
         Returns the blob stored in a binary column
 
@@ -158,17 +168,36 @@ class Datapoint:
                 The contents of datapoint[column] will change to be the path of the blob on the disk.
             store_value: whether to store the blob in memory on the field attached to this datapoint,
                 which will make its value accessible later using datapoint[column]
+            memory_map: return a read-only ``memoryview`` over the memory-mapped file of the blob
+                instead of reading it into a new ``bytes`` object.
+                Repeated reads of the same blob share the OS page cache instead of copying the blob.
+                Requires ``cache_on_disk``.
         """
+        if memory_map and not cache_on_disk:
+            raise ValueError("Memory mapping blobs requires them to be cached on disk")
+
         current_value = self.metadata[column]
 
         if type(current_value) is bytes:
             # Bytes - it's already there!
-            return current_value
+            return memoryview(current_value) if memory_map else current_value
+        if type(current_value) is memoryview:
+            # Memory-mapped blob that was loaded before
+            return current_value if memory_map else bytes(current_value)
+        if isinstance(current_value, BlobRef):
+            # Lazy reference - download it now
+            content = current_value.get(memory_map=memory_map)
+            if store_value:
+                self.metadata[column] = content
+            return content
         if isinstance(current_value, Path):
             # Path - assume the path exists and is already downloaded,
             #   because it's unlikely that the user has set it themselves
-            with current_value.open("rb") as f:
-                content = f.read()
+            if memory_map:
+                content = map_file(current_value)
+            else:
+                with current_value.open("rb") as f:
+                    content = f.read()
             if store_value:
                 self.metadata[column] = content
             return content
@@ -176,25 +205,64 @@ class Datapoint:
         elif type(current_value) is str:
             # String - This is probably the hash of the blob, get that from dagshub
             blob_url = self.blob_url(current_value)
-            blob_location = self.blob_cache_location / current_value
-
-            # Make sure that the cache location exists
-            if cache_on_disk:
-                self.blob_cache_location.mkdir(parents=True, exist_ok=True)
 
-            content = _get_blob(blob_url, blob_location, self.datasource.source.repoApi.auth, cache_on_disk, True)
+            content = _get_blob(
+                blob_url,
+                current_value,
+                self.datasource.source.repoApi.auth,
+                cache_on_disk,
+                True,
+                memory_map=memory_map,
+            )
             if type(content) is str:
                 raise RuntimeError(f"Error while downloading blob: {content}")
 
             if store_value:
                 self.metadata[column] = content
             elif cache_on_disk:
-                self.metadata[column] = blob_location
+                self.metadata[column] = get_blob_cache().path(current_value)
 
             return content
         else:
             raise ValueError(f"Can't extract blob metadata from value {current_value} of type {type(current_value)}")
 
+    def get_blob_array(self, column: str, dtype=None) -> "np.ndarray":
+        """
+        Returns the blob stored in a binary column as a read-only NumPy array,
+        backed by the memory-mapped file of the blob in the blob cache, without copying it into memory.
+
+        Blobs in the ``.npy`` format (saved with ``numpy.save()``) are loaded with their dtype and shape.
+        Otherwise, the blob is treated as a flat array of ``dtype``.
+
+        The contents of datapoint[column] will change to be the path of the blob on the disk.
+
+        Args:
+            column: where to get the blob from
+            dtype: dtype of the array, for blobs that aren't in the ``.npy`` format
+        """
+        current_value = self.metadata[column]
+
+        if type(current_value) in (bytes, memoryview):
+            if bytes(current_value[: len(_NPY_MAGIC)]) == _NPY_MAGIC:
+                return np.load(io.BytesIO(current_value))
+            if dtype is None:
+                raise ValueError(f"Blob in column {column} is not an .npy file, specify the dtype of the array")
+            return np.frombuffer(current_value, dtype=dtype)
+        if isinstance(current_value, BlobRef):
+            return current_value.as_array(dtype)
+        if isinstance(current_value, Path):
+            return map_array(current_value, dtype)
+        elif type(current_value) is str:
+            blob_path = _get_blob(
+                self.blob_url(current_value), current_value, self.datasource.source.repoApi.auth, True, False
+            )
+            if type(blob_path) is str:
+                raise RuntimeError(f"Error while downloading blob: {blob_path}")
+            self.metadata[column] = blob_path
+            return map_array(blob_path, dtype)
+        else:
+            raise ValueError(f"Can't extract blob metadata from value {current_value} of type {type(current_value)}")
+
     def download_file(
         self, target: Optional[Union[PathLike, str]] = None, keep_source_prefix=True, redownload=False
     ) -> PathLike:
@@ -236,8 +304,11 @@ class Datapoint:
         return target_path
 
     @property
-    def blob_cache_location(self):
-        return self.datasource.default_dataset_location / ".metadata_blobs"
+    def blob_cache_location(self) -> Path:
+        """
+        Location of the machine-wide blob cache, shared between all datasources
+        """
+        return get_blob_cache().location
 
     def blob_url(self, sha):
         return self.datasource.source.blob_path(sha)
@@ -251,6 +322,12 @@ class Datapoint:
         """
         Get the timestamps of all versions of this datapoint, where the specified fields have changed.
 
+        .. note::
+            To get the versions of many datapoints, use
+            :func:`QueryResult.get_version_timestamps() \
+            <dagshub.data_engine.model.query_result.QueryResult.get_version_timestamps>`\
+            instead, which requests them in batches.
+
         Args:
             fields: List of fields to check for changes. If None, all fields are checked.
             from_time: Only search versions since this time. If None, the start time is unbounded
@@ -265,35 +342,44 @@ class Datapoint:
 
 def _get_blob(
     url: Optional[str],
-    cache_path: Optional[Path],
+    blob_hash: Optional[str],
     auth,
     cache_on_disk: bool,
     return_blob: bool,
     path_format: Literal["str", "path"] = "path",
-) -> Optional[Union[Path, str, bytes]]:
+    memory_map: bool = False,
+) -> Optional[Union[Path, str, bytes, memoryview]]:
     """
     Args:
         url: url to download the blob from
-        cache_path: where the cache for the blob is (laods from it if exists, stores there if it doesn't)
+        blob_hash: hash of the blob, under which it's stored in the :mod:`blob cache <.blob_cache>`
         auth: auth to use for getting the blob
         cache_on_disk: whether to store the downloaded blob on disk. If False we also turn off the cache checking
         return_blob: if True returns the blob of the downloaded data, if False returns the path to the file with it
+        memory_map: if True (and return_blob and cache_on_disk are True),
+            returns a memoryview over the memory-mapped file in the cache instead of bytes
     """
     if url is None:
         return None
-    assert cache_path is not None
+    assert blob_hash is not None
+
+    blob_cache = get_blob_cache()
 
-    if cache_on_disk and cache_path.exists():
+    if cache_on_disk:
         if return_blob:
-            with cache_path.open("rb") as f:
-                return f.read()
+            content = blob_cache.read(blob_hash, memory_map=memory_map)
+            if content is not None:
+                return content
         else:
-            if path_format == "str":
-                cache_path = str(cache_path)
-            return cache_path
+            cache_path = blob_cache.get_path(blob_hash)
+            if cache_path is not None:
+                return str(cache_path) if path_format == "str" else cache_path
 
     def get():
-        resp = http_request("GET", url, auth=auth)
+        with get_download_scheduler().request() as req:
+            resp = http_request("GET", url, auth=auth)
+            req.response(resp)
+            req.received(len(resp.content))
         if 200 <= resp.status_code < 300:
             return resp.content
         elif resp.status_code == 404:
@@ -315,11 +401,13 @@ def _get_blob(
     except Exception as e:
         return f"Error while downloading binary blob: {e}"
 
+    cache_path = None
     if cache_on_disk:
-        with cache_path.open("wb") as f:
-            f.write(content)
+        cache_path = blob_cache.put(blob_hash, content)
 
     if return_blob:
+        if memory_map and cache_path is not None:
+            return map_file(cache_path)
         return content
     else:
         if path_format == "str":
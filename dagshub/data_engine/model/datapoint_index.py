@@ -0,0 +1,52 @@
+import heapq
+from collections import defaultdict
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from dagshub.data_engine.model.datapoint import Datapoint
+
+
+class DatapointFieldIndex:
+    """
+    Index of datapoints by the value of a metadata field, for fast equality lookups.
+
+    Datapoints with unhashable values (e.g. lists of multi-value fields) are kept aside and get checked on every lookup.
+
+    :meta private:
+    """
+
+    def __init__(self, field: str, datapoints: Iterable["Datapoint"] = ()):
+        self.field = field
+        # Datapoints are kept with the order they were added in, so lookups return them in that order
+        self._index: Dict[Any, List[Tuple[int, "Datapoint"]]] = defaultdict(list)
+        self._unhashable: List[Tuple[int, "Datapoint"]] = []
+        self._size = 0
+        self.add(datapoints)
+
+    def add(self, datapoints: Iterable["Datapoint"]):
+        index = self._index
+        field = self.field
+        for position, dp in enumerate(datapoints, start=self._size):
+            value = dp.metadata.get(field)
+            try:
+                index[value].append((position, dp))
+            except TypeError:
+                self._unhashable.append((position, dp))
+            self._size = position + 1
+
+    def candidates(self, value: Any) -> List["Datapoint"]:
+        """
+        Returns the datapoints that had ``value`` in the field at the time they were indexed,
+        in the order they were added to the index.
+
+        The field could have been changed since then,
+        so the candidates need to be checked against the current value of the field.
+        """
+        try:
+            res = self._index.get(value, [])
+        except TypeError:
+            res = []
+        if self._unhashable:
+            res = heapq.merge(res, self._unhashable, key=itemgetter(0))
+        return [dp for _, dp in res]
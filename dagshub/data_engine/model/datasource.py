@@ -1,14 +1,17 @@
+import asyncio
 import base64
 import datetime
+import hashlib
 import json
 import logging
-import tempfile
 import math
+import tempfile
 import os.path
 import threading
 import time
 import uuid
 import webbrowser
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from contextlib import contextmanager
 from dataclasses import dataclass, field
 from os import PathLike
@@ -16,9 +19,12 @@ from pathlib import Path
 from typing import Any, Dict, List, Optional, TYPE_CHECKING, Union, Set, ContextManager, Tuple, Literal, Callable
 
 
+import requests
 import rich.progress
 from dataclasses_json import config, LetterCase, DataClassJsonMixin
+from gql.transport.exceptions import TransportServerError
 from pathvalidate import sanitize_filepath
+from tenacity import Retrying, stop_after_attempt, wait_exponential, before_sleep_log, retry_if_exception
 
 import dagshub.common.config
 from dagshub.common import rich_console
@@ -36,6 +42,8 @@ from dagshub.data_engine.client.models import (
     DatasetResult,
 )
 from dagshub.data_engine.dtypes import MetadataFieldType
+from dagshub.data_engine.model import parquet_snapshot
+from dagshub.data_engine.model.arrow_export import ArrowBatchConverter, convert_in_batches, hf_dataset_from_batches
 from dagshub.data_engine.model.datapoint import Datapoint
 from dagshub.data_engine.model.errors import (
     WrongOperatorError,
@@ -50,6 +58,9 @@ from dagshub.data_engine.model.metadata import (
     precalculate_metadata_info,
 )
 from dagshub.data_engine.model.metadata import wrap_bytes
+from dagshub.data_engine.model.metadata.buffer import MetadataUpdateBuffer
+from dagshub.data_engine.model.metadata.dataframe import convert_dataframe_columns
+from dagshub.data_engine.model.metadata.util import format_utc_offset
 from dagshub.data_engine.model.metadata_field_builder import MetadataFieldBuilder
 from dagshub.data_engine.model.query import QueryFilterTree
 from dagshub.data_engine.model.schema_util import metadataTypeLookup, metadataTypeLookupReverse
@@ -62,6 +73,7 @@ if TYPE_CHECKING:
     import mlflow
     import mlflow.entities
     import cloudpickle
+    import datasets as hf_ds
     import ngrok
 else:
     plugin_server_module = lazy_load("dagshub.data_engine.voxel_plugin_server.server")
@@ -70,6 +82,7 @@ else:
     pandas = lazy_load("pandas")
     ngrok = lazy_load("ngrok")
     cloudpickle = lazy_load("cloudpickle")
+    hf_ds = lazy_load("datasets")
 
 logger = logging.getLogger(__name__)
 
@@ -77,6 +90,8 @@ LS_ORCHESTRATOR_URL = "http://127.0.0.1"
 MLFLOW_DATASOURCE_TAG_NAME = "dagshub.datasets.datasource_id"
 MLFLOW_DATASET_TAG_NAME = "dagshub.datasets.dataset_id"
 
+_MAX_DATAPOINTS_IN_DELETE_PROMPT = 20
+
 
 @dataclass
 class DatapointMetadataUpdateEntry(DataClassJsonMixin):
@@ -306,6 +321,54 @@ class Datasource:
 
         return res
 
+    async def head_async(self, size=100, load_documents=True, load_annotations=True) -> "QueryResult":
+        """
+        ``async`` version of :func:`head`.
+        Multiple queries can be awaited concurrently on the same event loop.
+        They share one connection, which is closed once the last of them is done.
+
+        Documents and annotations are downloaded in a worker thread, so they don't block the event loop.
+
+        Args:
+            size: how many datapoints to get. Default is 100
+            load_documents: Automatically download all document blob fields
+            load_annotations: Automatically download all annotation blob fields
+        """
+        async with self._source.async_client.connection() as client:
+            await self._check_preprocess_async()
+            send_analytics_event("Client_DataEngine_DisplayTopResults", repo=self.source.repoApi)
+            res = await client.head(self, size)
+        await self._load_autoload_fields_async(res, documents=load_documents, annotations=load_annotations)
+        return res
+
+    async def all_async(self, load_documents=True, load_annotations=True) -> "QueryResult":
+        """
+        ``async`` version of :func:`all`.
+        Multiple queries can be awaited concurrently on the same event loop.
+        They share one connection, which is closed once the last of them is done.
+
+        Documents and annotations are downloaded in a worker thread, so they don't block the event loop.
+
+        Args:
+            load_documents: Automatically download all document blob fields
+            load_annotations: Automatically download all annotation blob fields
+        """
+        async with self._source.async_client.connection() as client:
+            await self._check_preprocess_async()
+            res = await client.get_datapoints(self)
+        self._autolog_mlflow(res)
+        await self._load_autoload_fields_async(res, documents=load_documents, annotations=load_annotations)
+        return res
+
+    @staticmethod
+    async def _load_autoload_fields_async(res: "QueryResult", documents: bool, annotations: bool):
+        if not documents and not annotations:
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, lambda: res._load_autoload_fields(documents=documents, annotations=annotations)
+        )
+
     def select(self, *selected: Union[str, Field]) -> "Datasource":
         """
         Select which fields should appear in the query result.
@@ -436,6 +499,13 @@ class Datasource:
 
     def _check_preprocess(self):
         self.source.get_from_dagshub()
+        self._warn_if_preprocessing()
+
+    async def _check_preprocess_async(self):
+        await self.source.get_from_dagshub_async()
+        self._warn_if_preprocessing()
+
+    def _warn_if_preprocessing(self):
         if (
             self.source.preprocessing_status == PreprocessingStatus.IN_PROGRESS
             or self.source.preprocessing_status == PreprocessingStatus.AUTO_SCAN_IN_PROGRESS
@@ -495,7 +565,7 @@ class Datasource:
         :meta private:
         """
         try:
-            self._upload_metadata(self.implicit_update_context.get_metadata_entries())
+            self._upload_metadata(self.implicit_update_context.metadata_buffer)
         finally:
             self.implicit_update_context.clear()
 
@@ -520,9 +590,11 @@ class Datasource:
             self._explicit_update_ctx = ctx
             yield ctx
             try:
-                entries = ctx.get_metadata_entries() + self.implicit_update_context.get_metadata_entries()
-                self._upload_metadata(entries)
+                metadata = ctx.metadata_buffer
+                metadata.extend(self.implicit_update_context.metadata_buffer)
+                self._upload_metadata(metadata)
             finally:
+                ctx.clear()
                 # Clear the implicit context because it can persist
                 self.implicit_update_context.clear()
                 # The explicit one created with with: can go away
@@ -576,8 +648,11 @@ class Datasource:
         if ingest_on_server:
             self._remote_upload_metadata_from_dataframe(df, path_column)
         else:
-            metadata = self._df_to_metadata(df, path_column, multivalue_fields=self._get_multivalue_fields())
-            self._upload_metadata(metadata)
+            metadata = self._df_to_metadata_buffer(df, path_column, multivalue_fields=self._get_multivalue_fields())
+            try:
+                self._upload_metadata(metadata)
+            finally:
+                metadata.clear()
 
     def _remote_upload_metadata_from_dataframe(
         self, df: "pandas.DataFrame", path_column: Optional[Union[str, int]] = None
@@ -598,9 +673,19 @@ class Datasource:
         return res
 
     def _df_to_metadata(
-        self, df: "pandas.DataFrame", path_column: Optional[Union[str, int]] = None, multivalue_fields=set()
+        self,
+        df: "pandas.DataFrame",
+        path_column: Optional[Union[str, int]] = None,
+        multivalue_fields: Optional[Set[str]] = None,
     ) -> List[DatapointMetadataUpdateEntry]:
-        res: List[DatapointMetadataUpdateEntry] = []
+        return self._df_to_metadata_buffer(df, path_column, multivalue_fields).get_entries()
+
+    def _df_to_metadata_buffer(
+        self,
+        df: "pandas.DataFrame",
+        path_column: Optional[Union[str, int]] = None,
+        multivalue_fields: Optional[Set[str]] = None,
+    ) -> MetadataUpdateBuffer:
         if path_column is None:
             path_column = df.columns[0]
         elif isinstance(path_column, str):
@@ -614,95 +699,17 @@ class Datasource:
             raise RuntimeError(f"Column {path_column} doesn't have strings")
 
         field_value_types = {f.name: f.valueType for f in self.fields}
-        document_fields = set(self.document_fields)
+        columns = convert_dataframe_columns(
+            df,
+            path_column,
+            field_value_types=field_value_types,
+            document_fields=set(self.document_fields),
+            multivalue_fields=set(multivalue_fields) if multivalue_fields is not None else set(),
+        )
 
-        for _, row in df.iterrows():
-            datapoint = row[path_column]
-            for key, val in row.items():
-                if key == path_column:
-                    continue
-                key = str(key)
-                if key in autogenerated_columns:
-                    continue
-                if val is None:
-                    continue
-                # Pandas specific: since pandas doesn't distinguish between None and NaN, don't upload it
-                if isinstance(val, float) and math.isnan(val):
-                    continue
-                # Pandas specific: Cast pandas Timestamp to datetime
-                if isinstance(val, list) or isinstance(val, pandas._libs.tslibs.timestamps.Timestamp):
-                    if isinstance(val, list):
-                        if isinstance(val[0], pandas._libs.tslibs.timestamps.Timestamp):
-                            val = [val.to_pydatetime() for val in val]
-                    else:
-                        val = val.to_pydatetime()
-                if isinstance(val, list):
-                    if key not in multivalue_fields:
-                        multivalue_fields.add(key)
-                        # Promote all the existing uploading metadata to multivalue
-                        for update_entry in res:
-                            if update_entry.key == key:
-                                update_entry.allowMultiple = True
-                    for sub_val in val:
-                        value_type = field_value_types.get(key)
-                        time_zone = None
-                        if value_type is None:
-                            value_type = metadataTypeLookup[type(sub_val)]
-                            field_value_types[key] = value_type
-                        # Don't override bytes if they're not bytes - probably just undownloaded values
-                        if value_type == MetadataFieldType.BLOB and not isinstance(sub_val, bytes):
-                            if key not in document_fields:
-                                continue
-                        # Pandas quirk - integers are floats on the backend
-                        if value_type == MetadataFieldType.INTEGER:
-                            sub_val = int(sub_val)
-                        if isinstance(sub_val, str) and key in document_fields:
-                            sub_val = sub_val.encode("utf-8")
-                        if isinstance(sub_val, bytes):
-                            sub_val = wrap_bytes(sub_val)
-                        if isinstance(sub_val, datetime.datetime):
-                            time_zone = _get_datetime_utc_offset(sub_val)
-                            sub_val = int(sub_val.timestamp() * 1000)
-                        res.append(
-                            DatapointMetadataUpdateEntry(
-                                url=datapoint,
-                                key=key,
-                                value=str(sub_val),
-                                valueType=value_type,
-                                allowMultiple=True,
-                                timeZone=time_zone,
-                            )
-                        )
-                else:
-                    value_type = field_value_types.get(key)
-                    if value_type is None:
-                        value_type = metadataTypeLookup[type(val)]
-                        field_value_types[key] = value_type
-                    # Don't override bytes if they're not bytes - probably just undownloaded values
-                    if value_type == MetadataFieldType.BLOB and not isinstance(val, bytes):
-                        if key not in document_fields:
-                            continue
-                    time_zone = None
-                    # Pandas quirk - integers are floats on the backend
-                    if value_type == MetadataFieldType.INTEGER:
-                        val = int(val)
-                    if isinstance(val, str) and key in document_fields:
-                        val = val.encode("utf-8")
-                    if isinstance(val, bytes):
-                        val = wrap_bytes(val)
-                    if isinstance(val, datetime.datetime):
-                        time_zone = _get_datetime_utc_offset(val)
-                        val = int(val.timestamp() * 1000)
-                    res.append(
-                        DatapointMetadataUpdateEntry(
-                            url=datapoint,
-                            key=key,
-                            value=str(val),
-                            valueType=value_type,
-                            allowMultiple=key in multivalue_fields,
-                            timeZone=time_zone,
-                        )
-                    )
+        # Values are converted column by column, but the entries are still added row by row
+        res = MetadataUpdateBuffer(multivalue_fields=multivalue_fields)
+        res.add_columns(df[path_column].tolist(), columns)
         return res
 
     def delete_source(self, force: bool = False):
@@ -775,44 +782,77 @@ class Datasource:
         logger.debug("Rescanning datasource")
         self.source.client.scan_datasource(self, options=options)
 
-    def _upload_metadata(self, metadata_entries: List[DatapointMetadataUpdateEntry]):
-        precalculated_info = precalculate_metadata_info(self, metadata_entries)
-        validate_uploading_metadata(precalculated_info)
-        run_preupload_transforms(self, metadata_entries, precalculated_info)
+    def _upload_metadata(self, metadata: Union[MetadataUpdateBuffer, List[DatapointMetadataUpdateEntry]]):
+        metadata = self._prepare_metadata_upload(metadata)
 
         progress = get_rich_progress(rich.progress.MofNCompleteColumn())
 
         upload_batch_size = dagshub.common.config.dataengine_metadata_upload_batch_size
-        total_entries = len(metadata_entries)
+        total_entries = len(metadata)
         total_task = progress.add_task(f"Uploading metadata (batch size {upload_batch_size})...", total=total_entries)
 
         with progress:
-            for start in range(0, total_entries, upload_batch_size):
-                entries = metadata_entries[start : start + upload_batch_size]
+            for entries in metadata.iter_payload_batches(upload_batch_size):
                 logger.debug(f"Uploading {len(entries)} metadata entries...")
                 self.source.client.update_metadata(self, entries)
-                progress.update(total_task, advance=upload_batch_size)
+                progress.update(total_task, advance=len(entries))
             progress.update(total_task, completed=total_entries, refresh=True)
 
         # Update the status from dagshub, so we get back the new metadata columns
         self.source.get_from_dagshub()
 
-    def delete_metadata_from_datapoints(self, datapoints: List[Datapoint], fields: List[str]):
+    def _prepare_metadata_upload(
+        self, metadata: Union[MetadataUpdateBuffer, List[DatapointMetadataUpdateEntry]]
+    ) -> MetadataUpdateBuffer:
+        """
+        Validates the metadata and runs the transforms that need to happen before uploading it
+        """
+        if not isinstance(metadata, MetadataUpdateBuffer):
+            metadata = MetadataUpdateBuffer.from_entries(metadata)
+        precalculated_info = precalculate_metadata_info(self, metadata)
+        validate_uploading_metadata(precalculated_info)
+        run_preupload_transforms(self, metadata, precalculated_info)
+        return metadata
+
+    def delete_metadata_from_datapoints(
+        self, datapoints: List[Datapoint], fields: List[str], dry_run: bool = False, num_proc: int = 4
+    ) -> int:
         """
         Delete metadata from datapoints.
         The deleted values can be accessed using versioned query with time set before the deletion
 
+        The deletion is sent in batches of ``DAGSHUB_DE_METADATA_UPLOAD_BATCH_SIZE`` entries,
+        with ``num_proc`` batches being sent concurrently.
+
         Args:
             datapoints: datapoints to delete metadata from
             fields: fields to delete
+            dry_run: Only report how much metadata would get deleted, without deleting anything
+            num_proc: number of batches to send in parallel
+
+        Returns:
+            Number of deleted (datapoint, field) pairs
         """
         metadata_entries = []
         for d in datapoints:
             for n in fields:
                 metadata_entries.append(DatapointDeleteMetadataEntry(datapointId=d.datapoint_id, key=n))
-        self.source.client.delete_metadata_for_datapoint(self, metadata_entries)
 
-    def delete_datapoints(self, datapoints: List[Datapoint], force: bool = False):
+        if dry_run:
+            self._log_dry_run_deletion(f"{len(fields)} field(s) of {len(datapoints)} datapoint(s)", metadata_entries)
+            return len(metadata_entries)
+
+        self._run_batched_mutation(
+            "Deleting metadata",
+            metadata_entries,
+            lambda batch: self.source.client.delete_metadata_for_datapoint(self, batch),
+            num_proc=num_proc,
+        )
+        return len(metadata_entries)
+
+    def delete_datapoints(
+        self, datapoints: List[Datapoint], force: bool = False, dry_run: bool = False, num_proc: int = 4
+    ) -> int:
         """
         Delete datapoints.
 
@@ -825,11 +865,28 @@ class Datasource:
         This will create a new datapoint with new id and new metadata records.
         - Datasource scanning will *not* add these datapoints back.
 
+        The deletion is sent in batches of ``DAGSHUB_DE_METADATA_UPLOAD_BATCH_SIZE`` datapoints,
+        with ``num_proc`` batches being sent concurrently.
+
         Args:
             datapoints: list of datapoints objects to delete
             force: Skip the confirmation prompt
+            dry_run: Only report how many datapoints would get deleted, without deleting anything
+            num_proc: number of batches to send in parallel
+
+        Returns:
+            Number of deleted datapoints
         """
-        dps_str = "\n\t".join([""] + [d.path for d in datapoints])
+        entries = [DatapointDeleteEntry(datapointId=d.datapoint_id) for d in datapoints]
+
+        if dry_run:
+            self._log_dry_run_deletion(f"{len(datapoints)} datapoint(s)", entries)
+            return len(entries)
+
+        shown_datapoints = datapoints[:_MAX_DATAPOINTS_IN_DELETE_PROMPT]
+        dps_str = "\n\t".join([""] + [d.path for d in shown_datapoints])
+        if len(datapoints) > len(shown_datapoints):
+            dps_str += f"\n\t...and {len(datapoints) - len(shown_datapoints)} more"
         prompt = (
             f"You are about to delete the following datapoint(s): {dps_str}\n"
             f"This will remove the datapoint and metadata from unversioned queries, "
@@ -839,11 +896,65 @@ class Datasource:
             user_response = prompt_user(prompt)
             if not user_response:
                 print("Deletion cancelled")
-                return
+                return 0
 
-        self.source.client.delete_datapoints(
-            self, [DatapointDeleteEntry(datapointId=d.datapoint_id) for d in datapoints]
+        self._run_batched_mutation(
+            "Deleting datapoints",
+            entries,
+            lambda batch: self.source.client.delete_datapoints(self, batch),
+            num_proc=num_proc,
         )
+        return len(entries)
+
+    @staticmethod
+    def _log_dry_run_deletion(description: str, entries: List[Any]):
+        batch_size = dagshub.common.config.dataengine_metadata_upload_batch_size
+        num_batches = math.ceil(len(entries) / batch_size)
+        log_message(f"Dry run: would delete {description} in {num_batches} batch(es) of up to {batch_size} entries")
+
+    def _run_batched_mutation(
+        self, description: str, entries: List[Any], mutation: Callable[[List[Any]], Any], num_proc: int
+    ):
+        """
+        Sends the entries in batches of ``DAGSHUB_DE_METADATA_UPLOAD_BATCH_SIZE`` using ``mutation``,
+        running ``num_proc`` batches in parallel. Batches that fail because of server or connection errors are retried.
+
+        If some batches fail, the rest of them still get sent, and then the first error gets raised.
+        """
+        batch_size = dagshub.common.config.dataengine_metadata_upload_batch_size
+        batches = [entries[start : start + batch_size] for start in range(0, len(entries), batch_size)]
+        if not batches:
+            return
+
+        def send_batch(batch: List[Any]):
+            for attempt in Retrying(
+                retry=retry_if_exception(_is_retryable_mutation_error),
+                stop=stop_after_attempt(5),
+                wait=wait_exponential(multiplier=1, min=4, max=10),
+                before_sleep=before_sleep_log(logger, logging.WARNING),
+                reraise=True,
+            ):
+                with attempt:
+                    logger.debug(f"{description}: sending {len(batch)} entries...")
+                    mutation(batch)
+
+        progress = get_rich_progress(rich.progress.MofNCompleteColumn())
+        task = progress.add_task(f"{description} (batch size {batch_size})...", total=len(entries))
+        errors = []
+        with progress:
+            with ThreadPoolExecutor(max_workers=num_proc) as tp:
+                futures = {tp.submit(send_batch, batch): batch for batch in batches}
+                for f in as_completed(futures):
+                    exc = f.exception()
+                    if exc is not None:
+                        errors.append(exc)
+                        logger.warning(f"Got exception {type(exc)} while sending a batch: {exc}")
+                    else:
+                        progress.update(task, advance=len(futures[f]))
+
+        if errors:
+            logger.error(f"{description}: {len(errors)} out of {len(batches)} batches failed")
+            raise errors[0]
 
     def save_dataset(self, name: str) -> "Datasource":
         """
@@ -1041,6 +1152,138 @@ class Datasource:
         """
         return self.all().to_voxel51_dataset(**kwargs)
 
+    def as_hf_dataset(
+        self,
+        target_dir: Optional[Union[str, PathLike]] = None,
+        download_datapoints=True,
+        download_blobs=True,
+        streaming=False,
+        cache_dir: Optional[Union[str, PathLike]] = None,
+        load_documents=True,
+        load_annotations=True,
+    ) -> Union["hf_ds.Dataset", "hf_ds.IterableDataset"]:
+        """
+        Exports the datapoints of the query as a HuggingFace dataset, page by page.
+
+        Unlike ``all().as_hf_dataset()``, the whole result never has to be in memory:
+        each page of the query is downloaded, converted into Arrow record batches and written into
+        an Arrow file in ``cache_dir``, from which the dataset is memory-mapped.
+
+        Refer to :func:`QueryResult.as_hf_dataset() \
+        <dagshub.data_engine.model.query_result.QueryResult.as_hf_dataset>`\
+        for the format of the dataset.
+
+        Args:
+            target_dir: Where to download the datapoints.
+            download_datapoints: Download the datapoint files and set the path column to their local paths
+            download_blobs: Download all blob fields and set the columns to the local paths of the blobs
+            streaming: Return an ``IterableDataset`` that queries the pages while it's being iterated over,
+                instead of exporting everything up front. Every iteration over the dataset runs the query again.
+            cache_dir: Directory to write the Arrow file of the dataset into.
+                Defaults to the ``dagshub`` directory in the HuggingFace datasets cache.
+                The file is named after the datasource, the query and the export arguments,
+                so exporting the same query again replaces the file of the previous export
+                instead of adding a new one. The path of the file is in ``dataset.cache_files``.
+            load_documents: Automatically download all document blob fields
+            load_annotations: Automatically download all annotation blob fields
+        """
+        self._check_preprocess()
+        send_analytics_event("Client_DataEngine_HFExport", repo=self.source.repoApi)
+
+        query = self.__deepcopy__()
+
+        def batches():
+            converter = None
+            for page in self._source.client.iter_pages(query):
+                page._load_autoload_fields(documents=load_documents, annotations=load_annotations)
+                if converter is None:
+                    converter = ArrowBatchConverter(page.fields)
+                yield from page._to_arrow_batches(
+                    target_dir, download_datapoints, download_blobs, len(page.entries) or 1, converter
+                )
+
+        if streaming:
+
+            def examples():
+                for batch in batches():
+                    yield from batch.to_pylist()
+
+            return hf_ds.IterableDataset.from_generator(examples)
+
+        if cache_dir is None:
+            cache_dir = Path(hf_ds.config.HF_DATASETS_CACHE) / "dagshub"
+        export_key = json.dumps(
+            [
+                self.source.id,
+                query.serialize_gql_query_input(),
+                str(target_dir),
+                download_datapoints,
+                download_blobs,
+                load_documents,
+                load_annotations,
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        name = f"dagshub-export-{hashlib.sha1(export_key.encode()).hexdigest()}"
+        return hf_dataset_from_batches(batches(), cache_dir, name=name)
+
+    def export_parquet(
+        self,
+        path: Union[str, PathLike],
+        row_group_size: int = parquet_snapshot.DEFAULT_ROW_GROUP_SIZE,
+        load_documents=True,
+        load_annotations=True,
+    ) -> Path:
+        """
+        Saves the datapoints of the query and their metadata into a Parquet file, page by page.
+
+        Unlike ``all().to_parquet()``, the whole result never has to be in memory:
+        each page of the query is converted and written into the file before the next one is requested.
+
+        Refer to :func:`QueryResult.to_parquet() <dagshub.data_engine.model.query_result.QueryResult.to_parquet>`
+        for the format of the file. The file can be loaded back with
+        :func:`QueryResult.from_parquet() <dagshub.data_engine.model.query_result.QueryResult.from_parquet>`.
+
+        Args:
+            path: Where to save the file
+            row_group_size: Amount of datapoints in a row group of the file
+            load_documents: Automatically download all document blob fields
+            load_annotations: Automatically download all annotation blob fields
+
+        Returns:
+            The path to the saved file
+        """
+        self._check_preprocess()
+        path = Path(path)
+        query = self.__deepcopy__()
+
+        writer: Optional[parquet_snapshot.SnapshotWriter] = None
+        converter: Optional[ArrowBatchConverter] = None
+        try:
+            for page in self._source.client.iter_pages(query):
+                page._load_autoload_fields(documents=load_documents, annotations=load_annotations)
+                if writer is None:
+                    converter = ArrowBatchConverter(page.fields, with_ids=True)
+                    metadata = parquet_snapshot.snapshot_metadata(
+                        query,
+                        query.get_query(),
+                        page.fields,
+                        page.query_data_time,
+                        page.annotation_fields if load_annotations else [],
+                        complete=True,
+                    )
+                    writer = parquet_snapshot.SnapshotWriter(path, metadata, row_group_size)
+                for batch in convert_in_batches(converter, page.entries, row_group_size):
+                    writer.write(batch)
+        except BaseException:
+            if writer is not None:
+                writer.abort()
+            raise
+        writer.close()
+        log_message(f"Query result saved to '{path}'")
+        return path
+
     @property
     def default_dataset_location(self) -> Path:
         """
@@ -1736,8 +1979,7 @@ class MetadataContextManager:
 
     def __init__(self, datasource: Datasource):
         self._datasource = datasource
-        self._metadata_entries: List[DatapointMetadataUpdateEntry] = []
-        self._multivalue_fields = datasource._get_multivalue_fields()
+        self._buffer = MetadataUpdateBuffer(multivalue_fields=datasource._get_multivalue_fields())
 
     def update_metadata(self, datapoints: Union[List[str], str], metadata: Dict[str, Any]):
         """
@@ -1781,14 +2023,9 @@ class MetadataContextManager:
                     continue
 
                 if isinstance(v, list):
-                    if k not in self._multivalue_fields:
-                        self._multivalue_fields.add(k)
-                        # Promote all existing ones to multivalue
-                        for e in self._metadata_entries:
-                            if e.key == k:
-                                e.allowMultiple = True
+                    # Promotes the already added values of the field to multivalue too
+                    self._buffer.mark_multivalue(k)
                     for sub_val in v:
-                        time_zone = None
                         value_type = field_value_types.get(k)
                         if value_type is None:
                             value_type = metadataTypeLookup[type(sub_val)]
@@ -1798,24 +2035,9 @@ class MetadataContextManager:
                         if value_type == MetadataFieldType.BLOB and not isinstance(sub_val, bytes):
                             if k not in document_fields:
                                 continue
-                        if isinstance(v, str) and k in document_fields:
-                            v = v.encode("utf-8")
-                        if isinstance(v, datetime.datetime):
-                            time_zone = _get_datetime_utc_offset(v)
-                            v = int(v.timestamp() * 1000)
-                        if isinstance(v, bytes):
-                            sub_val = wrap_bytes(sub_val)
-                        self._metadata_entries.append(
-                            DatapointMetadataUpdateEntry(
-                                url=dp,
-                                key=k,
-                                value=str(sub_val),
-                                # todo: preliminary type check
-                                valueType=value_type,
-                                allowMultiple=k in self._multivalue_fields,
-                                timeZone=time_zone,
-                            )
-                        )
+                        sub_val, time_zone = _convert_metadata_value(sub_val, k in document_fields)
+                        # todo: preliminary type check
+                        self._buffer.add(dp, k, sub_val, value_type, time_zone)
 
                 else:
                     value_type = field_value_types.get(k)
@@ -1827,35 +2049,48 @@ class MetadataContextManager:
                         if k not in document_fields:
                             continue
 
-                    time_zone = None
-                    if isinstance(v, str) and k in document_fields:
-                        v = v.encode("utf-8")
-                    if isinstance(v, bytes):
-                        v = wrap_bytes(v)
-                    if isinstance(v, datetime.datetime):
-                        time_zone = _get_datetime_utc_offset(v)
-                        v = int(v.timestamp() * 1000)
-
-                    self._metadata_entries.append(
-                        DatapointMetadataUpdateEntry(
-                            url=dp,
-                            key=k,
-                            value=str(v),
-                            valueType=value_type,
-                            # todo: preliminary type check
-                            allowMultiple=k in self._multivalue_fields,
-                            timeZone=time_zone,
-                        )
-                    )
+                    v, time_zone = _convert_metadata_value(v, k in document_fields)
+                    # todo: preliminary type check
+                    self._buffer.add(dp, k, v, value_type, time_zone)
+
+    @property
+    def metadata_buffer(self) -> MetadataUpdateBuffer:
+        """
+        Buffer with all the metadata updates of the context
+
+        :meta private:
+        """
+        return self._buffer
 
-    def get_metadata_entries(self):
-        return self._metadata_entries
+    def get_metadata_entries(self) -> List[DatapointMetadataUpdateEntry]:
+        return self._buffer.get_entries()
 
     def clear(self):
-        self._metadata_entries.clear()
+        self._buffer.clear()
 
     def __len__(self):
-        return len(self._metadata_entries)
+        return len(self._buffer)
+
+
+def _convert_metadata_value(v: Any, is_document: bool) -> Tuple[Any, Optional[str]]:
+    """
+    Converts a value into the form that gets uploaded. Returns the value and its time zone (for datetimes)
+    """
+    time_zone = None
+    if isinstance(v, str) and is_document:
+        v = v.encode("utf-8")
+    if isinstance(v, bytes):
+        v = wrap_bytes(v)
+    if isinstance(v, datetime.datetime):
+        time_zone = _get_datetime_utc_offset(v)
+        v = int(v.timestamp() * 1000)
+    return v, time_zone
+
+
+def _is_retryable_mutation_error(e: BaseException) -> bool:
+    if isinstance(e, TransportServerError):
+        return e.code is None or e.code >= 500 or e.code == 429
+    return isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
 
 
 def _get_datetime_utc_offset(t):
@@ -1870,11 +2105,7 @@ def _get_datetime_utc_offset(t):
     if offset is None:
         return None
 
-    # Format the offset as a string
-    offset_hours = int(offset.total_seconds() // 3600)
-    offset_minutes = int((offset.total_seconds() % 3600) // 60)
-    offset_str = f"{offset_hours:+03d}:{offset_minutes:02d}"
-    return offset_str
+    return format_utc_offset(offset.total_seconds())
 
 
 @dataclass
@@ -6,6 +6,7 @@ from pathlib import PurePosixPath, Path
 from typing import Optional, Union, Mapping, Any, Dict, List
 from os import PathLike
 from dagshub.common.api.repo import RepoAPI, PathNotFoundError
+from dagshub.data_engine.client.async_data_client import AsyncDataClient
 from dagshub.data_engine.client.data_client import DataClient
 from dagshub.data_engine.client.models import DatasourceType, DatasourceResult, PreprocessingStatus, MetadataFieldSchema
 from dagshub.data_engine.model.datapoint import Datapoint
@@ -45,6 +46,7 @@ class DatasourceState:
     metadata_fields: List[MetadataFieldSchema] = field(init=False)
 
     _revision: Optional[str] = field(init=False, default=None)
+    _async_client: Optional[AsyncDataClient] = field(init=False, default=None, repr=False, compare=False)
 
     def __post_init__(self):
         self.client = DataClient(self.repo)
@@ -62,6 +64,13 @@ class DatasourceState:
             self.revision = self.repoApi.default_branch
         return self._revision
 
+    @property
+    def async_client(self) -> AsyncDataClient:
+        """Client used by the ``async`` methods of the datasource. Created on first use"""
+        if self._async_client is None:
+            self._async_client = AsyncDataClient(self.repo)
+        return self._async_client
+
     @property
     def url(self) -> str:
         return multi_urljoin(self.repoApi.repo_url, f"datasets/datasource/{self.id}/gallery")
@@ -81,6 +90,13 @@ class DatasourceState:
 
     def get_from_dagshub(self):
         sources = self.client.get_datasources(self.id, self.name)
+        self._update_from_ds_results(sources)
+
+    async def get_from_dagshub_async(self):
+        sources = await self.async_client.get_datasources(self.id, self.name)
+        self._update_from_ds_results(sources)
+
+    def _update_from_ds_results(self, sources: List[DatasourceResult]):
         if len(sources) == 0:
             raise DatasourceNotFoundError(self)
         elif len(sources) > 1:
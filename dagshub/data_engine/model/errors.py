@@ -83,3 +83,12 @@ class LSInitializingError(Exception):
 
     def __str__(self):
         return "Label Studio on DagsHub is starting up! Please try again in a couple of seconds"
+
+
+class QueryNotLocallyEvaluableError(Exception):
+    def __init__(self, reason: str):
+        super().__init__()
+        self.reason = reason
+
+    def __str__(self):
+        return f"The query can't be evaluated on the local query result: {self.reason}"
@@ -0,0 +1,266 @@
+"""
+Evaluation of queries on an already fetched :class:`.QueryResult`, without sending requests to the server.
+
+The metadata of the datapoints is converted into columns (one ``pandas.Series`` per field),
+and the filters are evaluated on whole columns at once.
+
+:meta private:
+"""
+
+import datetime
+import json
+import operator
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from dagshub.common.util import lazy_load
+from dagshub.data_engine.dtypes import MetadataFieldType
+from dagshub.data_engine.model.errors import QueryNotLocallyEvaluableError
+from dagshub.data_engine.model.metadata.util import parse_utc_offset
+from dagshub.data_engine.model.query import QueryFilterTree
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas
+    from treelib import Node, Tree
+    from dagshub.data_engine.client.models import MetadataSelectFieldSchema
+    from dagshub.data_engine.model.datasource import DatasourceQuery
+else:
+    np = lazy_load("numpy")
+    pandas = lazy_load("pandas")
+
+
+class Column:
+    """
+    Values of a metadata field in all datapoints of a result
+
+    :meta private:
+    """
+
+    def __init__(self, values: List[Any]):
+        self._source = values
+        self.series: "pandas.Series" = pandas.Series(values, dtype=object).infer_objects()
+        """Values of the field. Fields with numbers and without missing values get a numeric dtype"""
+        self.values: "np.ndarray" = self.series.to_numpy()
+        self.is_null: "np.ndarray" = self.series.isna().to_numpy()
+        self._strings: Optional["np.ndarray"] = None
+
+    def has_values(self, values: List[Any]) -> bool:
+        """
+        Whether the column was built from the same value objects, meaning none of the values were changed since
+        """
+        return len(values) == len(self._source) and all(map(operator.is_, values, self._source))
+
+    @property
+    def strings(self) -> "np.ndarray":
+        """Values as a numpy string array, for vectorized string operations"""
+        if self._strings is None:
+            self._strings = self.values.astype(str)
+        return self._strings
+
+
+ColumnGetter = Callable[[str], Column]
+
+_comparisons = {
+    "eq": operator.eq,
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "lt": operator.lt,
+    "le": operator.le,
+}
+_string_ops = {"contains", "startswith", "endswith"}
+_date_parts = {"year", "month", "day"}
+
+
+def _conjuncts(serialized_filter: Optional[Dict]) -> List[str]:
+    """
+    Splits a serialized filter into the filters that are AND-ed together on the top level.
+    The filters are returned as canonical JSON strings, so they can be compared between queries.
+    """
+    if serialized_filter is None:
+        return []
+    if "and" in serialized_filter and not serialized_filter.get("not", False):
+        res = []
+        for child in serialized_filter["and"]:
+            res.extend(_conjuncts(child))
+        return res
+    return [json.dumps(serialized_filter, sort_keys=True)]
+
+
+def remaining_filters(base: Optional["DatasourceQuery"], query: "DatasourceQuery") -> List[QueryFilterTree]:
+    """
+    Returns the filters of ``query`` that still need to be applied to the result of ``base``
+    to get the result of ``query``.
+
+    Args:
+        base: Query that produced the result. ``None`` if it's unknown, in which case all filters are returned.
+        query: Query to evaluate
+
+    Raises:
+        QueryNotLocallyEvaluableError: ``query`` can return datapoints that aren't in the result of ``base``.
+    """
+    conjuncts = _conjuncts(query.filter.serialize())
+    if base is not None:
+        if base.as_of != query.as_of:
+            raise QueryNotLocallyEvaluableError("the queries have a different as_of time")
+        if base.time_zone != query.time_zone:
+            raise QueryNotLocallyEvaluableError("the queries have a different time zone")
+        base_conjuncts = _conjuncts(base.filter.serialize())
+        if not set(base_conjuncts).issubset(conjuncts):
+            raise QueryNotLocallyEvaluableError("the query doesn't narrow down the query of the result")
+        conjuncts = [c for c in conjuncts if c not in base_conjuncts]
+    # Deduplicate while keeping the order
+    return [QueryFilterTree.deserialize(json.loads(c)) for c in dict.fromkeys(conjuncts)]
+
+
+def check_fields(
+    filters: List[QueryFilterTree],
+    query: "DatasourceQuery",
+    base: Optional["DatasourceQuery"],
+    fields: List["MetadataSelectFieldSchema"],
+) -> Dict[str, "MetadataSelectFieldSchema"]:
+    """
+    Checks that all the fields used in the query can be evaluated with the values in the result.
+
+    Args:
+        filters: Filters that are going to be evaluated
+        query: Query to evaluate
+        base: Query that produced the result, if it's known
+        fields: Fields of the result
+
+    Returns:
+        The usable fields of the result by name
+    """
+    # Aliased fields and fields selected with as_of have older values than the ones the query would compare
+    available = {f.name: f for f in fields if f.name == f.originalName}
+    if base is not None:
+        for select in base.select or []:
+            if "asOf" in select:
+                available.pop(select.get("alias", select["name"]), None)
+
+    def check(name: str):
+        f = available.get(name)
+        if f is None:
+            raise QueryNotLocallyEvaluableError(f"field {name} isn't in the result")
+        if f.valueType == MetadataFieldType.BLOB:
+            raise QueryNotLocallyEvaluableError(f"field {name} is a blob field")
+        if f.multiple:
+            raise QueryNotLocallyEvaluableError(f"field {name} has multiple values")
+
+    for tree in filters:
+        for node in tree._operand_tree.all_nodes_itr():
+            if node.data is None:
+                continue
+            if node.data.get("as_of") is not None:
+                raise QueryNotLocallyEvaluableError(f"field {node.data['field']} is queried with as_of")
+            check(node.data["field"])
+    for order in query.order_by or []:
+        check(order["field"])
+    for select in query.select or []:
+        if "asOf" in select or "alias" in select:
+            raise QueryNotLocallyEvaluableError(f"field {select['name']} is selected with as_of or an alias")
+        if select["name"] not in available:
+            raise QueryNotLocallyEvaluableError(f"field {select['name']} isn't in the result")
+    return available
+
+
+def evaluate_filter(
+    tree: QueryFilterTree, columns: ColumnGetter, time_zone: Optional[str], rows: "np.ndarray"
+) -> "np.ndarray":
+    """
+    Evaluates the filter on the columns.
+
+    Datapoints that don't have a value in the field never match the comparisons of the field
+    (only :func:`is_null() <dagshub.data_engine.model.datasource.Datasource.is_null>`),
+    but they do match negated comparisons.
+
+    Args:
+        tree: Filter to evaluate
+        columns: Getter of the columns of the result
+        time_zone: Time zone of the query
+        rows: Indices of the datapoints to evaluate the filter on
+
+    Returns:
+        Boolean mask of the matching datapoints out of ``rows``
+    """
+    tz = parse_utc_offset(time_zone) if time_zone is not None else None
+    return _evaluate_node(tree._operand_tree, tree._operand_root, columns, tz, rows)
+
+
+def _evaluate_node(
+    tree: "Tree", node: "Node", columns: ColumnGetter, tz: Optional[datetime.tzinfo], rows: "np.ndarray"
+) -> "np.ndarray":
+    op = node.tag
+    if op in ("and", "or", "not"):
+        children = tree.children(node.identifier)
+        if op == "not":
+            return ~_evaluate_node(tree, children[0], columns, tz, rows)
+        # Evaluate each child only on the rows that the previous children didn't decide already
+        res = np.full(len(rows), op == "and")
+        for child in children:
+            undecided = np.flatnonzero(res if op == "and" else ~res)
+            res[undecided] = _evaluate_node(tree, child, columns, tz, rows[undecided])
+        return res
+
+    column = columns(node.data["field"])
+    value = node.data["value"]
+    if op == "isnull":
+        return column.is_null[rows]
+
+    has_value = ~column.is_null[rows]
+    rows = rows[has_value]
+    if op in _comparisons:
+        matched = _compare(column.values[rows], _comparisons[op], value)
+    elif op in _string_ops:
+        strings = column.strings[rows]
+        if op == "contains":
+            matched = _np_strings().find(strings, value) >= 0
+        else:
+            matched = getattr(_np_strings(), op)(strings, value)
+    elif op in _date_parts:
+        parts = {int(v) for v in value}
+        matched = [getattr(_in_tz(d, tz), op) in parts for d in column.values[rows]]
+    elif op == "timeofday":
+        start, end = (datetime.time.fromisoformat(t.strip()) for t in value.split("-"))
+        matched = [start <= _in_tz(d, tz).time() <= end for d in column.values[rows]]
+    else:
+        raise QueryNotLocallyEvaluableError(f"operator {op} isn't supported")
+
+    res = np.zeros(len(has_value), dtype=bool)
+    res[has_value] = np.asarray(matched, dtype=bool)
+    return res
+
+
+def _compare(values: "np.ndarray", op: Callable[[Any, Any], Any], value: Any):
+    try:
+        return op(values, value)
+    except TypeError:
+        # Values of different types (e.g. numbers uploaded into a string field)
+        # Compare them one by one, values that can't be compared don't match
+        def compare_one(v):
+            try:
+                return bool(op(v, value))
+            except TypeError:
+                return False
+
+        return [compare_one(v) for v in values]
+
+
+def _np_strings():
+    # numpy 2 has faster vectorized string functions, with the same interface
+    return getattr(np, "strings", np.char)
+
+
+def _in_tz(d: datetime.datetime, tz: Optional[datetime.tzinfo]) -> datetime.datetime:
+    # Without a time zone in the query, the time zone the value was uploaded with is used
+    return d.astimezone(tz) if tz is not None else d
+
+
+def sort_order(order_by: List[Dict], columns: ColumnGetter) -> "np.ndarray":
+    """
+    Returns the indices of the datapoints sorted by the ``order_by`` of a query.
+    Datapoints without a value in the field come last.
+    """
+    keys = pandas.DataFrame({i: columns(order["field"]).series for i, order in enumerate(order_by)})
+    ascending = [order["order"] == "ASC" for order in order_by]
+    sorted_keys = keys.sort_values(by=list(keys.columns), ascending=ascending, kind="stable", na_position="last")
+    return sorted_keys.index.to_numpy()
@@ -0,0 +1,499 @@
+import logging
+import math
+import pickle
+import sys
+import tempfile
+from array import array
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Set, IO, Tuple
+
+from dagshub.common import config
+from dagshub.common.util import lazy_load, paused_gc
+from dagshub.data_engine.dtypes import MetadataFieldType
+from dagshub.data_engine.model.metadata.util import wrap_bytes
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    from dagshub.data_engine.model.datasource import DatapointMetadataUpdateEntry
+    from dagshub.data_engine.model.metadata.dataframe import ConvertedMetadataColumn
+else:
+    np = lazy_load("numpy")
+
+logger = logging.getLogger(__name__)
+
+_field_types = list(MetadataFieldType)
+_field_type_codes = {t: i for i, t in enumerate(_field_types)}
+
+# Storage kinds of the values
+_STR = 0
+_INT = 1
+_FLOAT = 2
+_BOOL = 3
+
+_INT64_MIN = -(2**63)
+_INT64_MAX = 2**63 - 1
+
+_storage_kinds = {str: _STR, int: _INT, float: _FLOAT, bool: _BOOL}
+
+
+def _uniform_storage_kind(values: List[Any]) -> Optional[int]:
+    """
+    Storage kind of the values of a converted dataframe column,
+    if all of them are stored the same way and none of them are lists. ``None`` otherwise.
+    """
+    value_types = set(map(type, values))
+    value_types.discard(type(None))
+    if len(value_types) > 1:
+        return None
+    kind = _storage_kinds.get(value_types.pop(), None) if value_types else _STR
+    if kind == _INT:
+        ints = [v for v in values if v is not None]
+        if min(ints) < _INT64_MIN or max(ints) > _INT64_MAX:
+            return None
+    return kind
+
+
+def _extend_array(arr: array, values: "np.ndarray"):
+    # Array type codes are also valid numpy dtypes of the same size
+    arr.frombytes(values.astype(arr.typecode).tobytes())
+
+
+class _BufferSegment:
+    """
+    Columnar storage of a chunk of metadata updates.
+
+    Every row is a (path, key, value) triplet, where the path is interned in the segment and the value
+    is stored in an array of its type. Rows are what becomes a single ``DatapointMetadataUpdateEntry``.
+    """
+
+    def __init__(self):
+        self.paths: List[str] = []
+        self.path_index: Dict[str, int] = {}
+        self.path_ids = array("I")
+        self.key_ids = array("I")
+        # Field type code and the storage kind of the value, packed as (type_code << 2) | kind
+        self.codes = array("B")
+        # Index of the value in the storage of its kind
+        self.slots = array("I")
+        self.strs: List[str] = []
+        self.ints = array("q")
+        self.floats = array("d")
+        self.bools = array("b")
+        self.time_zones: Dict[int, str] = {}
+
+    def __len__(self):
+        return len(self.path_ids)
+
+    def get_path_id(self, path: str) -> int:
+        path_id = self.path_index.get(path)
+        if path_id is None:
+            path_id = len(self.paths)
+            self.path_index[path] = path_id
+            self.paths.append(path)
+        return path_id
+
+    def append(self, path_id: int, key_id: int, value: Any, type_code: int, time_zone: Optional[str]):
+        if time_zone is not None:
+            # There are only a handful of different offsets, don't keep a copy of the string for each value
+            self.time_zones[len(self.path_ids)] = sys.intern(time_zone)
+        self.path_ids.append(path_id)
+        self.key_ids.append(key_id)
+
+        value_type = type(value)
+        if value_type is str:
+            self.codes.append(type_code << 2 | _STR)
+            self.slots.append(len(self.strs))
+            self.strs.append(value)
+        elif value_type is bool:
+            self.codes.append(type_code << 2 | _BOOL)
+            self.slots.append(len(self.bools))
+            self.bools.append(value)
+        elif value_type is int and _INT64_MIN <= value <= _INT64_MAX:
+            self.codes.append(type_code << 2 | _INT)
+            self.slots.append(len(self.ints))
+            self.ints.append(value)
+        elif value_type is float:
+            self.codes.append(type_code << 2 | _FLOAT)
+            self.slots.append(len(self.floats))
+            self.floats.append(value)
+        else:
+            self.codes.append(type_code << 2 | _STR)
+            self.slots.append(len(self.strs))
+            self.strs.append(str(value))
+
+    def value_at(self, row: int) -> str:
+        kind = self.codes[row] & 3
+        slot = self.slots[row]
+        if kind == _STR:
+            return self.strs[slot]
+        elif kind == _INT:
+            return str(self.ints[slot])
+        elif kind == _FLOAT:
+            return str(self.floats[slot])
+        return str(bool(self.bools[slot]))
+
+    def field_type_at(self, row: int) -> MetadataFieldType:
+        return _field_types[self.codes[row] >> 2]
+
+
+class MetadataUpdateBuffer:
+    """
+    Compact buffer of metadata updates that are waiting to be uploaded.
+
+    Keys and datapoint paths are interned, values are stored in typed arrays,
+    and multivalue promotion is tracked per field instead of per entry.
+    Once the buffer grows past ``spill_threshold`` entries, the buffered entries are moved into a temporary file,
+    so building huge uploads doesn't exhaust the memory.
+
+    :meta private:
+    """
+
+    def __init__(self, multivalue_fields: Optional[Set[str]] = None, spill_threshold: Optional[int] = None):
+        self._keys: List[str] = []
+        self._key_index: Dict[str, int] = {}
+        self._initial_multivalue_fields: Set[str] = set(multivalue_fields) if multivalue_fields is not None else set()
+        self._multivalue_fields: Set[str] = set(self._initial_multivalue_fields)
+        self._document_converted_fields: Set[str] = set()
+
+        self.field_types: Dict[str, MetadataFieldType] = {}
+        """Type of the first value uploaded for each field"""
+        self.conflicting_field_types: Dict[str, MetadataFieldType] = {}
+        """If a field got values of different types, the first type that differed from the one in ``field_types``"""
+        self.longest_string_values: Dict[str, str] = {}
+        """Longest value of each string field"""
+
+        if spill_threshold is None:
+            spill_threshold = config.dataengine_metadata_buffer_spill_threshold
+        self._spill_threshold = spill_threshold
+        self._segment = _BufferSegment()
+        self._spill_file: Optional[IO[bytes]] = None
+        self._spilled_segment_sizes: List[int] = []
+
+    @classmethod
+    def from_entries(cls, entries: List["DatapointMetadataUpdateEntry"]) -> "MetadataUpdateBuffer":
+        res = cls()
+        for e in entries:
+            if e.allowMultiple:
+                res.mark_multivalue(e.key)
+            res.add(e.url, e.key, e.value, e.valueType, e.timeZone)
+        return res
+
+    def __len__(self):
+        return sum(self._spilled_segment_sizes) + len(self._segment)
+
+    def _get_key_id(self, key: str) -> int:
+        key_id = self._key_index.get(key)
+        if key_id is None:
+            key_id = len(self._keys)
+            self._key_index[key] = key_id
+            self._keys.append(key)
+        return key_id
+
+    def add(
+        self,
+        path: str,
+        key: str,
+        value: Any,
+        value_type: MetadataFieldType,
+        time_zone: Optional[str] = None,
+    ):
+        """
+        Add a value to the buffer
+
+        Args:
+            path: Path of the datapoint
+            key: Name of the field
+            value: Already converted value. The uploaded value will be ``str(value)``
+            value_type: Type of the field
+            time_zone: Time zone of datetime values
+        """
+        self._track_field_type(key, value_type)
+        if value_type == MetadataFieldType.STRING:
+            self._track_string_value(key, value if isinstance(value, str) else str(value))
+
+        segment = self._segment
+        segment.append(
+            segment.get_path_id(path), self._get_key_id(key), value, _field_type_codes[value_type], time_zone
+        )
+        if len(segment) >= self._spill_threshold > 0:
+            self._spill()
+
+    def _track_field_type(self, key: str, value_type: MetadataFieldType):
+        current_type = self.field_types.setdefault(key, value_type)
+        if current_type != value_type and key not in self.conflicting_field_types:
+            self.conflicting_field_types[key] = value_type
+
+    def _track_string_value(self, key: str, value: str):
+        if len(value) > len(self.longest_string_values.get(key, "")):
+            self.longest_string_values[key] = value
+
+    def add_columns(self, paths: List[str], columns: List["ConvertedMetadataColumn"]):
+        """
+        Add the converted columns of a dataframe, row by row
+
+        Args:
+            paths: Datapoint path of each row
+            columns: Columns converted with
+                :func:`~dagshub.data_engine.model.metadata.dataframe.convert_dataframe_columns`
+        """
+        # All values of a column have the same type, so the field info is tracked once per column
+        for col in columns:
+            if col.allow_multiple:
+                self.mark_multivalue(col.key)
+            values = [v for v in col.values if v is not None]
+            if not values:
+                continue
+            self._track_field_type(col.key, col.value_type)
+            if col.value_type == MetadataFieldType.STRING and all(type(v) is str for v in values):
+                self._track_string_value(col.key, max(values, key=len))
+            elif col.value_type == MetadataFieldType.STRING:
+                for v in values:
+                    for sub_val in v if isinstance(v, list) else (v,):
+                        self._track_string_value(col.key, sub_val if isinstance(sub_val, str) else str(sub_val))
+
+        key_ids = [self._get_key_id(col.key) for col in columns]
+        type_codes = [_field_type_codes[col.value_type] for col in columns]
+        kinds = [_uniform_storage_kind(col.values) for col in columns]
+        if columns and all(kind is not None for kind in kinds):
+            self._add_uniform_columns(paths, columns, key_ids, type_codes, kinds)
+            return
+        with paused_gc():
+            for row_idx, path in enumerate(paths):
+                segment = self._segment
+                path_id = segment.get_path_id(path)
+                for col, key_id, type_code in zip(columns, key_ids, type_codes):
+                    val = col.values[row_idx]
+                    if val is None:
+                        continue
+                    time_zone = col.time_zones[row_idx] if col.time_zones is not None else None
+                    if isinstance(val, list):
+                        for sub_idx, sub_val in enumerate(val):
+                            sub_time_zone = time_zone[sub_idx] if time_zone is not None else None
+                            segment.append(path_id, key_id, sub_val, type_code, sub_time_zone)
+                    else:
+                        segment.append(path_id, key_id, val, type_code, time_zone)
+                if len(segment) >= self._spill_threshold > 0:
+                    self._spill()
+
+    def _add_uniform_columns(
+        self,
+        paths: List[str],
+        columns: List["ConvertedMetadataColumn"],
+        key_ids: List[int],
+        type_codes: List[int],
+        kinds: List[int],
+    ):
+        """
+        Same as the row by row loop of :func:`add_columns`, but with whole arrays,
+        for columns where every value is stored the same way.
+        The rows end up in the same order, and segments get spilled at about the same size.
+        """
+        num_rows = len(paths)
+        present = np.empty((num_rows, len(columns)), dtype=bool)
+        for col_idx, col in enumerate(columns):
+            present[:, col_idx] = np.fromiter((v is not None for v in col.values), dtype=bool, count=num_rows)
+        column_key_ids = np.array(key_ids, dtype=np.uint32)
+        column_codes = np.array([type_code << 2 | kind for type_code, kind in zip(type_codes, kinds)], dtype=np.uint8)
+        column_kinds = np.array(kinds, dtype=np.uint8)
+
+        start = 0
+        while start < num_rows:
+            segment = self._segment
+            end = num_rows
+            if self._spill_threshold > 0:
+                rows_to_spill = math.ceil((self._spill_threshold - len(segment)) / len(columns))
+                end = min(start + max(rows_to_spill, 1), num_rows)
+            chunk = present[start:end]
+            row_counts = chunk.sum(axis=1)
+            path_ids = np.array([segment.get_path_id(p) for p in paths[start:end]], dtype=np.uint32)
+            first_row = len(segment)
+
+            _extend_array(segment.path_ids, np.repeat(path_ids, row_counts))
+            _extend_array(segment.key_ids, np.broadcast_to(column_key_ids, chunk.shape)[chunk])
+            _extend_array(segment.codes, np.broadcast_to(column_codes, chunk.shape)[chunk])
+
+            row_kinds = np.broadcast_to(column_kinds, chunk.shape)[chunk]
+            slots = np.empty(len(row_kinds), dtype=np.uint32)
+            for kind, storage in (
+                (_STR, segment.strs),
+                (_INT, segment.ints),
+                (_FLOAT, segment.floats),
+                (_BOOL, segment.bools),
+            ):
+                kind_columns = [col_idx for col_idx, col_kind in enumerate(kinds) if col_kind == kind]
+                if not kind_columns:
+                    continue
+                is_kind = row_kinds == kind
+                slots[is_kind] = np.arange(len(storage), len(storage) + is_kind.sum())
+                values = np.empty((end - start, len(kind_columns)), dtype=object)
+                for i, col_idx in enumerate(kind_columns):
+                    values[:, i] = columns[col_idx].values[start:end]
+                values = values[chunk[:, kind_columns]]
+                if kind == _STR:
+                    storage.extend(values.tolist())
+                else:
+                    _extend_array(storage, values)
+            _extend_array(segment.slots, slots)
+
+            # Row in the segment of every present value in the chunk
+            rows = np.cumsum(chunk.ravel()).reshape(chunk.shape) + (first_row - 1)
+            for col_idx, col in enumerate(columns):
+                if col.time_zones is None:
+                    continue
+                for row_idx in np.flatnonzero(chunk[:, col_idx]).tolist():
+                    time_zone = col.time_zones[start + row_idx]
+                    if time_zone is not None:
+                        segment.time_zones[int(rows[row_idx, col_idx])] = sys.intern(time_zone)
+
+            if len(segment) >= self._spill_threshold > 0:
+                self._spill()
+            start = end
+
+    def extend(self, other: "MetadataUpdateBuffer"):
+        """
+        Add all the entries of another buffer to this one
+        """
+        self._multivalue_fields.update(other._multivalue_fields)
+        for segment in other._iter_segments():
+            for row in range(len(segment)):
+                self.add(
+                    segment.paths[segment.path_ids[row]],
+                    other._keys[segment.key_ids[row]],
+                    segment.value_at(row),
+                    segment.field_type_at(row),
+                    segment.time_zones.get(row),
+                )
+
+    def mark_multivalue(self, key: str):
+        """
+        Promote the field to be a multivalue field. Applies to already buffered entries too.
+        """
+        self._multivalue_fields.add(key)
+
+    def convert_strings_to_documents(self, key: str):
+        """
+        Upload all the string values of the field as documents (gzipped blobs)
+        """
+        self._document_converted_fields.add(key)
+        if self.field_types.get(key) == MetadataFieldType.STRING:
+            self.field_types[key] = MetadataFieldType.BLOB
+
+    def _spill(self):
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(prefix="dagshub-metadata-")
+            logger.debug(f"Metadata buffer is over {self._spill_threshold} entries, spilling entries to disk")
+        pickle.dump(self._segment, self._spill_file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._spilled_segment_sizes.append(len(self._segment))
+        self._segment = _BufferSegment()
+
+    def _iter_segments(self) -> Iterator[_BufferSegment]:
+        if self._spill_file is not None:
+            self._spill_file.seek(0)
+            for _ in self._spilled_segment_sizes:
+                yield pickle.load(self._spill_file)
+            self._spill_file.seek(0, 2)
+        yield self._segment
+
+    def _iter_rows(self) -> Iterator[Tuple[str, str, str, MetadataFieldType, bool, Optional[str]]]:
+        """
+        Iterates over (path, key, value, value type, allow multiple, time zone) of every buffered entry
+        """
+        keys = self._keys
+        multivalue = [k in self._multivalue_fields for k in keys]
+        to_document = [k in self._document_converted_fields for k in keys]
+
+        for segment in self._iter_segments():
+            paths = segment.paths
+            time_zones = segment.time_zones
+            strs, ints, floats, bools = segment.strs, segment.ints, segment.floats, segment.bools
+            rows = zip(segment.path_ids, segment.key_ids, segment.codes, segment.slots)
+            for row, (path_id, key_id, code, slot) in enumerate(rows):
+                kind = code & 3
+                if kind == _STR:
+                    value = strs[slot]
+                elif kind == _INT:
+                    value = str(ints[slot])
+                elif kind == _FLOAT:
+                    value = str(floats[slot])
+                else:
+                    value = str(bool(bools[slot]))
+                value_type = _field_types[code >> 2]
+                if to_document[key_id] and value_type == MetadataFieldType.STRING:
+                    value = wrap_bytes(value.encode("utf-8"))
+                    value_type = MetadataFieldType.BLOB
+                yield (
+                    paths[path_id],
+                    keys[key_id],
+                    value,
+                    value_type,
+                    multivalue[key_id],
+                    time_zones.get(row) if time_zones else None,
+                )
+
+    def iter_batches(self, batch_size: int) -> Iterator[List["DatapointMetadataUpdateEntry"]]:
+        """
+        Iterate over the buffered entries in lists of at most ``batch_size`` entries
+        """
+        from dagshub.data_engine.model.datasource import DatapointMetadataUpdateEntry
+
+        batch: List[DatapointMetadataUpdateEntry] = []
+        with paused_gc():
+            for row in self._iter_rows():
+                batch.append(DatapointMetadataUpdateEntry(*row))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def iter_payload_batches(self, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Iterate over the buffered entries, already serialized for the metadata update mutation,
+        in lists of at most ``batch_size`` entries.
+
+        The dictionaries are the same as ``DatapointMetadataUpdateEntry.to_dict()`` would produce.
+        """
+        # Types are serialized once instead of once per value
+        type_values = {t: t.value for t in _field_types}
+        batch: List[Dict[str, Any]] = []
+        with paused_gc():
+            for path, key, value, value_type, allow_multiple, time_zone in self._iter_rows():
+                d = {
+                    "url": path,
+                    "key": key,
+                    "value": value,
+                    "valueType": type_values[value_type],
+                    "allowMultiple": allow_multiple,
+                }
+                if time_zone is not None:
+                    d["timeZone"] = time_zone
+                batch.append(d)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def get_entries(self) -> List["DatapointMetadataUpdateEntry"]:
+        """
+        Get all the buffered entries at once
+        """
+        res: List["DatapointMetadataUpdateEntry"] = []
+        for batch in self.iter_batches(max(len(self), 1)):
+            res.extend(batch)
+        return res
+
+    def clear(self):
+        self._keys = []
+        self._key_index = {}
+        # Fields promoted by the cleared entries don't carry over to the next upload
+        self._multivalue_fields = set(self._initial_multivalue_fields)
+        self._segment = _BufferSegment()
+        self._spilled_segment_sizes = []
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+        self.field_types.clear()
+        self.conflicting_field_types.clear()
+        self.longest_string_values.clear()
+        self._document_converted_fields.clear()
@@ -0,0 +1,268 @@
+import datetime
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple, Union
+
+from dagshub.common.util import lazy_load
+from dagshub.data_engine.client.models import autogenerated_columns
+from dagshub.data_engine.dtypes import MetadataFieldType
+from dagshub.data_engine.model.metadata.util import wrap_bytes, format_utc_offset
+from dagshub.data_engine.model.schema_util import metadataTypeLookup
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas
+else:
+    np = lazy_load("numpy")
+    pandas = lazy_load("pandas")
+
+ConvertedValue = Optional[Union[str, int, float, bool, List[Union[str, int, float, bool]]]]
+ConvertedTimeZone = Optional[Union[str, List[Optional[str]]]]
+
+_numeric_dtype_types = {
+    "b": MetadataFieldType.BOOLEAN,
+    "i": MetadataFieldType.INTEGER,
+    "u": MetadataFieldType.INTEGER,
+    "f": MetadataFieldType.FLOAT,
+}
+
+
+@dataclass
+class ConvertedMetadataColumn:
+    """
+    Upload-ready values of a single dataframe column
+
+    :meta private:
+    """
+
+    key: str
+    """Name of the metadata field"""
+    value_type: MetadataFieldType
+    """Type of the values in the column"""
+    values: List[ConvertedValue]
+    """
+    Upload-ready value for every row of the dataframe, the uploaded value is ``str(value)``.
+    ``None`` means nothing gets uploaded for the row, a list means the row has multiple values.
+    """
+    time_zones: Optional[List[ConvertedTimeZone]] = None
+    """Time zone for every value (same shape as ``values``). ``None`` if the column has no time zones"""
+    allow_multiple: bool = False
+    """Whether the field is a multivalue field"""
+
+
+def convert_dataframe_columns(
+    df: "pandas.DataFrame",
+    path_column: Any,
+    field_value_types: Dict[str, MetadataFieldType],
+    document_fields: Set[str],
+    multivalue_fields: Set[str],
+) -> List[ConvertedMetadataColumn]:
+    """
+    Converts all metadata columns of the dataframe into upload-ready values, one column at a time.
+
+    Type inference and conversion is done on the whole column at once where the dtype of the column allows it,
+    falling back to converting value by value for mixed object columns.
+
+    Args:
+        df: Dataframe with the metadata
+        path_column: Name of the column with the datapoint paths. This column is not converted
+        field_value_types: Types of the fields that already exist in the datasource.
+            Types inferred for new fields get added to this dictionary.
+        document_fields: Names of the document fields in the datasource
+        multivalue_fields: Names of the multivalue fields in the datasource
+
+    :meta private:
+    """
+    res = []
+    for col_idx, col_name in enumerate(df.columns):
+        if col_name == path_column:
+            continue
+        key = str(col_name)
+        if key in autogenerated_columns:
+            continue
+        converted = _convert_column(
+            df.iloc[:, col_idx],
+            key,
+            field_value_types.get(key),
+            key in document_fields,
+        )
+        if converted is None:
+            continue
+        field_value_types[key] = converted.value_type
+        converted.allow_multiple = converted.allow_multiple or key in multivalue_fields
+        res.append(converted)
+    return res
+
+
+def _convert_column(
+    series: "pandas.Series", key: str, value_type: Optional[MetadataFieldType], is_document: bool
+) -> Optional[ConvertedMetadataColumn]:
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in _numeric_dtype_types:
+        return _convert_numeric_column(series, key, value_type or _numeric_dtype_types[dtype.kind], is_document)
+    if pandas.api.types.is_datetime64_any_dtype(dtype):
+        if value_type is None or value_type == MetadataFieldType.DATETIME:
+            return _convert_datetime_column(series, key)
+        return _convert_values(_datetime_column_values(series), key, value_type, is_document)
+    if pandas.api.types.is_object_dtype(dtype) and pandas.api.types.infer_dtype(series, skipna=True) == "string":
+        if value_type is None or value_type in (MetadataFieldType.STRING, MetadataFieldType.BLOB):
+            return _convert_string_column(series, key, value_type or MetadataFieldType.STRING, is_document)
+    return _convert_values(series.tolist(), key, value_type, is_document)
+
+
+def _convert_numeric_column(
+    series: "pandas.Series", key: str, value_type: MetadataFieldType, is_document: bool
+) -> Optional[ConvertedMetadataColumn]:
+    # Don't override bytes if they're not bytes - probably just undownloaded values
+    if value_type == MetadataFieldType.BLOB and not is_document:
+        return None
+    arr = series.to_numpy()
+    if arr.dtype.kind == "f" and arr.dtype.itemsize < 8:
+        # Keep the shortest repr of the narrower float (0.1, not 0.10000000149011612), like str() of its numpy value
+        py_values = arr.astype(str).astype(np.float64).tolist()
+    else:
+        py_values = arr.tolist()
+    # Pandas quirk - integers are floats on the backend
+    if value_type == MetadataFieldType.INTEGER and arr.dtype.kind in "bf":
+        values: List[ConvertedValue] = [None if v != v else int(v) for v in py_values]
+    else:
+        values = py_values
+    if arr.dtype.kind == "f":
+        for idx in np.flatnonzero(np.isnan(arr)).tolist():
+            values[idx] = None
+    return ConvertedMetadataColumn(key=key, value_type=value_type, values=values)
+
+
+def _convert_string_column(
+    series: "pandas.Series", key: str, value_type: MetadataFieldType, is_document: bool
+) -> Optional[ConvertedMetadataColumn]:
+    if value_type == MetadataFieldType.BLOB and not is_document:
+        return None
+    missing = series.isna().to_numpy()
+    values: List[ConvertedValue] = series.tolist()
+    for idx in np.flatnonzero(missing).tolist():
+        values[idx] = None
+    if is_document:
+        values = [wrap_bytes(v.encode("utf-8")) if v is not None else None for v in values]
+    return ConvertedMetadataColumn(key=key, value_type=value_type, values=values)
+
+
+def _convert_datetime_column(series: "pandas.Series", key: str) -> ConvertedMetadataColumn:
+    missing = series.isna().to_numpy()
+    if series.dt.tz is None:
+        # Naive datetimes are in the local time of the machine, which can only be resolved value by value
+        local_values = _datetime_column_values(series)
+        values: List[ConvertedValue] = [None if v is None else int(v.timestamp() * 1000) for v in local_values]
+        return ConvertedMetadataColumn(key=key, value_type=MetadataFieldType.DATETIME, values=values)
+
+    utc_micros = series.dt.tz_convert(None).to_numpy().astype("datetime64[us]").astype(np.int64)
+    wall_micros = series.dt.tz_localize(None).to_numpy().astype("datetime64[us]").astype(np.int64)
+    # Same arithmetic as int(datetime.timestamp() * 1000), so the values are identical to the per-value conversion
+    millis = ((utc_micros / 1e6) * 1000).astype(np.int64)
+
+    offset_seconds = (wall_micros - utc_micros) // 1_000_000
+    offset_strings = {off: format_utc_offset(off) for off in np.unique(offset_seconds[~missing]).tolist()}
+
+    values = millis.tolist()
+    time_zones: List[ConvertedTimeZone] = [offset_strings.get(off) for off in offset_seconds.tolist()]
+    for idx in np.flatnonzero(missing).tolist():
+        values[idx] = None
+        time_zones[idx] = None
+    return ConvertedMetadataColumn(key=key, value_type=MetadataFieldType.DATETIME, values=values, time_zones=time_zones)
+
+
+def _datetime_column_values(series: "pandas.Series") -> List[Optional[datetime.datetime]]:
+    missing = series.isna().to_numpy()
+    values = list(pandas.DatetimeIndex(series).to_pydatetime())
+    for idx in np.flatnonzero(missing).tolist():
+        values[idx] = None
+    return values
+
+
+def _is_missing(val: Any) -> bool:
+    if val is None:
+        return True
+    # Pandas specific: since pandas doesn't distinguish between None and NaN, don't upload it
+    if isinstance(val, float):
+        return val != val
+    return val is pandas.NA or val is pandas.NaT
+
+
+def _convert_values(
+    column_values: List[Any], key: str, value_type: Optional[MetadataFieldType], is_document: bool
+) -> Optional[ConvertedMetadataColumn]:
+    """
+    Value by value conversion for columns with mixed values (lists, bytes, objects of different types)
+    """
+    values: List[ConvertedValue] = []
+    time_zones: List[ConvertedTimeZone] = []
+    has_time_zones = False
+    has_lists = False
+
+    for val in column_values:
+        if isinstance(val, list):
+            has_lists = True
+            sub_values = []
+            sub_time_zones = []
+            for sub_val in val:
+                if value_type is None:
+                    value_type = metadataTypeLookup[type(_to_python_value(sub_val))]
+                converted, time_zone = _convert_value(sub_val, value_type, is_document)
+                if converted is None:
+                    continue
+                sub_values.append(converted)
+                sub_time_zones.append(time_zone)
+                has_time_zones = has_time_zones or time_zone is not None
+            values.append(sub_values if sub_values else None)
+            time_zones.append(sub_time_zones)
+        elif _is_missing(val):
+            values.append(None)
+            time_zones.append(None)
+        else:
+            if value_type is None:
+                value_type = metadataTypeLookup[type(_to_python_value(val))]
+            converted, time_zone = _convert_value(val, value_type, is_document)
+            values.append(converted)
+            time_zones.append(time_zone)
+            has_time_zones = has_time_zones or time_zone is not None
+
+    if value_type is None:
+        # Column is completely empty
+        return None
+    return ConvertedMetadataColumn(
+        key=key,
+        value_type=value_type,
+        values=values,
+        time_zones=time_zones if has_time_zones else None,
+        allow_multiple=has_lists,
+    )
+
+
+def _to_python_value(val: Any) -> Any:
+    # Pandas specific: Cast pandas Timestamp to datetime
+    if isinstance(val, pandas.Timestamp):
+        return val.to_pydatetime()
+    return val
+
+
+def _convert_value(
+    val: Any, value_type: MetadataFieldType, is_document: bool
+) -> Tuple[Optional[ConvertedValue], Optional[str]]:
+    val = _to_python_value(val)
+    # Don't override bytes if they're not bytes - probably just undownloaded values
+    if value_type == MetadataFieldType.BLOB and not isinstance(val, bytes):
+        if not is_document:
+            return None, None
+    time_zone = None
+    # Pandas quirk - integers are floats on the backend
+    if value_type == MetadataFieldType.INTEGER:
+        val = int(val)
+    if isinstance(val, str) and is_document:
+        val = val.encode("utf-8")
+    if isinstance(val, bytes):
+        val = wrap_bytes(val)
+    if isinstance(val, datetime.datetime):
+        offset = val.utcoffset() if val.tzinfo is not None else None
+        if offset is not None:
+            time_zone = format_utc_offset(offset.total_seconds())
+        val = int(val.timestamp() * 1000)
+    return val, time_zone
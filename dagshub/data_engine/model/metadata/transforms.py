@@ -1,31 +1,28 @@
 import logging
-from typing import List, TYPE_CHECKING, Dict
+from typing import TYPE_CHECKING, Dict
 
 from dagshub.common.helpers import log_message
 from dagshub.data_engine import dtypes
 from dagshub.data_engine.dtypes import MetadataFieldType
-from dagshub.data_engine.model.metadata.util import wrap_bytes
 from dagshub.data_engine.model.metadata.validation import UploadingMetadataInfo, MAX_STRING_FIELD_LENGTH
 
 if TYPE_CHECKING:
-    from dagshub.data_engine.model.datasource import Datasource, DatapointMetadataUpdateEntry
+    from dagshub.data_engine.model.datasource import Datasource
+    from dagshub.data_engine.model.metadata.buffer import MetadataUpdateBuffer
 
 logger = logging.getLogger(__name__)
 
 
-def _transform_strings_to_documents(ds: "Datasource", metadata: List["DatapointMetadataUpdateEntry"], field_name: str):
+def _transform_strings_to_documents(ds: "Datasource", metadata: "MetadataUpdateBuffer", field_name: str):
     log_message(f"Uploading field {field_name} as a document field due to long string values")
     ds.metadata_field(field_name).set_type(dtypes.Document).apply()
-    for m in metadata:
-        if m.key != field_name:
-            continue
-        m.valueType = MetadataFieldType.BLOB
-        m.value = wrap_bytes(m.value.encode("utf-8"))
+    # Values get encoded when the entries are being uploaded
+    metadata.convert_strings_to_documents(field_name)
 
 
 def run_preupload_transforms(
     ds: "Datasource",
-    metadata: List["DatapointMetadataUpdateEntry"],
+    metadata: "MetadataUpdateBuffer",
     precalculated_info: Dict[str, UploadingMetadataInfo],
 ):
     """
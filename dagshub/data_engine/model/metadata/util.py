@@ -1,4 +1,5 @@
 import base64
+import datetime
 import gzip
 
 
@@ -11,3 +12,25 @@ def wrap_bytes(val: bytes) -> str:
     """
     compressed = gzip.compress(val)
     return base64.b64encode(compressed).decode("utf-8")
+
+
+def format_utc_offset(offset_seconds: float) -> str:
+    """
+    Formats a UTC offset in seconds as a string in the form of "+03:00" or "-03:00"
+
+    :meta private:
+    """
+    offset_hours = int(offset_seconds // 3600)
+    offset_minutes = int((offset_seconds % 3600) // 60)
+    return f"{offset_hours:+03d}:{offset_minutes:02d}"
+
+
+def parse_utc_offset(offset: str) -> datetime.timezone:
+    """
+    Parses a UTC offset string in the form of "+03:00" or "-03:30" into a timezone
+
+    :meta private:
+    """
+    sign = -1 if offset.startswith("-") else 1
+    hours, minutes = map(int, offset.lstrip("+-").split(":"))
+    return datetime.timezone(sign * datetime.timedelta(hours=hours, minutes=minutes))
@@ -1,11 +1,12 @@
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, List, Optional, Dict
+from typing import TYPE_CHECKING, Optional, Dict
 
 from dagshub.data_engine.client.models import MetadataFieldSchema
 from dagshub.data_engine.dtypes import MetadataFieldType
 
 if TYPE_CHECKING:
-    from dagshub.data_engine.model.datasource import DatapointMetadataUpdateEntry, Datasource
+    from dagshub.data_engine.model.datasource import Datasource
+    from dagshub.data_engine.model.metadata.buffer import MetadataUpdateBuffer
 
 MAX_STRING_FIELD_LENGTH = 512
 
@@ -49,35 +50,29 @@ class StringFieldValueTooLongError(Exception):
         )
 
 
-def precalculate_metadata_info(
-    ds: "Datasource", metadata: List["DatapointMetadataUpdateEntry"]
-) -> Dict[str, UploadingMetadataInfo]:
+def precalculate_metadata_info(ds: "Datasource", metadata: "MetadataUpdateBuffer") -> Dict[str, UploadingMetadataInfo]:
     """
     Calculates information about uploading metadata + checks for accidental mixing of data types along the way
     """
     res = {}
-    for m in metadata:
-        if m.key not in res:
-            info = UploadingMetadataInfo(
-                field_name=m.key,
-                field_type=m.valueType,
-                existing_metadata_in_ds=next(filter(lambda f: f.name == m.key, ds.fields), None),
-            )
-            res[m.key] = info
-
-            if info.existing_metadata_in_ds is not None:
-                # Check that user is not uploading other type of value accidentally
-                if info.existing_metadata_in_ds.valueType != m.valueType:
-                    raise MultipleDataTypesUploadedError(m.key, info.existing_metadata_in_ds.valueType, m.valueType)
-
-        else:
-            info = res[m.key]
-
-            if info.field_type != m.valueType:
-                raise MultipleDataTypesUploadedError(m.key, info.field_type, m.valueType)
+    for key, field_type in metadata.field_types.items():
+        info = UploadingMetadataInfo(
+            field_name=key,
+            field_type=field_type,
+            existing_metadata_in_ds=next(filter(lambda f: f.name == key, ds.fields), None),
+        )
+        res[key] = info
+
+        if info.existing_metadata_in_ds is not None:
+            # Check that user is not uploading other type of value accidentally
+            if info.existing_metadata_in_ds.valueType != field_type:
+                raise MultipleDataTypesUploadedError(key, info.existing_metadata_in_ds.valueType, field_type)
+
+        if key in metadata.conflicting_field_types:
+            raise MultipleDataTypesUploadedError(key, field_type, metadata.conflicting_field_types[key])
 
         if info.field_type == MetadataFieldType.STRING:
-            info.longest_value = info.longest_value if len(info.longest_value) > len(m.value) else m.value
+            info.longest_value = metadata.longest_string_values.get(key, "")
     return res
 
 
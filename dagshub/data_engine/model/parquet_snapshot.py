@@ -0,0 +1,197 @@
+"""
+Parquet snapshots of query results.
+
+The datapoints are stored as rows (``path``, ``datapoint_id`` and a column per metadata field),
+and the file's metadata holds the datasource, the query and the fields of the result,
+so the result can be loaded back without querying the server.
+
+:meta private:
+"""
+
+import datetime
+import json
+from os import PathLike
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Union
+
+from dagshub.common.util import lazy_load
+from dagshub.data_engine.client.models import (
+    DatasourceType,
+    MetadataFieldSchema,
+    MetadataSelectFieldSchema,
+    PreprocessingStatus,
+)
+from dagshub.data_engine.model.datapoint import Datapoint
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from dagshub.data_engine.model.datasource import Datasource, DatasourceQuery
+else:
+    pa = lazy_load("pyarrow")
+    pq = lazy_load("pyarrow.parquet")
+
+SNAPSHOT_METADATA_KEY = b"dagshub"
+SNAPSHOT_VERSION = 1
+
+DEFAULT_ROW_GROUP_SIZE = 10_000
+"""Default amount of datapoints in a row group of the snapshot"""
+
+
+def snapshot_metadata(
+    datasource: "Datasource",
+    query: "DatasourceQuery",
+    fields: List[MetadataSelectFieldSchema],
+    query_data_time: Optional[datetime.datetime],
+    annotation_fields: Sequence[str],
+    complete: bool,
+) -> Dict[bytes, bytes]:
+    """
+    Returns the schema metadata of a snapshot of a result of ``query`` on ``datasource``.
+
+    Args:
+        annotation_fields: Annotation fields that are stored as Label Studio tasks and not as blob hashes
+        complete: Whether the snapshot has the whole result of the query, and not only a part of it
+    """
+    source = datasource.source
+    info = {
+        "version": SNAPSHOT_VERSION,
+        "repo": source.repo,
+        "datasource": {
+            "id": source.id,
+            "name": source.name,
+            "path": source.path,
+            "type": source.source_type.value,
+            "preprocessingStatus": source.preprocessing_status.value,
+            "metadataFields": [f.to_dict(encode_json=True) for f in source.metadata_fields],
+        },
+        "query": query.to_dict(encode_json=True),
+        "fields": [f.to_dict(encode_json=True) for f in fields],
+        "queryDataTime": query_data_time.isoformat() if query_data_time is not None else None,
+        "annotationFields": list(annotation_fields),
+        "complete": complete,
+    }
+    return {SNAPSHOT_METADATA_KEY: json.dumps(info).encode("utf-8")}
+
+
+class SnapshotWriter:
+    """
+    Writes record batches into a Parquet snapshot, in row groups of ``row_group_size`` rows.
+    Batches are buffered until there are enough rows for a row group, so the batches can have any size.
+    """
+
+    def __init__(self, path: Union[str, PathLike], metadata: Dict[bytes, bytes], row_group_size: int):
+        self.path = Path(path)
+        self.metadata = metadata
+        self.row_group_size = row_group_size
+        self._writer: Optional["pq.ParquetWriter"] = None
+        self._pending: List["pa.RecordBatch"] = []
+        self._pending_rows = 0
+
+    def write(self, batch: "pa.RecordBatch"):
+        if self._writer is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            schema = batch.schema.with_metadata(self.metadata)
+            self._writer = pq.ParquetWriter(str(self.path), schema)
+        self._pending.append(batch)
+        self._pending_rows += batch.num_rows
+        if self._pending_rows >= self.row_group_size:
+            self._flush(final=False)
+
+    def close(self):
+        if self._writer is None:
+            return
+        self._flush(final=True)
+        self._writer.close()
+
+    def abort(self):
+        """
+        Closes the writer and removes the incomplete file
+        """
+        if self._writer is not None:
+            self._writer.close()
+        self.path.unlink(missing_ok=True)
+
+    def _flush(self, final: bool):
+        table = pa.Table.from_batches(self._pending, schema=self._writer.schema)
+        full = (table.num_rows // self.row_group_size) * self.row_group_size
+        if final:
+            full = table.num_rows
+        if full > 0:
+            self._writer.write_table(table.slice(0, full), row_group_size=self.row_group_size)
+        rest = table.slice(full)
+        self._pending = rest.to_batches()
+        self._pending_rows = rest.num_rows
+
+
+def read_snapshot_info(parquet_file: "pq.ParquetFile") -> Dict[str, Any]:
+    metadata = parquet_file.schema_arrow.metadata or {}
+    if SNAPSHOT_METADATA_KEY not in metadata:
+        raise ValueError("The file isn't a query result snapshot, it has no DagsHub metadata")
+    info = json.loads(metadata[SNAPSHOT_METADATA_KEY])
+    if info.get("version", 0) > SNAPSHOT_VERSION:
+        raise ValueError(
+            f"The snapshot has a newer version ({info['version']}) than this client supports, "
+            f"upgrade the dagshub client to load it"
+        )
+    return info
+
+
+def datasource_from_snapshot(info: Dict[str, Any]) -> "Datasource":
+    """
+    Recreates the datasource with the query of the snapshot, without getting it from DagsHub
+    """
+    from dagshub.data_engine.model.datasource import Datasource
+    from dagshub.data_engine.model.datasource_state import DatasourceState
+
+    ds_info = info["datasource"]
+    state = DatasourceState(repo=info["repo"], name=ds_info["name"], id=ds_info["id"])
+    state.path = ds_info["path"]
+    state.source_type = DatasourceType(ds_info["type"])
+    state.preprocessing_status = PreprocessingStatus(ds_info["preprocessingStatus"])
+    state.metadata_fields = [MetadataFieldSchema.from_dict(f) for f in ds_info["metadataFields"]]
+    if state.source_type == DatasourceType.REPOSITORY:
+        state.revision = state.path_parts()["revision"]
+    return Datasource(state, snapshot_query(info))
+
+
+def snapshot_query(info: Dict[str, Any]) -> "DatasourceQuery":
+    from dagshub.data_engine.model.datasource import DatasourceQuery
+
+    query_dict = dict(info["query"])
+    # An empty filter is serialized as None, which the default value handles
+    if query_dict.get("query") is None:
+        query_dict.pop("query", None)
+    return DatasourceQuery.from_dict(query_dict)
+
+
+def snapshot_fields(info: Dict[str, Any]) -> List[MetadataSelectFieldSchema]:
+    return [MetadataSelectFieldSchema.from_dict(f) for f in info["fields"]]
+
+
+def snapshot_query_data_time(info: Dict[str, Any]) -> Optional[datetime.datetime]:
+    if info.get("queryDataTime") is None:
+        return None
+    return datetime.datetime.fromisoformat(info["queryDataTime"])
+
+
+def datapoints_from_batch(
+    batch: "pa.RecordBatch", datasource: "Datasource", annotation_fields: Sequence[str]
+) -> List[Datapoint]:
+    """
+    Converts the rows of a snapshot back into datapoints.
+    Annotation fields get their Label Studio tasks as bytes, ready to be parsed.
+    """
+    columns = batch.to_pydict()
+    paths = columns.pop("path")
+    ids = columns.pop("datapoint_id")
+    annotation_columns = [c for c in annotation_fields if c in columns]
+    for name in annotation_columns:
+        columns[name] = [v.encode("utf-8") if isinstance(v, str) else v for v in columns[name]]
+
+    res = []
+    for i, (path, datapoint_id) in enumerate(zip(paths, ids)):
+        # Datapoints only have the fields that have a value
+        metadata = {name: values[i] for name, values in columns.items() if values[i] is not None}
+        res.append(Datapoint(datapoint_id=datapoint_id, path=path, metadata=metadata, datasource=datasource))
+    return res
@@ -0,0 +1,225 @@
+"""
+Pipelined prediction over the datapoints of a query result:
+the datapoint files are downloaded in the background ahead of the inference,
+the inference can run in multiple worker processes,
+and the predictions are uploaded in chunks in the background while the inference continues.
+
+:meta private:
+"""
+
+import importlib
+import logging
+import multiprocessing
+import os
+import pickle
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, TypeVar
+
+from dagshub.common.analytics import send_analytics_event
+from dagshub.common.util import lazy_load
+
+if TYPE_CHECKING:
+    import mlflow
+    from dagshub.data_engine.model.datasource import Datasource, MetadataContextManager
+else:
+    mlflow = lazy_load("mlflow")
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def prefetch_batches(
+    batches: Sequence[Sequence[int]], fetch: Callable[[int], T], window: int, num_threads: int
+) -> Iterator[List[T]]:
+    """
+    Fetches the items of the batches in background threads, keeping ``window`` items ahead of the consumer,
+    and returns the batches in order.
+
+    Args:
+        batches: Indices of the items of every batch
+        fetch: Function that fetches the item at an index
+        window: How many items to fetch ahead of the batch that is being consumed
+        num_threads: How many items to fetch at the same time
+    """
+    indices = [idx for batch in batches for idx in batch]
+    futures: Dict[int, Future] = {}
+    executor = ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix="prediction-prefetch")
+    scheduled = 0
+    consumed = 0
+    try:
+        for batch in batches:
+            consumed += len(batch)
+            while scheduled < min(consumed + window, len(indices)):
+                idx = indices[scheduled]
+                futures[idx] = executor.submit(fetch, idx)
+                scheduled += 1
+            yield [futures.pop(idx).result() for idx in batch]
+    finally:
+        for future in futures.values():
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+class PredictionUploader:
+    """
+    Uploads the predictions to the datasource in chunks, in a background thread.
+
+    Only one chunk is uploaded at a time. If the previous chunk is still uploading when the next one is full,
+    :func:`add` waits for it, so the predictions waiting for the upload don't pile up in memory.
+
+    Args:
+        datasource: Datasource to upload the predictions to
+        to_metadata: Function that converts a prediction into the metadata of its datapoint
+        chunk_size: Amount of metadata entries to upload at a time
+    """
+
+    def __init__(self, datasource: "Datasource", to_metadata: Callable[[Any], Dict[str, Any]], chunk_size: int):
+        self._datasource = datasource
+        self._to_metadata = to_metadata
+        self._chunk_size = chunk_size
+        self._chunk: Optional["MetadataContextManager"] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prediction-upload")
+        self._uploading: Optional[Future] = None
+
+        # Same as metadata_context(), get the current fields to validate the uploaded values against
+        datasource.source.get_from_dagshub()
+        send_analytics_event("Client_DataEngine_addEnrichments", repo=datasource.source.repoApi)
+
+    def add(self, path: str, prediction: Any):
+        from dagshub.data_engine.model.datasource import MetadataContextManager
+
+        if self._chunk is None:
+            self._chunk = MetadataContextManager(self._datasource)
+        self._chunk.update_metadata(path, self._to_metadata(prediction))
+        if len(self._chunk) >= self._chunk_size:
+            self._submit()
+
+    def close(self):
+        """
+        Uploads the rest of the predictions, and waits for all the uploads to finish
+        """
+        try:
+            if self._chunk is not None and len(self._chunk) > 0:
+                self._submit()
+            self._wait()
+        finally:
+            self._executor.shutdown(wait=True)
+        # Get back the new metadata fields, same as after any other metadata upload
+        self._datasource.source.get_from_dagshub()
+
+    def abort(self):
+        """
+        Stops without uploading the rest of the predictions. The chunk that is being uploaded is finished.
+        """
+        self._chunk = None
+        self._executor.shutdown(wait=True)
+
+    def _submit(self):
+        self._wait()
+        chunk, self._chunk = self._chunk, None
+        self._uploading = self._executor.submit(self._upload, chunk)
+
+    def _wait(self):
+        # Raises the error of the previous upload, if it failed
+        if self._uploading is not None:
+            self._uploading.result()
+            self._uploading = None
+
+    def _upload(self, chunk: "MetadataContextManager"):
+        metadata = self._datasource._prepare_metadata_upload(chunk.metadata_buffer)
+        logger.debug(f"Uploading {len(metadata)} prediction metadata entries...")
+        for entries in metadata.iter_payload_batches(self._chunk_size):
+            self._datasource.source.client.update_metadata(self._datasource, entries)
+
+
+def map_in_order(executor: Executor, fn: Callable[[T], R], items: Iterable[T], max_pending: int) -> Iterator[R]:
+    """
+    Like ``executor.map()``, but takes the next items only when fewer than ``max_pending`` of them are running,
+    instead of submitting all the items up front.
+    The results are returned in the order of the items.
+    """
+    pending: Deque[Future] = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def load_mlflow_model(model_uri: str):
+    """
+    Loads an MLflow model with the library of its flavor, so ``predict()`` runs the native model
+    """
+    loader_module = mlflow.models.get_model_info(model_uri).flavors["python_function"]["loader_module"]
+    loader_module_elems = loader_module.split(".")
+    if loader_module_elems[-1] == "model":
+        loader_module_elems.pop()
+    loader_module = ".".join(loader_module_elems)
+    loader = mlflow.pyfunc if "pyfunc" in loader_module_elems else importlib.import_module(loader_module)
+    model = loader.load_model(model_uri)
+    if "torch" in loader_module:
+        model.predict = model.__call__
+    return model
+
+
+def load_mlflow_model_from_server(tracking_uri: str, model_uri: str):
+    mlflow.set_tracking_uri(tracking_uri)
+    return load_mlflow_model(model_uri)
+
+
+# Model and hooks of a worker process, set once by the initializer
+_worker_state: Optional[tuple] = None
+
+
+def _init_worker(load_model: Callable[[], Any], pre_hook: Callable, post_hook: Callable):
+    global _worker_state
+    logger.debug(f"Loading the model in worker process {os.getpid()}")
+    _worker_state = (load_model(), pre_hook, post_hook)
+
+
+def _predict_in_worker(local_paths: List[str]) -> Any:
+    model, pre_hook, post_hook = _worker_state
+    return post_hook(model.predict(pre_hook(local_paths)))
+
+
+def predict_in_processes(
+    batches: Iterable[List[str]],
+    num_proc: int,
+    load_model: Callable[[], Any],
+    pre_hook: Callable[[List[str]], Any],
+    post_hook: Callable[[Any], Any],
+) -> Iterator[Any]:
+    """
+    Runs the inference of the batches in ``num_proc`` worker processes.
+    Every worker loads its own copy of the model with ``load_model`` once, and then takes batches as it's free,
+    so faster workers take more of the batches.
+    The predictions are returned in the order of the batches.
+
+    The model loading function and the hooks are sent to the workers, so they need to be picklable
+    (functions defined at the top level of a module, not lambdas or local functions).
+    """
+    try:
+        pickle.dumps((load_model, pre_hook, post_hook))
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        raise ValueError(
+            "pre_hook and post_hook need to be picklable to predict in multiple processes. "
+            f"Use functions defined at the top level of a module instead of lambdas or local functions ({e})"
+        ) from e
+
+    # Spawn instead of fork, because forking a process that has other threads running can deadlock
+    with ProcessPoolExecutor(
+        max_workers=num_proc,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(load_model, pre_hook, post_hook),
+    ) as pool:
+        # Keep every worker busy, with the next batch already waiting for it
+        yield from map_in_order(pool, _predict_in_worker, batches, 2 * num_proc)
@@ -3,61 +3,85 @@ import inspect
 import logging
 from collections import Counter, defaultdict
 from concurrent.futures import as_completed, ThreadPoolExecutor
+import dataclasses
+import functools
 from dataclasses import field, dataclass
 from os import PathLike
 from pathlib import Path
-from typing import TYPE_CHECKING, List, Dict, Any, Optional, Union, Tuple, Literal, Callable
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Union, Tuple, Literal, Callable, Iterator
 import json
 import os
 import os.path
-import importlib
 
 import dacite
-import dagshub_annotation_converter.converters.yolo
 import rich.progress
+from dagshub_annotation_converter.converters.yolo import _guess_train_val_test_split
 from dagshub_annotation_converter.formats.yolo import YoloContext
 from dagshub_annotation_converter.formats.yolo.categories import Categories
 from dagshub_annotation_converter.formats.yolo.common import ir_mapping
-from dagshub_annotation_converter.ir.image import IRImageAnnotationBase
-from pydantic import ValidationError
 
 from dagshub.auth import get_token
 from dagshub.common import config
 from dagshub.common.analytics import send_analytics_event
 from dagshub.common.api import UserAPI
 from dagshub.common.download import download_files
+from dagshub.common.download_scheduler import get_download_scheduler
 from dagshub.common.helpers import sizeof_fmt, prompt_user, log_message
 from dagshub.common.rich_util import get_rich_progress
 from dagshub.common.util import lazy_load, multi_urljoin
 from dagshub.data_engine.annotation import MetadataAnnotations
+from dagshub.data_engine.annotation.parsing import ParsedTask, parse_ls_tasks, parse_ls_tasks_parallel
 from dagshub.data_engine.annotation.voxel_conversion import (
+    VOXEL_DIGEST_FIELD,
     add_voxel_annotations,
     add_ls_annotations,
+    plan_sync as plan_voxel_sync,
+    sample_digest,
 )
 from dagshub.data_engine.client.models import DatasourceType, MetadataSelectFieldSchema
+from dagshub.data_engine.client.stats import QueryStats
+from dagshub.data_engine.model.arrow_export import ArrowBatchConverter, convert_in_batches, hf_dataset_from_batches
+from dagshub.data_engine.model.blob_cache import get_blob_cache
+from dagshub.data_engine.model.blob_ref import BlobRef, BlobPrefetcher
 from dagshub.data_engine.model.datapoint import Datapoint, _get_blob, _generated_fields
+from dagshub.data_engine.model.datapoint_index import DatapointFieldIndex
+from dagshub.data_engine.model.errors import QueryNotLocallyEvaluableError
+from dagshub.data_engine.model import local_query, parquet_snapshot, prediction_pipeline, yolo_export
 from dagshub.data_engine.client.loaders.base import DagsHubDataset
 from dagshub.data_engine.model.schema_util import dacite_config
 from dagshub.data_engine.voxel_plugin_server.utils import set_voxel_envvars
 from dagshub.data_engine.dtypes import MetadataFieldType
 
 if TYPE_CHECKING:
-    from dagshub.data_engine.model.datasource import Datasource
+    from dagshub.data_engine.model.datasource import Datasource, DatasourceQuery
     import fiftyone as fo
     import dagshub.data_engine.voxel_plugin_server.server as plugin_server_module
     import datasets as hf_ds
     import tensorflow as tf
     import mlflow
     import mlflow.entities
+    import pandas
+    import pyarrow
+    import pyarrow.parquet as pq
 else:
     plugin_server_module = lazy_load("dagshub.data_engine.voxel_plugin_server.server")
     fo = lazy_load("fiftyone")
     tf = lazy_load("tensorflow")
     hf_ds = lazy_load("datasets")
     mlflow = lazy_load("mlflow")
+    pq = lazy_load("pyarrow.parquet")
 
 logger = logging.getLogger(__name__)
 
+DATAPOINT_HISTORY_BATCH_SIZE = 1000
+"""Amount of datapoints to request the history of in a single request"""
+
+VOXEL_SAMPLE_BATCH_SIZE = 1000
+"""Amount of voxel samples to create and add to the dataset at a time"""
+
+PARALLEL_ANNOTATION_PARSING_THRESHOLD = 5000
+"""Amount of annotations from which they're parsed in multiple processes. Below it, starting them isn't worth it"""
+
 CustomPredictor = Callable[
     [
         List[str],
@@ -93,7 +117,17 @@ class QueryResult:
     datasource: "Datasource"
     fields: List[MetadataSelectFieldSchema]
     query_data_time: Optional[datetime.datetime] = None
+    stats: Optional[QueryStats] = None
+    """
+    Timings and sizes of the requests that were made to get this result.
+    None if the result wasn't fetched from the server (e.g. it's a slice of another QueryResult)
+    """
     _datapoint_path_lookup: Dict[str, Datapoint] = field(init=False)
+    _blob_prefetcher: Optional[BlobPrefetcher] = field(init=False, default=None, repr=False)
+    _field_indexes: Dict[str, DatapointFieldIndex] = field(init=False, default_factory=dict, repr=False)
+    _columns: Dict[str, local_query.Column] = field(init=False, default_factory=dict, repr=False)
+    _full_query: Optional["DatasourceQuery"] = field(init=False, default=None, repr=False)
+    """Query whose whole result this is. None if it's a part of the result (e.g. head or a slice)"""
 
     def __post_init__(self):
         self._refresh_lookups()
@@ -111,9 +145,136 @@ class QueryResult:
         self._refresh_lookups()
 
     def _refresh_lookups(self):
-        self._datapoint_path_lookup = {}
-        for e in self.entries:
-            self._datapoint_path_lookup[e.path] = e
+        self._datapoint_path_lookup = {e.path: e for e in self.entries}
+        self._columns = {}
+        for fld in self._field_indexes:
+            self._field_indexes[fld] = DatapointFieldIndex(fld, self.entries)
+
+    def _extend_entries(self, datapoints: List[Datapoint]):
+        """
+        Appends datapoints to the result, updating the lookups only with the new datapoints
+        """
+        self._entries.extend(datapoints)
+        self._datapoint_path_lookup.update((dp.path, dp) for dp in datapoints)
+        self._columns = {}
+        for index in self._field_indexes.values():
+            index.add(datapoints)
+
+    def create_index(self, *fields: str):
+        """
+        Creates indexes on metadata fields, which speed up lookups with :func:`where`.
+
+        Indexes are kept up to date when datapoints are added to the result.
+        If you change the values of an indexed field in the datapoints afterwards,
+        call this function again to reindex the field.
+
+        Args:
+            fields: Fields to index
+        """
+        for fld in fields:
+            self._field_indexes[fld] = DatapointFieldIndex(fld, self.entries)
+
+    def where(self, **conditions: Any) -> "QueryResult":
+        """
+        Returns a new QueryResult with the datapoints whose metadata fields are equal to the given values.
+        This is filtering done locally on the already fetched datapoints, no query is sent to the server.
+
+        Fields indexed with :func:`create_index` are looked up in the index, the rest are checked one by one.
+
+        Example::
+
+            res = ds.all()
+            res.create_index("label")
+            cats = res.where(label="cat")
+            # Fields with names that aren't valid python identifiers
+            big_cats = res.where(**{"label": "cat", "size class": "big"})
+
+        Args:
+            conditions: field name = value pairs. All of them have to match.
+        """
+        indexed = [
+            self._field_indexes[fld].candidates(val) for fld, val in conditions.items() if fld in self._field_indexes
+        ]
+        candidates = min(indexed, key=len) if indexed else self.entries
+
+        # Index hits are checked too, in case the values changed after indexing
+        missing = object()
+        matched = [
+            dp for dp in candidates if all(dp.metadata.get(fld, missing) == val for fld, val in conditions.items())
+        ]
+        return QueryResult(_entries=matched, datasource=self.datasource, fields=self.fields)
+
+    def refine(self, query: Union["Datasource", "DatasourceQuery"], check_superset=True) -> "QueryResult":
+        """
+        Runs a query on the datapoints of this result locally, instead of sending it to the server.
+        Useful for narrowing down a result that's already fetched, e.g. during interactive exploration.
+
+        The filters are evaluated on whole columns of metadata at once.
+        Filters, ``order_by`` and ``select`` of plain fields are supported.
+        Fields queried or selected with ``as_of``, aliases, blob and multi-value fields aren't.
+
+        Example::
+
+            res = ds.all()
+            big = res.refine(ds[ds["size"] > 5])
+            recent_big = big.refine(ds[(ds["size"] > 5) & (ds["year"] >= 2020)].order_by("size"))
+
+        Args:
+            query: Datasource with the query to run, or the query itself.
+            check_superset: Check that the query only narrows down the query that produced this result,
+                so it can't match datapoints that weren't fetched.
+                The check requires this result to be the full result of a query (e.g. from :func:`.Datasource.all`).
+                Set to ``False`` to filter any result (e.g. a :func:`.Datasource.head`) without the check.
+
+        Raises:
+            QueryNotLocallyEvaluableError: The query can't be evaluated locally and needs to be sent to the server.
+        """
+        import numpy as np
+        from dagshub.data_engine.model.datasource import Datasource
+
+        datasource = self.datasource
+        if isinstance(query, Datasource):
+            datasource = query
+            query = query.get_query()
+
+        base = self._full_query
+        if check_superset and base is None:
+            raise QueryNotLocallyEvaluableError("the result isn't the full result of a query")
+        filters = local_query.remaining_filters(base if check_superset else None, query)
+        available = local_query.check_fields(filters, query, base, self.fields)
+
+        rows = np.arange(len(self.entries))
+        for f in filters:
+            rows = rows[local_query.evaluate_filter(f, self._column, query.time_zone, rows)]
+        if query.order_by and (base is None or query.order_by != base.order_by):
+            order = local_query.sort_order(query.order_by, self._column)
+            matched = np.zeros(len(self.entries), dtype=bool)
+            matched[rows] = True
+            rows = order[matched[order]]
+        entries = [self.entries[i] for i in rows]
+
+        fields = self.fields
+        if query.select is not None and (base is None or query.select != base.select):
+            selected = [s["name"] for s in query.select]
+            fields = [available[name] for name in selected]
+            entries = [
+                dataclasses.replace(dp, metadata={k: dp.metadata[k] for k in selected if k in dp.metadata})
+                for dp in entries
+            ]
+
+        res = QueryResult(_entries=entries, datasource=datasource, fields=fields, query_data_time=self.query_data_time)
+        if check_superset:
+            res._full_query = query.__deepcopy__()
+        return res
+
+    def _column(self, field_name: str) -> local_query.Column:
+        values = [dp.metadata.get(field_name) for dp in self.entries]
+        column = self._columns.get(field_name)
+        # The metadata of the datapoints can be changed in place, rebuild the column if any of the values changed
+        if column is None or not column.has_values(values):
+            column = local_query.Column(values)
+            self._columns[field_name] = column
+        return column
 
     @property
     def dataframe(self):
@@ -132,12 +293,72 @@ class QueryResult:
         metadata_keys = list(sorted(metadata_key_set))
         return pd.DataFrame.from_records([dp.to_dict(metadata_keys) for dp in self.entries])
 
+    def get_version_timestamps(
+        self,
+        fields: Optional[List[str]] = None,
+        from_time: Optional[datetime.datetime] = None,
+        to_time: Optional[datetime.datetime] = None,
+        num_proc: int = 4,
+    ) -> "pandas.DataFrame":
+        """
+        Get the timestamps of all versions of the datapoints in this QueryResult, where the specified fields changed.
+
+        The histories are requested for many datapoints at once, with ``num_proc`` requests running in parallel.
+
+        Args:
+            fields: List of fields to check for changes. If None, all fields are checked.
+            from_time: Only search versions since this time. If None, the start time is unbounded
+            to_time: Only search versions until this time. If None, the end time is unbounded
+            num_proc: number of requests to run in parallel
+
+        Returns:
+            Dataframe with a row for each version of each datapoint,
+            with columns ``path``, ``datapoint_id`` and ``timestamp`` (UTC).
+        """
+        import pandas as pd
+
+        client = self.datasource.source.client
+        batch_size = DATAPOINT_HISTORY_BATCH_SIZE
+        batches = [self.entries[start : start + batch_size] for start in range(0, len(self.entries), batch_size)]
+
+        progress = get_rich_progress(rich.progress.MofNCompleteColumn())
+        task = progress.add_task("Getting datapoint histories...", total=len(self.entries))
+
+        def get_batch_history(batch: List[Datapoint]):
+            res = client.get_datapoint_history(batch, fields, from_time, to_time)
+            progress.update(task, advance=len(batch))
+            return res
+
+        with progress:
+            with ThreadPoolExecutor(max_workers=num_proc) as tp:
+                # map() keeps the order of the batches, so the rows are in the order of the datapoints
+                histories = list(tp.map(get_batch_history, batches))
+
+        paths = []
+        datapoint_ids = []
+        timestamps = []
+        for batch, history in zip(batches, histories):
+            for dp in batch:
+                for version in history.get(dp.path, []):
+                    paths.append(dp.path)
+                    datapoint_ids.append(dp.datapoint_id)
+                    timestamps.append(version.timestamp)
+
+        return pd.DataFrame({"path": paths, "datapoint_id": datapoint_ids, "timestamp": timestamps})
+
     def __len__(self):
         return len(self.entries)
 
     def __iter__(self):
         """You can iterate over a QueryResult to get containing datapoints"""
-        return self.entries.__iter__()
+        if self._blob_prefetcher is None:
+            return self.entries.__iter__()
+        return self._prefetching_iter(self._blob_prefetcher)
+
+    def _prefetching_iter(self, prefetcher: BlobPrefetcher):
+        for i, dp in enumerate(self.entries):
+            prefetcher.advance(i)
+            yield dp
 
     def __repr__(self):
         return f"QueryResult of datasource {self.datasource.source.name} with {len(self.entries)} datapoint(s)"
@@ -182,7 +403,10 @@ class QueryResult:
 
             savedir (str|Path): Where to store the datapoint files. Default is :func:`datasource's default location \
                 <dagshub.data_engine.model.datasource.Datasource.default_dataset_location>`
-            processes (int): number of parallel processes to download the datapoints with. Default is 8.
+            processes (int): number of threads to download the datapoints with. Default is 8.
+            prefetch_window (int): When the dataset is used in a PyTorch dataloader,\
+                how many of the next datapoints of the sampler every worker downloads ahead of accessing them.\
+                Set to 0 to disable prefetching. Default is 32.
             tensorizers: How to transform the datapoint file/metadata into tensors. Possible values:
 
                 - ``"auto"`` - try to guess the tensorizers for every field.\
@@ -269,8 +493,13 @@ class QueryResult:
             raise ValueError("supported flavors are torch|tensorflow|<torch.utils.data.Dataset>|<tf.data.Dataset>")
 
     def as_hf_dataset(
-        self, target_dir: Optional[Union[str, PathLike]] = None, download_datapoints=True, download_blobs=True
-    ):
+        self,
+        target_dir: Optional[Union[str, PathLike]] = None,
+        download_datapoints=True,
+        download_blobs=True,
+        cache_dir: Optional[Union[str, PathLike]] = None,
+        batch_size: int = 10_000,
+    ) -> "hf_ds.Dataset":
         """
         Loads this QueryResult as a HuggingFace dataset.
 
@@ -279,39 +508,170 @@ class QueryResult:
         <https://huggingface.co/docs/datasets/main/en/package_reference/main_classes#datasets.Dataset.cast_column>`_\
         function later.
 
+        The dataset is built from Arrow record batches of ``batch_size`` datapoints, without an intermediate
+        pandas dataframe. Annotation fields are stored as Label Studio task JSON strings,
+        datetime fields as UTC timestamps.
+
         Args:
             target_dir: Where to download the datapoints. The metadata is still downloaded into the global cache.
             download_datapoints: If set to ``True`` (default), downloads the datapoint files and sets the path column\
                 to the path of the datapoint in the filesystem
             download_blobs: If set to ``True`` (default), downloads all blob fields and sets the respective column\
                 to the path of the file in the filesystem.
+            cache_dir: If specified, the batches are written into an Arrow file in this directory,
+                and the dataset is memory-mapped from it, instead of being kept in memory.
+            batch_size: How many datapoints to convert at a time
+        """
+        batches = self._to_arrow_batches(target_dir, download_datapoints, download_blobs, batch_size)
+        return hf_dataset_from_batches(batches, cache_dir)
+
+    def _to_arrow_batches(
+        self,
+        target_dir: Optional[Union[str, PathLike]],
+        download_datapoints: bool,
+        download_blobs: bool,
+        batch_size: int,
+        converter: Optional[ArrowBatchConverter] = None,
+    ) -> Iterator["pyarrow.RecordBatch"]:
+        """
+        Downloads the files of the result for the HuggingFace export, and converts it into Arrow record batches.
+
+        Args:
+            converter: Converter to use, to keep the schema of the batches of multiple results the same.
+                If not specified, a converter with a column for every metadata key in the result is used.
         """
         if download_blobs:
             # Download blobs as paths, so later a user can apply ds.cast_column on the blobs
             self.get_blob_fields(load_into_memory=False, path_format="str")
 
-        df = self.dataframe
+        if converter is None:
+            metadata_keys = set()
+            for e in self.entries:
+                metadata_keys.update(e.metadata.keys())
+            columns = sorted(k for k in metadata_keys if k not in _generated_fields)
+            converter = ArrowBatchConverter(self.fields, columns)
 
         if download_datapoints:
             # Do the same for the actual datapoint files, changing the path
-
             if target_dir is None:
                 target_dir = self.datasource.default_dataset_location
-            elif isinstance(target_dir, str):
+            else:
                 target_dir = Path(target_dir).absolute()
-            new_paths = []
             self.download_files(target_dir=target_dir)
-            for dp in df["path"]:
-                new_paths.append(str(target_dir / self.datasource.source.source_prefix / dp))
-            df["path"] = new_paths
+            prefix = target_dir / self.datasource.source.source_prefix
+            converter.path_fn = lambda dp: str(prefix / dp.path)
+        else:
+            converter.path_fn = lambda dp: dp.path
 
-        # Drop the generated fields
-        for f in _generated_fields.keys():
-            if f == "path":
-                continue
-            df.drop(f, axis=1, inplace=True)
+        return convert_in_batches(converter, self.entries, batch_size)
+
+    def to_parquet(
+        self, path: Union[str, PathLike], row_group_size: int = parquet_snapshot.DEFAULT_ROW_GROUP_SIZE
+    ) -> Path:
+        """
+        Saves the datapoints and their metadata into a Parquet file, to archive the result of the query.
+        The file can be loaded back with :func:`from_parquet` without querying DagsHub.
+
+        The file has the columns ``path``, ``datapoint_id`` and a column for every metadata field.
+        Loaded annotations are stored as Label Studio task JSON strings,
+        datetimes as UTC timestamps, and blob fields as they are currently loaded (hashes, local paths or contents).
+        The datasource, query and fields of the result are stored in the metadata of the file.
 
-        return hf_ds.Dataset.from_pandas(df)
+        Args:
+            path: Where to save the file
+            row_group_size: How many datapoints to convert and write at a time. Each row group of the file
+                can later be loaded separately with :func:`iter_parquet`.
+
+        Returns:
+            The path to the saved file
+        """
+        path = Path(path)
+        metadata_keys = set()
+        for e in self.entries:
+            metadata_keys.update(e.metadata.keys())
+        columns = sorted(k for k in metadata_keys if k not in _generated_fields)
+        converter = ArrowBatchConverter(self.fields, columns, with_ids=True)
+
+        annotation_fields = [
+            f for f in self.annotation_fields if any(isinstance(dp.metadata.get(f), MetadataAnnotations) for dp in self)
+        ]
+        query = self._full_query if self._full_query is not None else self.datasource.get_query()
+        metadata = parquet_snapshot.snapshot_metadata(
+            self.datasource,
+            query,
+            self.fields,
+            self.query_data_time,
+            annotation_fields,
+            complete=self._full_query is not None,
+        )
+        writer = parquet_snapshot.SnapshotWriter(path, metadata, row_group_size)
+        try:
+            for batch in convert_in_batches(converter, self.entries, row_group_size):
+                writer.write(batch)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+        return path
+
+    @staticmethod
+    def iter_parquet(path: Union[str, PathLike], datasource: Optional["Datasource"] = None) -> Iterator["QueryResult"]:
+        """
+        Loads a result saved with :func:`to_parquet` one row group at a time, without querying DagsHub.
+        The row groups are read as they're iterated over, so only one of them has to be in memory at a time.
+
+        Args:
+            path: Path to the Parquet file
+            datasource: Datasource to attach the datapoints to.
+                By default, the datasource and the query are recreated from the file.
+        """
+        parquet_file = pq.ParquetFile(str(path), memory_map=True)
+        info = parquet_snapshot.read_snapshot_info(parquet_file)
+        return QueryResult._iter_parquet_row_groups(parquet_file, info, datasource)
+
+    @staticmethod
+    def _iter_parquet_row_groups(
+        parquet_file: "pq.ParquetFile", info: Dict[str, Any], datasource: Optional["Datasource"]
+    ) -> Iterator["QueryResult"]:
+        if datasource is None:
+            datasource = parquet_snapshot.datasource_from_snapshot(info)
+        fields = parquet_snapshot.snapshot_fields(info)
+        query_data_time = parquet_snapshot.snapshot_query_data_time(info)
+        annotation_fields = info["annotationFields"]
+
+        if parquet_file.num_row_groups == 0:
+            yield QueryResult([], datasource, fields, query_data_time)
+        for i in range(parquet_file.num_row_groups):
+            datapoints = []
+            for batch in parquet_file.read_row_group(i).to_batches():
+                datapoints += parquet_snapshot.datapoints_from_batch(batch, datasource, annotation_fields)
+            res = QueryResult(datapoints, datasource, fields, query_data_time)
+            res._convert_annotation_fields(*annotation_fields, load_into_memory=True)
+            yield res
+
+    @staticmethod
+    def from_parquet(path: Union[str, PathLike], datasource: Optional["Datasource"] = None) -> "QueryResult":
+        """
+        Loads a result saved with :func:`to_parquet`, without querying DagsHub.
+
+        Datetime fields are loaded in UTC.
+
+        Args:
+            path: Path to the Parquet file
+            datasource: Datasource to attach the datapoints to.
+                By default, the datasource and the query are recreated from the file.
+        """
+        parquet_file = pq.ParquetFile(str(path), memory_map=True)
+        info = parquet_snapshot.read_snapshot_info(parquet_file)
+        res: Optional[QueryResult] = None
+        for part in QueryResult._iter_parquet_row_groups(parquet_file, info, datasource):
+            if res is None:
+                res = part
+            else:
+                res._extend_entries(part.entries)
+        if info["complete"]:
+            res._full_query = parquet_snapshot.snapshot_query(info)
+        return res
 
     def __getitem__(self, item: Union[str, int, slice]):
         """
@@ -336,6 +696,9 @@ class QueryResult:
         cache_on_disk=True,
         num_proc: int = config.download_threads,
         path_format: Literal["str", "path"] = "path",
+        lazy: bool = False,
+        prefetch_window: int = config.download_threads,
+        memory_map: bool = False,
     ) -> "QueryResult":
         """
         Downloads data from blob fields.
@@ -353,16 +716,38 @@ class QueryResult:
 
                 If True: the datapoints' specified fields will contain the blob data
 
-                If False: the datapoints' specified fields will contain Path objects to the file of the downloaded blob
+                If False: the datapoints' specified fields will contain Path objects to the file of the downloaded blob.
+                The files are in the blob cache, which deletes the least recently used blobs when it's over its size
+                budget. They aren't deleted while this function runs, but later downloads can delete them,
+                so read them soon or increase the budget (``DAGSHUB_DE_BLOB_CACHE_MAX_SIZE``).
             cache_on_disk: Whether to cache the blobs on disk or not (valid only if load_into_memory is set to True)
-                Cache location is ``~/dagshub/datasets/<repo>/<datasource_id>/.metadata_blobs/``
+                The cache is shared between all datasources on the machine, see :mod:`.blob_cache`.
+                Its location and size budget can be changed with the ``DAGSHUB_DE_BLOB_CACHE_LOCATION``
+                and ``DAGSHUB_DE_BLOB_CACHE_MAX_SIZE`` environment variables
             num_proc: number of download threads
             path_format: What way the paths to the file should be represented.
                 ``path`` returns a Path object, and ``str`` returns a string of this path.
+            lazy: Don't download the blobs right away. Instead, the fields will contain
+                :class:`~dagshub.data_engine.model.blob_ref.BlobRef` objects that download the blob on first access.
+                While iterating over the QueryResult, blobs of the next ``prefetch_window`` datapoints
+                are downloaded in the background using ``num_proc`` threads.
+                ``load_into_memory`` and ``path_format`` are ignored for lazy fields.
+                Annotation and document fields are always loaded right away, because they need to be converted.
+            prefetch_window: How many datapoints ahead to download the blobs of, when ``lazy`` is True.
+                Only the blobs of the window are downloaded at any time,
+                so the memory usage is bounded even if ``cache_on_disk`` is False.
+            memory_map: When ``load_into_memory`` is True, load the blobs as read-only ``memoryview`` objects
+                over the memory-mapped files in the blob cache, instead of copying them into ``bytes``.
+                Requires ``cache_on_disk``. Annotation and document fields are still loaded as ``bytes``.
+
+        .. note::
+            Annotations of big query results can be parsed in multiple processes, by setting the
+            ``DAGSHUB_DE_ANNOTATION_PARSE_PROCESSES`` environment variable to the number of processes.
+            The processes are spawned, so they import the main module of your program again.
+            If you run a script, put its code under ``if __name__ == "__main__":``,
+            otherwise every worker process runs it again.
         """
         send_analytics_event("Client_DataEngine_downloadBlobs", repo=self.datasource.source.repoApi)
-        if not load_into_memory:
-            assert cache_on_disk
 
         # If no fields are specified, include all blob fields from self..fields
         if not fields:
@@ -378,20 +763,25 @@ class QueryResult:
             logger.warning("No blob fields loaded")
             return self
 
-        cache_location = self.datasource.default_dataset_location / ".metadata_blobs"
+        if lazy:
+            lazy_fields = [f for f in fields if f not in self.annotation_fields and f not in self.document_fields]
+            self._set_lazy_blob_fields(lazy_fields, cache_on_disk, num_proc, prefetch_window)
+            fields = tuple(f for f in fields if f not in lazy_fields)
+            if len(fields) == 0:
+                return self
 
-        if cache_on_disk:
-            cache_location.mkdir(parents=True, exist_ok=True)
+        if not load_into_memory or memory_map:
+            assert cache_on_disk
 
-        # Create a list of things to download: (datapoint, field, url, path_location)
-        to_download: List[Tuple[Datapoint, str, str, Path]] = []
+        # Create a list of things to download: (datapoint, field, url, blob_hash)
+        to_download: List[Tuple[Datapoint, str, str, str]] = []
         for dp in self.entries:
             for fld in fields:
                 field_value = dp.metadata.get(fld)
                 # If field_value is a blob or a path, then ignore, means it's already been downloaded
                 if not isinstance(field_value, str):
                     continue
-                download_task = (dp, fld, dp.blob_url(field_value), dp.blob_cache_location / field_value)
+                download_task = (dp, fld, dp.blob_url(field_value), field_value)
                 to_download.append(download_task)
 
         progress = get_rich_progress(rich.progress.MofNCompleteColumn())
@@ -399,35 +789,62 @@ class QueryResult:
 
         auth = self.datasource.source.repoApi.auth
 
-        def _get_blob_fn(dp: Datapoint, field: str, url: str, blob_path: Path):
-            blob_or_path = _get_blob(url, blob_path, auth, cache_on_disk, load_into_memory, path_format)
+        mapped_fields = (
+            {f for f in fields if f not in self.annotation_fields and f not in self.document_fields}
+            if memory_map
+            else set()
+        )
+
+        def _get_blob_fn(dp: Datapoint, field: str, url: str, blob_hash: str):
+            blob_or_path = _get_blob(
+                url, blob_hash, auth, cache_on_disk, load_into_memory, path_format, memory_map=field in mapped_fields
+            )
             if isinstance(blob_or_path, str) and path_format != "str":
                 logger.warning(f"Error while downloading blob for field {field} in datapoint {dp.path}:{blob_or_path}")
             dp.metadata[field] = blob_or_path
 
-        with progress:
-            with ThreadPoolExecutor(max_workers=num_proc) as tp:
-                futures = [tp.submit(_get_blob_fn, *args) for args in to_download]
-                for f in as_completed(futures):
-                    exc = f.exception()
-                    if exc is not None:
-                        logger.warning(f"Got exception {type(exc)} while downloading blob: {exc}")
-                    progress.update(task, advance=1)
+        # The paths of the blobs that are stored in the datapoints stay in the cache at least until this returns,
+        # even if the blobs of this call don't fit in the size budget of the cache
+        with get_blob_cache().pinning():
+            with progress:
+                with ThreadPoolExecutor(max_workers=num_proc) as tp:
+                    futures = [tp.submit(_get_blob_fn, *args) for args in to_download]
+                    for f in as_completed(futures):
+                        exc = f.exception()
+                        if exc is not None:
+                            logger.warning(f"Got exception {type(exc)} while downloading blob: {exc}")
+                        progress.update(task, advance=1)
+            get_download_scheduler().log_summary()
+
+            self._convert_annotation_fields(*fields, load_into_memory=load_into_memory)
+
+            # Convert any downloaded document fields
+            document_fields = [f for f in fields if f in self.document_fields]
+            if document_fields:
+                for dp in self:
+                    for fld in document_fields:
+                        if fld in dp.metadata:
+                            # Override the load_into_memory flag, because we need the contents
+                            if not load_into_memory:
+                                dp.metadata[fld] = Path(dp.metadata[fld]).read_bytes()
+                            dp.metadata[fld] = dp.metadata[fld].decode("utf-8")
 
-        self._convert_annotation_fields(*fields, load_into_memory=load_into_memory)
+        return self
 
-        # Convert any downloaded document fields
-        document_fields = [f for f in fields if f in self.document_fields]
-        if document_fields:
-            for dp in self:
-                for fld in document_fields:
-                    if fld in dp.metadata:
-                        # Override the load_into_memory flag, because we need the contents
-                        if not load_into_memory:
-                            dp.metadata[fld] = Path(dp.metadata[fld]).read_bytes()
-                        dp.metadata[fld] = dp.metadata[fld].decode("utf-8")
+    def _set_lazy_blob_fields(self, fields: List[str], cache_on_disk: bool, num_proc: int, prefetch_window: int):
+        auth = self.datasource.source.repoApi.auth
+        for dp in self.entries:
+            for fld in fields:
+                field_value = dp.metadata.get(fld)
+                # Only hashes of blobs that weren't downloaded yet
+                if not isinstance(field_value, str):
+                    continue
+                dp.metadata[fld] = BlobRef(field_value, dp.blob_url(field_value), auth, cache_on_disk)
 
-        return self
+        lazy_fields = list(fields)
+        if self._blob_prefetcher is not None:
+            lazy_fields += [f for f in self._blob_prefetcher.fields if f not in lazy_fields]
+        self._blob_prefetcher = BlobPrefetcher(self.entries, lazy_fields, prefetch_window, num_proc)
 
     def _convert_annotation_fields(self, *fields, load_into_memory):
         # Convert any downloaded annotation column
@@ -436,8 +853,9 @@ class QueryResult:
         bad_annotations = defaultdict(list)
 
         if annotation_fields:
-            # Convert them
-            for dp in self:
+            # Collect the annotations to parse: (datapoint, field, label studio task)
+            to_parse: List[Tuple[Datapoint, str, bytes]] = []
+            for dp in self.entries:
                 for fld in annotation_fields:
                     if fld in dp.metadata:
                         # Already loaded - skip
@@ -446,15 +864,20 @@ class QueryResult:
                         # Override the load_into_memory flag, because we need the contents
                         if not load_into_memory:
                             dp.metadata[fld] = Path(dp.metadata[fld]).read_bytes()
-                        try:
-                            dp.metadata[fld] = MetadataAnnotations.from_ls_task(
-                                datapoint=dp, field=fld, ls_task=dp.metadata[fld]
-                            )
-                        except ValidationError:
-                            bad_annotations[fld].append(dp.path)
+                        to_parse.append((dp, fld, dp.metadata[fld]))
                     else:
                         dp.metadata[fld] = MetadataAnnotations(datapoint=dp, field=fld)
 
+            parsed_tasks = self._parse_annotations([(ls_task, dp.path) for dp, _, ls_task in to_parse])
+            for (dp, fld, ls_task), parsed in zip(to_parse, parsed_tasks):
+                if parsed is None:
+                    bad_annotations[fld].append(dp.path)
+                    continue
+                annotations, meta = parsed
+                dp.metadata[fld] = MetadataAnnotations(
+                    datapoint=dp, field=fld, annotations=annotations, meta=meta, original_value=ls_task
+                )
+
         if bad_annotations:
             log_message(
                 "Warning: The following datapoints had invalid annotations, "
@@ -466,6 +889,17 @@ class QueryResult:
                 err_msg += "\n\t".join(dps)
             log_message(err_msg)
 
+    @staticmethod
+    def _parse_annotations(tasks: List[Tuple[bytes, str]]) -> List[ParsedTask]:
+        num_proc = config.dataengine_annotation_parse_processes
+        if num_proc <= 1 or len(tasks) < PARALLEL_ANNOTATION_PARSING_THRESHOLD:
+            return parse_ls_tasks(tasks)
+
+        progress = get_rich_progress(rich.progress.MofNCompleteColumn())
+        task = progress.add_task("Parsing annotations...", total=len(tasks))
+        with progress:
+            return parse_ls_tasks_parallel(tasks, num_proc, on_progress=lambda n: progress.update(task, advance=n))
+
     def download_binary_columns(
         self,
         *columns: str,
@@ -495,6 +929,8 @@ class QueryResult:
         post_hook: Callable[[Any], Any] = identity_func,
         batch_size: int = 1,
         log_to_field: str = "annotation",
+        pipelined: bool = False,
+        num_proc: int = 1,
     ) -> Dict[str, Any]:
         """
         Fetch an MLflow model from a specific repository and use it to annotate the datapoints in this QueryResult.
@@ -524,6 +960,10 @@ class QueryResult:
             batch_size: Size of the file batches that are sent to ``model.predict()``.
                 Default batch size is 1, but it is still being sent as a list for consistency.
             log_to_field: Field to store the resulting annotations in.
+            pipelined: Overlap the downloads, the inference and the uploads,
+                refer to :func:`generate_predictions` for details.
+            num_proc: Number of processes to run the inference in,
+                refer to :func:`predict_with_mlflow_model` for details.
         """
         res = self.predict_with_mlflow_model(
             repo,
@@ -534,6 +974,8 @@ class QueryResult:
             post_hook=post_hook,
             batch_size=batch_size,
             log_to_field=log_to_field,
+            pipelined=pipelined,
+            num_proc=num_proc,
         )
         self.datasource.metadata_field(log_to_field).set_annotation().apply()
         return res
@@ -548,6 +990,8 @@ class QueryResult:
         post_hook: Callable[[Any], Any] = identity_func,
         batch_size: int = 1,
         log_to_field: Optional[str] = None,
+        pipelined: bool = False,
+        num_proc: int = 1,
     ) -> Dict[str, Any]:
         """
         Fetch an MLflow model from a specific repository and use it to predict on the datapoints in this QueryResult.
@@ -577,38 +1021,49 @@ class QueryResult:
             batch_size: Size of the file batches that are sent to ``model.predict()``.
                 Default batch size is 1, but it is still being sent as a list for consistency.
             log_to_field: If set, writes prediction results to this metadata field in the datasource.
+            pipelined: Overlap the downloads, the inference and the uploads,
+                refer to :func:`generate_predictions` for details.
+            num_proc: Number of processes to run the inference in. Every process loads its own copy of the model,
+                and takes the next batch when it's done with the previous one.
+                The predictions are collected in the order of the datapoints.
+                With more than one process, ``pre_hook`` and ``post_hook`` have to be picklable
+                (functions defined at the top level of a module, not lambdas).
         """
         if not host:
             host = self.datasource.source.repoApi.host
 
-        prev_uri = mlflow.get_tracking_uri()
-        mlflow.set_tracking_uri(multi_urljoin(host, f"{repo}.mlflow"))
+        tracking_uri = multi_urljoin(host, f"{repo}.mlflow")
         token = get_token(host=host)
         os.environ["MLFLOW_TRACKING_USERNAME"] = UserAPI.get_user_from_token(token, host=host).username
         os.environ["MLFLOW_TRACKING_PASSWORD"] = token
         model_uri = f"models:/{name}/{version}"
 
-        try:
-            loader_module = mlflow.models.get_model_info(model_uri).flavors["python_function"]["loader_module"]
-            loader_module_elems = loader_module.split(".")
-            if loader_module_elems[-1] == "model":
-                loader_module_elems.pop()
-            loader_module = ".".join(loader_module_elems)
-            loader = mlflow.pyfunc if "pyfunc" in loader_module_elems else importlib.import_module(loader_module)
-            model = loader.load_model(model_uri)
-        finally:
-            mlflow.set_tracking_uri(prev_uri)
+        if num_proc > 1:
+            # The workers get the credentials from the environment they inherit
+            load_model = functools.partial(prediction_pipeline.load_mlflow_model_from_server, tracking_uri, model_uri)
+
+            def predict_batches(batches: Iterator[List[str]]) -> Iterator[Any]:
+                return prediction_pipeline.predict_in_processes(batches, num_proc, load_model, pre_hook, post_hook)
 
-        if "torch" in loader_module:
-            model.predict = model.__call__
+        else:
+            prev_uri = mlflow.get_tracking_uri()
+            mlflow.set_tracking_uri(tracking_uri)
+            try:
+                model = prediction_pipeline.load_mlflow_model(model_uri)
+            finally:
+                mlflow.set_tracking_uri(prev_uri)
 
-        return self.generate_predictions(lambda x: post_hook(model.predict(pre_hook(x))), batch_size, log_to_field)
+            def predict_batches(batches: Iterator[List[str]]) -> Iterator[Any]:
+                return (post_hook(model.predict(pre_hook(local_paths))) for local_paths in batches)
+
+        return self._run_predictions(predict_batches, batch_size, log_to_field, pipelined)
 
     def get_annotations(self, **kwargs) -> "QueryResult":
         """
         Loads all annotation fields using :func:`get_blob_fields`.
 
         All keyword arguments are passed to :func:`get_blob_fields`.
+        See its note about parsing the annotations in multiple processes.
         """
         if len(self.annotation_fields) == 0:
             return self
@@ -634,7 +1089,9 @@ class QueryResult:
                 <dagshub.data_engine.model.datasource.Datasource.default_dataset_location>`
             keep_source_prefix: If True, includes the prefix of the datasource in the download path.
             redownload: Whether to redownload a file if it exists on the filesystem already.\
-                We don't do any hashsum checks, so if it's possible that the file has been updated, set to True
+                Files that weren't downloaded completely are always downloaded again.\
+                The contents of the files aren't compared, so if it's possible that a file has been updated,\
+                set to True. Files that the server reports as unchanged aren't downloaded again.
             path_field: Set this to the name of the field with the file's path\
                 if you want to download files from a field other than the datapoint's path.
 
@@ -688,28 +1145,33 @@ class QueryResult:
         download_files(download_args, skip_if_exists=not redownload)
         return target_path
 
-    def _get_all_annotations(self, annotation_field: str) -> List[IRImageAnnotationBase]:
-        annotations = []
-        for dp in self.entries:
-            if annotation_field in dp.metadata:
-                annotations.extend(dp.metadata[annotation_field].annotations)
-        return annotations
-
     def export_as_yolo(
         self,
         download_dir: Optional[Union[str, Path]] = None,
         annotation_field: Optional[str] = None,
         annotation_type: Optional[Literal["bbox", "segmentation", "pose"]] = None,
+        file_link: Literal["hardlink", "symlink", "copy"] = "hardlink",
     ) -> Path:
         """
         Downloads the files and annotations in a way that can be used to train with YOLO immediately.
 
+        The files are downloaded to the
+        :func:`datasource's default location <dagshub.data_engine.model.datasource.Datasource.default_dataset_location>`
+        and linked into the export directory from there, so they're downloaded only once for all exports.
+        Exporting again to the same directory only rewrites the label files of the datapoints
+        whose annotations changed, and removes the files of datapoints that aren't in the query result anymore.
+
         Args:
             download_dir: Where to download the files. Defaults to ``./dagshub_export``
             annotation_field: Field with the annotations. If None, uses the first alphabetical annotation field.
             annotation_type: Type of YOLO annotations to export.
                 Possible values: "bbox", "segmentation", "pose".
                 If None, returns based on the most common annotation type.
+            file_link: How to put the downloaded files into the export directory.
+                Possible values: "hardlink", "symlink", "copy".
+                If a hardlink or a symlink can't be created, for example because the export directory is on another
+                file system, the file is copied instead.
+                Don't modify hardlinked or symlinked images in place, because that also changes the downloaded files.
 
         Returns:
             The path to the YAML file with the metadata. Pass this path to ``YOLO.train()`` to train a model.
@@ -723,17 +1185,32 @@ class QueryResult:
 
         if download_dir is None:
             download_dir = Path("dagshub_export")
-        download_dir = Path(download_dir) / "data"
+        export_root = Path(download_dir)
+        download_dir = export_root / "data"
 
-        annotations = self._get_all_annotations(annotation_field)
+        source_prefix = self.datasource.source.source_prefix
 
-        categories = Categories()
-        ann_types: dict[type, int] = {}
+        # Group the annotations by their image file, with the source prefix added to the path.
+        # The annotations themselves aren't changed, so exporting again doesn't add the prefix twice
+        label_files: Dict[str, yolo_export.LabelFile] = {}
+        for dp in self.entries:
+            dp_annotations = dp.metadata.get(annotation_field)
+            if not isinstance(dp_annotations, MetadataAnnotations) or len(dp_annotations.annotations) == 0:
+                continue
+            dp_files = set()
+            for ann in dp_annotations.annotations:
+                filename = os.path.join(source_prefix, ann.filename)
+                if filename not in label_files:
+                    label_files[filename] = yolo_export.LabelFile(image_filename=filename)
+                label_files[filename].annotations.append(ann)
+                dp_files.add(filename)
+            value = dp_annotations.value
+            for filename in dp_files:
+                label_files[filename].values.append(value)
+        annotations = [ann for label_file in label_files.values() for ann in label_file.annotations]
 
+        categories = Categories()
         for ann in annotations:
-            if annotation_type is None:
-                ann_type = type(ann)
-                ann_types[ann_type] = ann_types.get(ann_type, 0) + 1
             for cat in ann.categories.keys():
                 categories.get_or_create(cat)
 
@@ -746,23 +1223,49 @@ class QueryResult:
 
         image_download_path = Path(download_dir)
 
-        # Add the source prefix to all annotations
-        for ann in annotations:
-            ann.filename = os.path.join(self.datasource.source.source_prefix, ann.filename)
-
         # If there's no folder "images" in the datasource, prepend it to the path
-        if not any("images/" in ann.filename for ann in annotations):
+        if not any("images/" in filename for filename in label_files):
             image_download_path = Path(download_dir) / "images"
 
         context = YoloContext(annotation_type=annotation_type, categories=categories)
         context.path = image_download_path
+        if context.annotation_type == "pose":
+            context.infer_keypoints_from_annotations(annotations)
+
+        previous_export = yolo_export.ExportManifest.load(export_root)
+        current_export = yolo_export.ExportManifest(context=yolo_export.context_fingerprint(context))
 
         log_message("Downloading image files...")
-        self.download_files(image_download_path)
+        cache_path = self.download_files()
+        images = [
+            (cache_path / source_prefix / dp.path, image_download_path / source_prefix / dp.path) for dp in self.entries
+        ]
+        log_message("Linking image files...")
+        current_export.images = [
+            yolo_export.manifest_key(export_root, p) for p in yolo_export.link_images(images, file_link)
+        ]
+
         log_message("Exporting annotations...")
-        yaml_path = dagshub_annotation_converter.converters.yolo.export_to_fs(context, annotations)
+        current_export.labels = yolo_export.write_labels(
+            export_root, context, list(label_files.values()), previous_export
+        )
+
+        yolo_export.remove_stale_files(export_root, previous_export, current_export)
+        export_root.mkdir(parents=True, exist_ok=True)
+        current_export.save(export_root)
+
+        train_path, val_path, test_path = _guess_train_val_test_split(list(label_files.keys()))
+        # Don't override the defaults with Nones. If there are no split folders, YOLO trains on the whole dataset
+        if train_path is not None:
+            context.train_path = train_path
+        if val_path is not None:
+            context.val_path = val_path
+        context.test_path = test_path
+
+        yaml_path = Path("yolo_dagshub.yaml")
+        yaml_path.write_text(context.get_yaml_content())
         log_message(f"Done! Saved YOLO Dataset, YAML file is at {yaml_path.absolute()}")
-        return yaml_path
+        return yaml_path.absolute()
 
     def to_voxel51_dataset(self, **kwargs) -> "fo.Dataset":
         """
@@ -771,6 +1274,13 @@ class QueryResult:
         <https://docs.voxel51.com/api/fiftyone.core.session.html?highlight=launch_app#fiftyone.core.session.launch_app>`_
         to visualize it.
 
+        If the dataset already exists, it's synced with the query result, keyed by the datapoint id:
+        samples are created only for new datapoints, and the samples of datapoints that aren't in the query result
+        anymore are deleted.
+        The samples of datapoints whose metadata or annotations changed are updated in place,
+        so the tags and the labels added to them in FiftyOne are kept.
+        Only the labels in the annotation fields are replaced with the new annotations.
+
         Keyword Args:
             name (str): Name of the dataset. Default is the name of the datasource.
             force_download (bool): Download the dataset even if the size of the files is bigger than 100MB.\
@@ -790,7 +1300,6 @@ class QueryResult:
         logger.info("Migrating dataset to voxel51")
         name = kwargs.get("name", self.datasource.source.name)
         force_download = kwargs.get("force_download", False)
-        # TODO: don't override samples in existing one
         if fo.dataset_exists(name):
             ds: fo.Dataset = fo.load_dataset(name)
         else:
@@ -799,54 +1308,101 @@ class QueryResult:
 
         dataset_location = Path(kwargs.get("files_location", self.datasource.default_dataset_location))
         dataset_location.mkdir(parents=True, exist_ok=True)
-        logger.info("Downloading files...")
 
         if "voxel_annotations" in kwargs:
             annotation_fields = kwargs["voxel_annotations"]
             label_func = add_voxel_annotations
         else:
-            annotation_fields = [f for f in self.fields if f.is_annotation()]
+            annotation_fields = [f.name for f in self.fields if f.is_annotation()]
             label_func = add_ls_annotations
 
-        # Load the annotation fields
-        self.download_binary_columns(*annotation_fields)
+        # Load the annotation fields. They're cached on disk, so only the changed ones are downloaded again
+        if annotation_fields:
+            self.download_binary_columns(*annotation_fields)
+
+        def sample_filepath(datapoint: Datapoint) -> Path:
+            return self.datasource.default_dataset_location / datapoint.path_in_repo
+
+        # Only the samples of new and changed datapoints are created, the rest of the dataset is kept as is
+        digests = {
+            dp.datapoint_id: sample_digest(dp, sample_filepath(dp), label_func.__name__, annotation_fields)
+            for dp in self.entries
+        }
+        existing = []
+        if len(ds) > 0 and ds.has_sample_field("datapoint_id"):
+            existing_digests = (
+                ds.values(VOXEL_DIGEST_FIELD) if ds.has_sample_field(VOXEL_DIGEST_FIELD) else [None] * len(ds)
+            )
+            existing = list(zip(ds.values("id"), ds.values("datapoint_id"), existing_digests))
+        to_delete, to_update, to_create = plan_voxel_sync(existing, digests)
+        changed = QueryResult(
+            _entries=[dp for dp in self.entries if dp.datapoint_id in to_create or dp.datapoint_id in to_update],
+            datasource=self.datasource,
+            fields=self.fields,
+        )
+        logger.info(
+            f"Syncing voxel dataset {name}: {len(to_create)} samples to create, {len(to_update)} to update, "
+            f"{len(to_delete)} to delete, {len(self.entries) - len(changed)} unchanged"
+        )
+        if to_delete:
+            ds.delete_samples(to_delete)
 
         if not force_download:
-            self._check_downloaded_dataset_size()
+            changed._check_downloaded_dataset_size()
 
+        logger.info("Downloading files...")
         redownload = kwargs.get("redownload", False)
-        self.download_files(self.datasource.default_dataset_location, redownload=redownload)
+        (self if redownload else changed).download_files(
+            self.datasource.default_dataset_location, redownload=redownload
+        )
 
-        progress = get_rich_progress(rich.progress.MofNCompleteColumn())
-        task = progress.add_task("Generating voxel samples...", total=len(self.entries))
+        def fill_sample(sample: "fo.Sample", datapoint: Datapoint):
+            sample["dagshub_download_url"] = datapoint.download_url
+            sample["datapoint_id"] = datapoint.datapoint_id
+            sample["datapoint_path"] = datapoint.path
+            sample[VOXEL_DIGEST_FIELD] = digests[datapoint.datapoint_id]
+            label_func(sample, datapoint, *annotation_fields)
+            for k, v in datapoint.metadata.items():
+                # TODO: more filtering here, not all fields should be showing up in voxel
+                if k in annotation_fields:
+                    continue
+                if type(v) is not bytes:
+                    sample[k] = v
 
-        samples: List["fo.Sample"] = []
+        progress = get_rich_progress(rich.progress.MofNCompleteColumn())
+        task = progress.add_task("Generating voxel samples...", total=len(changed))
 
         with progress:
-            for datapoint in self.entries:
-                filepath = self.datasource.default_dataset_location / datapoint.path_in_repo
-                sample = fo.Sample(filepath=filepath)
-                sample["dagshub_download_url"] = datapoint.download_url
-                sample["datapoint_id"] = datapoint.datapoint_id
-                sample["datapoint_path"] = datapoint.path
-                label_func(sample, datapoint, *annotation_fields)
-                for k, v in datapoint.metadata.items():
-                    # TODO: more filtering here, not all fields should be showing up in voxel
-                    if k in annotation_fields:
-                        continue
-                    if type(v) is not bytes:
-                        sample[k] = v
-                samples.append(sample)
-                progress.update(task, advance=1, refresh=True)
-
-        ds.merge_samples(samples)
+            if to_update:
+                updated = {dp.datapoint_id: dp for dp in changed.entries if dp.datapoint_id in to_update}
+                view = ds.select(list(to_update.values()))
+                for sample in view.iter_samples(autosave=True, batch_size=VOXEL_SAMPLE_BATCH_SIZE):
+                    datapoint = updated[sample["datapoint_id"]]
+                    sample.filepath = str(sample_filepath(datapoint))
+                    # Annotations that were removed from the datapoint shouldn't stay on the sample
+                    for fld in annotation_fields:
+                        if sample.has_field(fld):
+                            sample[fld] = None
+                    fill_sample(sample, datapoint)
+                    progress.update(task, advance=1)
+
+            created = [dp for dp in changed.entries if dp.datapoint_id in to_create]
+            for start in range(0, len(created), VOXEL_SAMPLE_BATCH_SIZE):
+                samples: List["fo.Sample"] = []
+                for datapoint in created[start : start + VOXEL_SAMPLE_BATCH_SIZE]:
+                    sample = fo.Sample(filepath=sample_filepath(datapoint))
+                    fill_sample(sample, datapoint)
+                    samples.append(sample)
+                ds.add_samples(samples)
+                progress.update(task, advance=len(samples), refresh=True)
+
         return ds
 
     @staticmethod
-    def _get_predict_dict(predictions, remote_path, log_to_field):
-        res = {log_to_field: json.dumps(predictions[remote_path][0]).encode("utf-8")}
-        if len(predictions[remote_path]) == 2:
-            res[f"{log_to_field}_score"] = predictions[remote_path][1]
+    def _get_predict_dict(prediction, log_to_field):
+        res = {log_to_field: json.dumps(prediction[0]).encode("utf-8")}
+        if len(prediction) == 2:
+            res[f"{log_to_field}_score"] = prediction[1]
 
         return res
 
@@ -917,6 +1473,7 @@ class QueryResult:
         predict_fn: CustomPredictor,
         batch_size: int = 1,
         log_to_field: Optional[str] = None,
+        pipelined: bool = False,
     ) -> Dict[str, Tuple[str, Optional[float]]]:
         """
         Sends all the datapoints returned in this QueryResult as prediction targets for
@@ -924,34 +1481,93 @@ class QueryResult:
 
         Args:
             predict_fn: function that handles batched input and returns predictions with an optional prediction score.
+                Receives the list of local paths of the datapoint files in the batch.
             batch_size: (optional, default: 1) number of datapoints to run inference on simultaneously
             log_to_field: (optional, default: 'prediction') write prediction results to metadata logged in data engine.
             If None, just returns predictions.
             (in addition to logging to a field, iff that parameter is set)
+            pipelined: Download the datapoint files of the next batches in the background while ``predict_fn`` runs,
+                and upload the predictions to ``log_to_field`` in chunks as they're made,
+                instead of uploading all of them at the end.
+                If the inference fails midway, the predictions of the already uploaded chunks stay in the datasource.
+        """
+        return self._run_predictions(
+            lambda batches: (predict_fn(local_paths) for local_paths in batches), batch_size, log_to_field, pipelined
+        )
+
+    def _run_predictions(
+        self,
+        predict_batches: Callable[[Iterator[List[str]]], Iterator[Any]],
+        batch_size: int,
+        log_to_field: Optional[str],
+        pipelined: bool,
+    ) -> Dict[str, Any]:
+        """
+        Runs the inference for :func:`generate_predictions`.
+
+        Args:
+            predict_batches: Takes an iterator of the local paths of the batches,
+                and returns an iterator of the predictions of every batch, in the same order
         """
         dset = DagsHubDataset(self, tensorizers=[lambda x: x])
+        batches = [range(start, min(start + batch_size, len(dset))) for start in range(0, len(dset), batch_size)]
+
+        def local_path(idx: int) -> str:
+            return dset[idx][0]
+
+        uploader: Optional[prediction_pipeline.PredictionUploader] = None
+        if pipelined:
+            # Keep enough files downloading to use all the download threads, and at least the next batch
+            window = max(batch_size, config.download_threads)
+            local_paths_iter = prediction_pipeline.prefetch_batches(
+                batches, local_path, window, config.download_threads
+            )
+            if log_to_field:
+                uploader = prediction_pipeline.PredictionUploader(
+                    self.datasource,
+                    lambda prediction: self._get_predict_dict(prediction, log_to_field),
+                    config.dataengine_metadata_upload_batch_size,
+                )
+        else:
+            local_paths_iter = ([local_path(idx) for idx in batch] for batch in batches)
 
         predictions = {}
+        predictions_iter = predict_batches(local_paths_iter)
         progress = get_rich_progress(rich.progress.MofNCompleteColumn())
         task = progress.add_task("Running inference...", total=len(dset))
-        with progress:
-            for idx, local_paths in enumerate(
-                _Batcher(dset, batch_size) if batch_size != 1 else dset
-            ):  # encapsulates dataset with batcher if necessary and iterates over it
-                for prediction, remote_path in zip(
-                    predict_fn(local_paths),
-                    [result.path for result in self[idx * batch_size : (idx + 1) * batch_size]],
-                ):
-                    predictions[remote_path] = prediction
-                progress.update(task, advance=batch_size, refresh=True)
-
-        if log_to_field:
+        try:
+            with progress:
+                for batch, batch_predictions in zip(batches, predictions_iter):
+                    for prediction, idx in zip(batch_predictions, batch):
+                        remote_path = self.entries[idx].path
+                        predictions[remote_path] = prediction
+                        if uploader is not None:
+                            uploader.add(remote_path, prediction)
+                    progress.update(task, advance=len(batch), refresh=True)
+        except BaseException:
+            if uploader is not None:
+                uploader.abort()
+            raise
+        finally:
+            for it in (predictions_iter, local_paths_iter):
+                if inspect.isgenerator(it):
+                    it.close()
+
+        if uploader is not None:
+            uploader.close()
+        elif log_to_field:
             with self.datasource.metadata_context() as ctx:
-                for remote_path in predictions:
-                    ctx.update_metadata(remote_path, self._get_predict_dict(predictions, remote_path, log_to_field))
+                for remote_path, prediction in predictions.items():
+                    ctx.update_metadata(remote_path, self._get_predict_dict(prediction, log_to_field))
         return predictions
 
-    def generate_annotations(self, predict_fn: CustomPredictor, batch_size: int = 1, log_to_field: str = "annotation"):
+    def generate_annotations(
+        self,
+        predict_fn: CustomPredictor,
+        batch_size: int = 1,
+        log_to_field: str = "annotation",
+        pipelined: bool = False,
+    ):
         """
         Sends all the datapoints returned in this QueryResult as prediction targets for
         a generic object.
@@ -960,11 +1576,14 @@ class QueryResult:
             predict_fn: function that handles batched input and returns predictions with an optional prediction score.
             batch_size: (optional, default: 1) number of datapoints to run inference on simultaneously.
             log_to_field: (optional, default: 'prediction') write prediction results to metadata logged in data engine.
+            pipelined: Overlap the downloads, the inference and the uploads,
+                refer to :func:`generate_predictions` for details.
         """
         self.generate_predictions(
             predict_fn,
             batch_size=batch_size,
             log_to_field=log_to_field,
+            pipelined=pipelined,
         )
         self.datasource.metadata_field(log_to_field).set_annotation().apply()
 
@@ -1037,18 +1656,3 @@ class QueryResult:
         assert self.query_data_time is not None
         artifact_name = self.datasource._get_mlflow_artifact_name("log", self.query_data_time)
         return self.datasource._log_to_mlflow(artifact_name, run, self.query_data_time)
-
-
-# to support depedency-free dataloading, `_Batcher` is a barebones dataloader that sets up batched inference
-class _Batcher:
-    def __init__(self, dset, batch_size):
-        self.dset = dset
-        self.batch_size = batch_size
-
-    def __iter__(self):
-        self.curr_idx = 0
-        return self
-
-    def __next__(self):
-        self.curr_idx += self.batch_size
-        return [self.dset[idx] for idx in range(self.curr_idx - self.batch_size, self.curr_idx)]
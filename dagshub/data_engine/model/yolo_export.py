@@ -0,0 +1,251 @@
+"""
+Incremental export of a query result to a YOLO dataset:
+the images are linked from the datasource's download cache instead of being downloaded again,
+and the label files are written in parallel, only for the datapoints whose annotations changed since the previous
+export to the same directory.
+
+The previous export is described by a manifest file in the export directory.
+
+:meta private:
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from dagshub_annotation_converter.converters.yolo import annotations_to_string
+from dagshub_annotation_converter.formats.yolo import YoloContext
+from dagshub_annotation_converter.ir.image import IRImageAnnotationBase
+from dagshub_annotation_converter.util import replace_folder
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = ".dagshub_yolo_export.json"
+MANIFEST_VERSION = 2
+
+LINK_MODES = ("hardlink", "symlink", "copy")
+
+
+@dataclass
+class LabelFile:
+    """
+    Annotations of a single image, that are written to one label file
+    """
+
+    image_filename: str
+    """Path of the image, relative to the data directory of the export"""
+    annotations: List[IRImageAnnotationBase] = field(default_factory=list)
+    values: List[bytes] = field(default_factory=list)
+    """Serialized annotation fields of the datapoints with the annotations, to tell if the label changed"""
+
+    def digest(self, context_fingerprint: str) -> str:
+        h = hashlib.sha1(context_fingerprint.encode())
+        for value in self.values:
+            h.update(hashlib.sha1(value).digest())
+        return h.hexdigest()
+
+
+@dataclass
+class ExportManifest:
+    context: Optional[str] = None
+    """Fingerprint of the YOLO context the labels were written with"""
+    labels: Dict[str, Tuple[str, bool]] = field(default_factory=dict)
+    """Label file path -> (digest of its annotations, whether the file was written)"""
+    images: List[str] = field(default_factory=list)
+    """Paths of the linked images. All the paths are relative to the export directory, in POSIX format"""
+
+    @staticmethod
+    def load(export_root: Path) -> "ExportManifest":
+        manifest_path = export_root / MANIFEST_FILE
+        try:
+            content = json.loads(manifest_path.read_text())
+        except FileNotFoundError:
+            return ExportManifest()
+        except (OSError, ValueError) as e:
+            logger.warning(f"Couldn't read the manifest of the previous export {manifest_path}, exporting again: {e}")
+            return ExportManifest()
+        if content.get("version") != MANIFEST_VERSION:
+            return ExportManifest()
+        return ExportManifest(
+            context=content["context"],
+            labels={path: (digest, written) for path, (digest, written) in content["labels"].items()},
+            images=content["images"],
+        )
+
+    def save(self, export_root: Path):
+        content = {
+            "version": MANIFEST_VERSION,
+            "context": self.context,
+            "labels": {path: [digest, written] for path, (digest, written) in self.labels.items()},
+            "images": self.images,
+        }
+        tmp_path = export_root / (MANIFEST_FILE + ".tmp")
+        tmp_path.write_text(json.dumps(content))
+        os.replace(tmp_path, export_root / MANIFEST_FILE)
+
+
+def context_fingerprint(context: YoloContext) -> str:
+    """
+    Everything in the context that the contents of the label files depend on.
+    If it changes, for example when a new category shifts the ids of the categories, all labels are written again.
+    """
+    return json.dumps(
+        [
+            context.annotation_type,
+            [[cat.id, cat.name] for cat in context.categories.categories],
+            context.keypoint_dim,
+            context.keypoints_in_annotation,
+        ]
+    )
+
+
+def manifest_key(export_root: Path, path: Path) -> str:
+    """
+    Path of a file of the export as it's stored in the manifest: relative to the export directory,
+    so the same export can be found from any working directory
+    """
+    return Path(os.path.relpath(path.absolute(), export_root.absolute())).as_posix()
+
+
+def _resolve_manifest_key(export_root: Path, key: str) -> Optional[Path]:
+    path = Path(key)
+    # Don't touch anything outside of the export, even if the manifest was edited
+    if path.is_absolute() or ".." in path.parts:
+        return None
+    return export_root / path
+
+
+def label_path(context: YoloContext, image_filename: str) -> Optional[Path]:
+    return replace_folder(
+        context.path / image_filename, context.image_dir_name, context.label_dir_name, context.label_extension
+    )
+
+
+def write_labels(
+    export_root: Path,
+    context: YoloContext,
+    label_files: Sequence[LabelFile],
+    previous: ExportManifest,
+    num_threads: Optional[int] = None,
+) -> Dict[str, Tuple[str, bool]]:
+    """
+    Writes the label files that changed since the previous export to ``export_root`` in ``num_threads`` threads.
+
+    Returns:
+        The label entries of the new manifest
+    """
+    fingerprint = context_fingerprint(context)
+    labels: Dict[str, Tuple[str, bool]] = {}
+    to_write: List[Tuple[Path, LabelFile]] = []
+    for label_file in label_files:
+        out_path = label_path(context, label_file.image_filename)
+        if out_path is None:
+            logger.warning(f"Couldn't generate annotation file path for image file [{label_file.image_filename}]")
+            continue
+        digest = label_file.digest(fingerprint)
+        key = manifest_key(export_root, out_path)
+        prev = previous.labels.get(key)
+        if prev is not None and prev[0] == digest and (not prev[1] or out_path.exists()):
+            labels[key] = prev
+            continue
+        to_write.append((out_path, label_file))
+        labels[key] = (digest, False)
+
+    def _write(out_path: Path, label_file: LabelFile) -> bool:
+        content = annotations_to_string(label_file.annotations, context)
+        if content is None:
+            out_path.unlink(missing_ok=True)
+            return False
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(content)
+        return True
+
+    logger.info(f"Writing {len(to_write)} label files, {len(labels) - len(to_write)} are unchanged")
+    with ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix="yolo-labels") as tp:
+        written = tp.map(lambda args: _write(*args), to_write)
+        for (out_path, _), was_written in zip(to_write, written):
+            key = manifest_key(export_root, out_path)
+            labels[key] = (labels[key][0], was_written)
+    return labels
+
+
+def _is_linked(src: Path, dst: Path, mode: str) -> bool:
+    if mode == "symlink":
+        return dst.is_symlink() and Path(os.readlink(dst)) == src
+    if not dst.exists() or dst.is_symlink():
+        return False
+    if mode == "hardlink":
+        return os.path.samefile(src, dst)
+    src_stat, dst_stat = src.stat(), dst.stat()
+    return src_stat.st_size == dst_stat.st_size and src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+
+def link_file(src: Path, dst: Path, mode: str) -> str:
+    """
+    Makes ``dst`` have the contents of ``src``, by hard linking, symlinking or copying it.
+    Falls back to copying if the link can't be created,
+    for example when hard linking across file systems, or symlinking without permissions on Windows.
+
+    Returns:
+        The mode that was used
+    """
+    if _is_linked(src, dst, mode):
+        return mode
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+    if mode != "copy":
+        try:
+            if mode == "hardlink":
+                os.link(src, dst)
+            else:
+                os.symlink(src, dst)
+            return mode
+        except OSError:
+            pass
+    # copy2 keeps the modification time, so the copy is recognized as up to date in the next export
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def link_images(files: Sequence[Tuple[Path, Path]], mode: str, num_threads: Optional[int] = None) -> List[Path]:
+    """
+    Links the downloaded images from the cache into the export directory.
+
+    Args:
+        files: (path in the cache, path in the export directory) of the images
+        mode: One of "hardlink", "symlink" or "copy"
+
+    Returns:
+        The paths of the images in the export directory
+    """
+    if mode not in LINK_MODES:
+        raise ValueError(f"file_link has to be one of {LINK_MODES}, got {mode}")
+    # Symlinks are resolved relative to the link, so they need to point to the absolute path
+    files = [(src.absolute() if mode == "symlink" else src, dst) for src, dst in files if src.exists()]
+
+    with ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix="yolo-images") as tp:
+        used_modes = list(tp.map(lambda args: link_file(*args, mode), files))
+    fallbacks = sum(1 for used in used_modes if used != mode)
+    if fallbacks:
+        logger.warning(f"Couldn't {mode} {fallbacks} images from the download cache, copied them instead")
+    return [dst for _, dst in files]
+
+
+def remove_stale_files(export_root: Path, previous: ExportManifest, current: ExportManifest):
+    """
+    Removes the labels and images of the previous export in ``export_root`` that aren't part of the current one
+    """
+    stale = (set(previous.labels) - set(current.labels)) | (set(previous.images) - set(current.images))
+    for key in stale:
+        p = _resolve_manifest_key(export_root, key)
+        if p is not None and (p.is_symlink() or p.exists()):
+            p.unlink()
+    if stale:
+        logger.info(f"Removed {len(stale)} files of the previous export")
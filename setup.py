@@ -33,7 +33,7 @@ install_requires = [
     # Need to keep dacite version in lockstep with voxel, otherwise stuff breaks on their end
     "dacite~=1.6.0",
     "tenacity>=8.2.2",
-    "gql[requests]",
+    "gql[requests,httpx]>=3.5",
     "dataclasses-json",
     "pandas",
     "treelib>=1.6.4",
@@ -0,0 +1,290 @@
+import hashlib
+
+import httpx
+import pytest
+import respx
+import tenacity
+
+from dagshub.common import config, download, download_scheduler
+from dagshub.common.api.responses import ContentAPIEntry
+from dagshub.common.download import download_files, ExpectedFile, file_hash
+from dagshub.common.download_scheduler import DownloadScheduler
+
+URL = "https://dagshub.com/api/v1/repos/user/repo/raw/main/file.bin"
+CONTENT = bytes(range(256)) * 100
+
+
+@pytest.fixture(autouse=True)
+def download_setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "download_manifest_location", str(tmp_path / "manifest.sqlite"))
+    monkeypatch.setattr(download, "_default_downloader", lambda url: b"")
+    monkeypatch.setattr(download, "_default_auth", httpx.Auth())
+    monkeypatch.setattr(download_scheduler, "_scheduler", DownloadScheduler(8))
+
+
+class FileServer:
+    """Serves CONTENT, supporting Range and If-None-Match requests"""
+
+    def __init__(self, content=CONTENT, etag='"v1"'):
+        self.content = content
+        self.etag = etag
+        self.supports_ranges = True
+        self.throttle = 0
+        """Number of requests to respond to with 429"""
+        self.requests = []
+
+    def __call__(self, request: httpx.Request):
+        self.requests.append(request)
+        if self.throttle:
+            self.throttle -= 1
+            return httpx.Response(429, headers={"retry-after": "0"})
+        headers = {"etag": self.etag}
+        if request.headers.get("if-none-match") == self.etag:
+            return httpx.Response(304, headers=headers)
+        range_header = request.headers.get("range")
+        if range_header and self.supports_ranges:
+            start, end = range_header[len("bytes=") :].split("-")
+            start, end = int(start), int(end or len(self.content) - 1)
+            headers["content-range"] = f"bytes {start}-{end}/{len(self.content)}"
+            return httpx.Response(206, content=self.content[start : end + 1], headers=headers)
+        return httpx.Response(200, content=self.content, headers=headers)
+
+
+@pytest.fixture
+def server():
+    server = FileServer()
+    with respx.mock(using="httpx") as router:
+        router.get(URL).mock(side_effect=server)
+        yield server
+
+
+@pytest.fixture
+def expected():
+    return ExpectedFile(size=len(CONTENT), hash=hashlib.md5(CONTENT).hexdigest(), hash_type="md5")
+
+
+def test_downloaded_file_is_skipped_next_time(tmp_path, server, expected):
+    target = tmp_path / "data" / "file.bin"
+
+    download_files([(URL, target, expected)])
+    download_files([(URL, target, expected)])
+
+    assert target.read_bytes() == CONTENT
+    assert not target.with_name("file.bin.part").exists()
+    assert len(server.requests) == 1
+
+
+def test_download_resumes_from_part(tmp_path, server, expected):
+    target = tmp_path / "file.bin"
+    target.with_name("file.bin.part").write_bytes(CONTENT[:1000])
+
+    download_files([(URL, target, expected)])
+
+    assert target.read_bytes() == CONTENT
+    assert server.requests[0].headers["range"] == "bytes=1000-"
+
+
+def test_corrupt_part_is_downloaded_from_scratch(tmp_path, server, expected):
+    target = tmp_path / "file.bin"
+    target.with_name("file.bin.part").write_bytes(b"garbage")
+
+    download_files([(URL, target, expected)])
+
+    assert target.read_bytes() == CONTENT
+    assert len(server.requests) == 2
+    assert "range" not in server.requests[1].headers
+
+
+def test_existing_file_is_checked_against_expected(tmp_path, server, expected):
+    good = tmp_path / "good.bin"
+    good.write_bytes(CONTENT)
+    truncated = tmp_path / "truncated.bin"
+    truncated.write_bytes(CONTENT[:10])
+
+    download_files([(URL, good, expected), (URL, truncated, expected)])
+
+    assert truncated.read_bytes() == CONTENT
+    assert len(server.requests) == 1
+
+
+def test_changed_remote_file_is_downloaded_again(tmp_path, server, expected):
+    target = tmp_path / "file.bin"
+    download_files([(URL, target, expected)])
+
+    server.content = CONTENT[::-1]
+    new_expected = ExpectedFile(size=len(CONTENT), hash=hashlib.md5(server.content).hexdigest(), hash_type="md5")
+    download_files([(URL, target, new_expected)])
+
+    assert target.read_bytes() == server.content
+
+
+def test_corrupted_download_is_not_saved(tmp_path, server):
+    target = tmp_path / "file.bin"
+    wrong = ExpectedFile(size=len(CONTENT), hash="0" * 32, hash_type="md5")
+
+    download_files([(URL, target, wrong)])
+
+    assert not target.exists()
+    assert not target.with_name("file.bin.part").exists()
+    assert len(server.requests) == 2
+
+
+def test_redownload_revalidates_with_etag(tmp_path, server):
+    target = tmp_path / "file.bin"
+    download_files([(URL, target)])
+
+    download_files([(URL, target)], skip_if_exists=False)
+    assert server.requests[-1].headers["if-none-match"] == '"v1"'
+    assert target.read_bytes() == CONTENT
+
+    server.etag = '"v2"'
+    server.content = b"new content"
+    download_files([(URL, target)], skip_if_exists=False)
+    assert target.read_bytes() == b"new content"
+
+
+def test_expected_file_from_content_entry(tmp_path):
+    path = tmp_path / "file"
+    path.write_bytes(b"hello\n")
+    git_hash = "ce013625030ba8dba906f756967f9e9ca394464a"  # git hash-object of "hello\n"
+
+    def entry(versioning, entry_hash):
+        return ContentAPIEntry("file", "file", 6, entry_hash, versioning, URL, None)
+
+    assert file_hash(path, "git") == git_hash
+    assert ExpectedFile.from_content_entry(entry("git", git_hash)).matches(path)
+    assert ExpectedFile.from_content_entry(entry("dvc", hashlib.md5(b"hello\n").hexdigest())).matches(path)
+    # Hashes of unknown formats are ignored, only the size is checked
+    assert ExpectedFile.from_content_entry(entry("bucket", "randomhash")) == ExpectedFile(size=6)
+
+
+BUCKET_URL = "https://dagshub.com/api/v1/repos/user/repo/storage/raw/s3/bucket/dir/file.bin"
+
+
+@pytest.fixture
+def bucket_downloaders(monkeypatch):
+    monkeypatch.setattr(download, "_bucket_downloader_map", {})
+
+
+def test_bucket_stream_downloader_writes_into_file(tmp_path, bucket_downloaders, expected):
+    calls = []
+
+    def download_fn(bucket, path, f):
+        calls.append((bucket, path))
+        for i in range(0, len(CONTENT), 1000):
+            f.write(CONTENT[i : i + 1000])
+
+    download.add_bucket_stream_downloader("s3", download_fn)
+    target = tmp_path / "file.bin"
+    download_files([(BUCKET_URL, target, expected)])
+
+    assert target.read_bytes() == CONTENT
+    assert calls == [("bucket", "dir/file.bin")]
+
+
+def test_bytes_bucket_downloader_is_still_supported(tmp_path, bucket_downloaders, expected):
+    download.add_bucket_downloader("s3", lambda bucket, path: CONTENT)
+    target = tmp_path / "file.bin"
+    download_files([(BUCKET_URL, target, expected)])
+
+    assert target.read_bytes() == CONTENT
+
+
+def test_s3_downloader_streams_chunks(tmp_path, bucket_downloaders):
+    class Body:
+        def iter_chunks(self, chunk_size):
+            yield CONTENT[:100]
+            yield CONTENT[100:]
+
+    class Client:
+        def get_object(self, Bucket, Key):
+            return {"Body": Body()}
+
+    download.enable_s3_bucket_downloader(Client())
+    target = tmp_path / "file.bin"
+    download_files([(BUCKET_URL, target)])
+
+    assert target.read_bytes() == CONTENT
+
+
+def test_dagshub_download_returns_bytes(server):
+    assert download._dagshub_download(URL, httpx.Auth()) == CONTENT
+
+
+@pytest.fixture
+def multipart(monkeypatch):
+    monkeypatch.setattr(config, "download_multipart_threshold", 1000)
+    monkeypatch.setattr(config, "download_part_size", 4096)
+    monkeypatch.setattr(config, "download_part_threads", 4)
+
+
+def test_big_file_is_downloaded_in_parts(tmp_path, server, expected, multipart):
+    target = tmp_path / "file.bin"
+    download_files([(URL, target, expected)])
+
+    assert target.read_bytes() == CONTENT
+    assert sorted(r.headers["range"] for r in server.requests) == sorted(
+        f"bytes={start}-{min(start + 4096, len(CONTENT)) - 1}" for start in range(0, len(CONTENT), 4096)
+    )
+    assert not target.with_name("file.bin.part.state").exists()
+
+
+def test_multipart_download_resumes_missing_parts(tmp_path, server, expected, multipart):
+    target = tmp_path / "file.bin"
+    part = target.with_name("file.bin.part")
+    part.write_bytes(CONTENT[:4096] + bytes(len(CONTENT) - 4096))
+    target.with_name("file.bin.part.state").write_text(f'{len(CONTENT)} 4096\n0 "v1"\n')
+
+    download_files([(URL, target, expected)])
+
+    assert target.read_bytes() == CONTENT
+    assert "bytes=0-4095" not in [r.headers["range"] for r in server.requests]
+
+
+def test_multipart_download_without_range_support(tmp_path, server, expected, multipart):
+    server.supports_ranges = False
+    target = tmp_path / "file.bin"
+    download_files([(URL, target, expected)])
+
+    assert target.read_bytes() == CONTENT
+
+
+def test_bucket_range_downloader(tmp_path, bucket_downloaders, expected, multipart):
+    ranges = []
+
+    def download_range(bucket, path, f, start, end):
+        ranges.append((start, end))
+        f.write(CONTENT[start : end + 1])
+
+    download.add_bucket_stream_downloader("s3", lambda bucket, path, f: None, download_range)
+    target = tmp_path / "file.bin"
+    download_files([(BUCKET_URL, target, expected)])
+
+    assert target.read_bytes() == CONTENT
+    assert len(ranges) == 7
+
+
+def test_rate_limited_downloads_are_retried_with_lower_concurrency(tmp_path, server, expected, monkeypatch):
+    monkeypatch.setattr(download._dagshub_download_resumable.retry, "wait", tenacity.wait_none())
+    server.throttle = 2
+    target = tmp_path / "file.bin"
+
+    download_files([(URL, target, expected)])
+
+    assert target.read_bytes() == CONTENT
+    assert len(server.requests) == 3
+    # The second request started after the first decrease, so it lowered the concurrency again
+    assert download_scheduler.get_download_scheduler().concurrency == 2
+
+
+@pytest.mark.parametrize("headers, min_wait", [({}, 4), ({"retry-after": "1"}, 0)])
+def test_server_overload_without_retry_after_backs_off(headers, min_wait):
+    state = tenacity.RetryCallState(retry_object=None, fn=None, args=(), kwargs={})
+    error = download.DownloadError(httpx.Response(503, headers=headers))
+    state.set_exception((download.DownloadError, error, None))
+
+    wait = download._download_retry_wait(state)
+
+    assert wait >= min_wait
+    # The scheduler only pauses the requests when there's a Retry-After
+    assert (wait == 0) == ("retry-after" in headers)
@@ -0,0 +1,142 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+from dagshub.common import download_scheduler
+from dagshub.common.download_scheduler import DownloadScheduler, parse_retry_after
+
+
+def test_throttling_halves_concurrency_once_per_burst():
+    scheduler = DownloadScheduler(8)
+    started = time.monotonic()
+
+    scheduler.on_throttled(started)
+    # Requests of the same burst don't lower it again
+    scheduler.on_throttled(started)
+    assert scheduler.concurrency == 4
+
+    scheduler.on_throttled(time.monotonic())
+    assert scheduler.concurrency == 2
+    assert scheduler.throttled_count == 3
+
+
+def test_concurrency_grows_back_with_successes():
+    scheduler = DownloadScheduler(8)
+    scheduler.on_throttled(time.monotonic())
+    assert scheduler.concurrency == 4
+
+    # About one more request for every window of successful requests
+    for _ in range(5):
+        scheduler.on_success()
+    assert scheduler.concurrency == 5
+
+    for _ in range(100):
+        scheduler.on_success()
+    assert scheduler.concurrency == 8
+
+
+def test_concurrency_never_drops_below_minimum():
+    scheduler = DownloadScheduler(4, min_concurrency=2)
+    for _ in range(5):
+        scheduler.on_throttled(time.monotonic())
+    assert scheduler.concurrency == 2
+
+
+def test_requests_are_limited_to_concurrency():
+    scheduler = DownloadScheduler(3)
+    active = 0
+    max_active = 0
+    lock = threading.Lock()
+
+    def run():
+        nonlocal active, max_active
+        with scheduler.request():
+            with lock:
+                active += 1
+                max_active = max(max_active, active)
+            time.sleep(0.01)
+            with lock:
+                active -= 1
+
+    threads = [threading.Thread(target=run) for _ in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max_active == 3
+
+
+def test_retry_after_pauses_requests():
+    scheduler = DownloadScheduler(4)
+    scheduler.on_throttled(time.monotonic(), retry_after=0.2)
+
+    start = time.monotonic()
+    with scheduler.request():
+        pass
+    assert time.monotonic() - start >= 0.19
+
+
+def test_bytes_per_second_cap():
+    scheduler = DownloadScheduler(4, max_bytes_per_second=1000)
+
+    start = time.monotonic()
+    for _ in range(5):
+        scheduler.consume(50)
+    assert time.monotonic() - start >= 0.24
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("3", 3.0),
+        ("0", 0.0),
+        ("Wed, 21 Oct 2015 07:28:00 GMT", 0.0),
+        ("soon", None),
+        (None, None),
+    ],
+)
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def _request_in_child(queue):
+    with download_scheduler.get_download_scheduler().request():
+        queue.put("done")
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires fork")
+def test_forked_child_gets_its_own_scheduler(monkeypatch):
+    monkeypatch.setattr(download_scheduler, "_scheduler", DownloadScheduler(2))
+    scheduler = download_scheduler.get_download_scheduler()
+    release = threading.Event()
+
+    def hold_slot(started):
+        with scheduler.request():
+            started.set()
+            release.wait()
+
+    # Both slots are held by threads of the parent when it forks
+    holders = []
+    for _ in range(2):
+        started = threading.Event()
+        holders.append(threading.Thread(target=hold_slot, args=(started,)))
+        holders[-1].start()
+        started.wait()
+
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    child = ctx.Process(target=_request_in_child, args=(queue,))
+    try:
+        child.start()
+        assert queue.get(timeout=10) == "done"
+        child.join(timeout=10)
+        assert child.exitcode == 0
+    finally:
+        if child.is_alive():
+            child.kill()
+        release.set()
+        for holder in holders:
+            holder.join()
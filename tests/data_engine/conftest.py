@@ -19,6 +19,7 @@ def ds(mocker, mock_get_username_of_token) -> Datasource:
     mocker.patch.object(ds_state, "client")
     # Stub out get_from_dagshub, because it doesn't need to be done in tests
     mocker.patch.object(ds_state, "get_from_dagshub")
+    mocker.patch.object(ds_state, "get_from_dagshub_async")
     ds_state.repoApi = MockRepoAPI("kirill/repo")
     return Datasource(ds_state)
 
@@ -0,0 +1,93 @@
+import pytest
+from dagshub_annotation_converter.formats.label_studio.task import LabelStudioTask
+from dagshub_annotation_converter.ir.image import IRBBoxImageAnnotation, CoordinateStyle
+
+from dagshub.data_engine.annotation import MetadataAnnotations
+from dagshub.data_engine.annotation.parsing import parse_ls_tasks, parse_ls_tasks_parallel
+from dagshub.data_engine.client.models import MetadataSelectFieldSchema
+from dagshub.data_engine.dtypes import MetadataFieldType, ReservedTags
+from dagshub.data_engine.model.query_result import QueryResult
+
+
+def _ls_task(category: str) -> bytes:
+    task = LabelStudioTask(user_id=1)
+    task.data["image"] = "https://dagshub.com/image.jpg"
+    task.add_ir_annotations(
+        [
+            IRBBoxImageAnnotation(
+                categories={category: 1.0},
+                coordinate_style=CoordinateStyle.NORMALIZED,
+                top=0.1,
+                left=0.1,
+                width=0.2,
+                height=0.2,
+                image_width=640,
+                image_height=480,
+            )
+        ]
+    )
+    return task.model_dump_json().encode()
+
+
+BAD_TASK = b'{"annotations": "not a list"}'
+
+
+@pytest.fixture
+def tasks():
+    res = [(_ls_task(f"cat{i}"), f"dp_{i}") for i in range(10)]
+    res[3] = (BAD_TASK, "dp_3")
+    return res
+
+
+def test_parse_ls_tasks(tasks):
+    parsed = parse_ls_tasks(tasks)
+
+    assert parsed[3] is None
+    annotations, _ = parsed[5]
+    assert len(annotations) == 1
+    assert annotations[0].categories == {"cat5": 1.0}
+
+
+def test_parallel_parsing_matches_serial(tasks, mocker):
+    mocker.patch("dagshub.data_engine.annotation.parsing.PARSE_CHUNK_SIZE", 3)
+    assert parse_ls_tasks_parallel(tasks, num_proc=2) == parse_ls_tasks(tasks)
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_convert_annotation_fields(query_result, tasks, mocker, parallel):
+    if parallel:
+        mocker.patch("dagshub.data_engine.model.query_result.PARALLEL_ANNOTATION_PARSING_THRESHOLD", 0)
+        mocker.patch("dagshub.common.config.dataengine_annotation_parse_processes", 2)
+    log_message = mocker.patch("dagshub.data_engine.model.query_result.log_message")
+    query_result.fields.append(
+        MetadataSelectFieldSchema(
+            asOf=None,
+            autoGenerated=False,
+            originalName="annotation",
+            multiple=False,
+            valueType=MetadataFieldType.BLOB,
+            name="annotation",
+            tags={ReservedTags.ANNOTATION.value},
+        )
+    )
+    for dp, (task, _) in zip(query_result.entries, tasks):
+        dp.metadata["annotation"] = task
+
+    query_result._convert_annotation_fields("annotation", load_into_memory=True)
+
+    good_dp, bad_dp = query_result.entries[0], query_result.entries[3]
+    assert isinstance(good_dp.metadata["annotation"], MetadataAnnotations)
+    assert good_dp.metadata["annotation"].annotations[0].categories == {"cat0": 1.0}
+    assert good_dp.metadata["annotation"].value == tasks[0][0]
+    assert bad_dp.metadata["annotation"] == BAD_TASK
+    assert bad_dp.path in log_message.call_args_list[-1].args[0]
+
+
+def test_annotations_are_parsed_in_process_by_default(tasks, mocker):
+    mocker.patch("dagshub.data_engine.model.query_result.PARALLEL_ANNOTATION_PARSING_THRESHOLD", 0)
+    parallel = mocker.patch("dagshub.data_engine.model.query_result.parse_ls_tasks_parallel")
+
+    parsed = QueryResult._parse_annotations(tasks)
+
+    parallel.assert_not_called()
+    assert parsed == parse_ls_tasks(tasks)
@@ -0,0 +1,143 @@
+import asyncio
+import json
+
+import gql.transport.httpx as gql_httpx
+import pytest
+
+from dagshub.data_engine.client.async_data_client import AsyncDataClient
+from dagshub.data_engine.client.gql_queries import GqlQueries
+from dagshub.data_engine.client.models import PreprocessingStatus
+from dagshub.data_engine.client.stats import add_request_stats_callback, remove_request_stats_callback
+from dagshub.data_engine.model.errors import DataEngineGqlError
+
+httpx = gql_httpx.httpx
+
+
+@pytest.fixture
+def responses():
+    """Responses that the mocked server returns, in order"""
+    return []
+
+
+@pytest.fixture
+def async_client(mocker, responses) -> AsyncDataClient:
+    mocker.patch("dagshub.auth.get_authenticator", return_value=None)
+
+    def handler(request):
+        return httpx.Response(200, json=responses.pop(0), headers={"X-DagsHub-Support-Id": "support-id"})
+
+    async_client_cls = httpx.AsyncClient
+    mocker.patch.object(
+        httpx,
+        "AsyncClient",
+        lambda **kwargs: async_client_cls(transport=httpx.MockTransport(handler), **kwargs),
+    )
+    return AsyncDataClient("user/repo")
+
+
+@pytest.fixture
+def stats_callback():
+    received = []
+    add_request_stats_callback(received.append)
+    yield received
+    remove_request_stats_callback(received.append)
+
+
+def _datasource_response(i):
+    return {"data": {"datasource": [{"id": i, "name": f"ds-{i}"}]}}
+
+
+def test_concurrent_requests(async_client, responses, stats_callback):
+    responses.extend(_datasource_response(i) for i in range(5))
+
+    async def run():
+        async with async_client:
+            return await asyncio.gather(
+                *[
+                    async_client._exec(GqlQueries.datasource(), GqlQueries.datasource_params(i, None), validate=False)
+                    for i in range(5)
+                ]
+            )
+
+    res = asyncio.run(run())
+
+    assert sorted(r["datasource"][0]["id"] for r in res) == list(range(5))
+    assert len(stats_callback) == 5
+    for stats in stats_callback:
+        assert stats.operation == "datasource"
+        assert stats.time_to_headers is not None
+        assert stats.json_decode_time is not None
+        assert stats.response_bytes == len(json.dumps(_datasource_response(0)).replace(" ", ""))
+
+
+def test_query_error_has_support_id(async_client, responses):
+    responses.append({"errors": [{"message": "something went wrong"}]})
+
+    async def run():
+        async with async_client:
+            await async_client._exec(GqlQueries.datasource(), GqlQueries.datasource_params(1, None), validate=False)
+
+    with pytest.raises(DataEngineGqlError) as e:
+        asyncio.run(run())
+    assert e.value.support_id == "support-id"
+
+
+def test_client_can_be_used_from_multiple_loops(async_client, responses):
+    responses.extend(_datasource_response(i) for i in range(2))
+
+    async def run():
+        async with async_client:
+            return await async_client._exec(
+                GqlQueries.datasource(), GqlQueries.datasource_params(1, None), validate=False
+            )
+
+    asyncio.run(run())
+    asyncio.run(run())
+
+    assert len(responses) == 0
+
+
+def test_connection_is_closed_after_last_block(async_client, responses, mocker):
+    responses.extend(_datasource_response(i) for i in range(2))
+    created = []
+    make_client = httpx.AsyncClient
+    mocker.patch.object(httpx, "AsyncClient", lambda **kwargs: created.append(make_client(**kwargs)) or created[-1])
+
+    async def query(done_first: asyncio.Event, wait_for_first: bool):
+        async with async_client.connection():
+            await async_client._exec(GqlQueries.datasource(), GqlQueries.datasource_params(1, None), validate=False)
+            if wait_for_first:
+                await done_first.wait()
+                # The other block exited already, but the connection is still used by this one
+                assert not created[0].is_closed
+            else:
+                done_first.set()
+
+    async def run():
+        done_first = asyncio.Event()
+        await asyncio.gather(query(done_first, True), query(done_first, False))
+
+    asyncio.run(run())
+
+    assert len(created) == 1
+    assert created[0].is_closed
+    assert len(async_client._sessions) == 0
+
+
+def test_head_async(ds, mocker):
+    page = {
+        "edges": [{"node": {"id": 1, "path": "a.txt", "metadata": []}}],
+        "pageInfo": {"hasNextPage": False, "endCursor": None},
+        "queryDataTime": 1700000000,
+        "selectFields": [],
+    }
+    ds.source.preprocessing_status = PreprocessingStatus.READY
+    mocker.patch.object(ds.source.async_client, "_datasource_query", return_value=page)
+    close = mocker.spy(ds.source.async_client, "close")
+
+    res = asyncio.run(ds.head_async())
+
+    assert [dp.path for dp in res] == ["a.txt"]
+    assert res.stats.pages == 1
+    ds.source.get_from_dagshub_async.assert_awaited_once()
+    close.assert_called_once()
@@ -0,0 +1,173 @@
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from dagshub.data_engine.model.blob_cache import BlobCache, map_array
+from dagshub.data_engine.model.datapoint import _get_blob
+
+
+@pytest.fixture
+def cache(tmp_path) -> BlobCache:
+    return BlobCache(tmp_path / "blobs", max_size=1000)
+
+
+def _set_last_use(cache: BlobCache, blob_hash: str, timestamp: float):
+    os.utime(cache.path(blob_hash), (timestamp, timestamp))
+
+
+def test_put_and_read(cache):
+    path = cache.put("abcdef", b"content")
+
+    assert path == cache.location / "ab" / "abcdef"
+    assert cache.read("abcdef") == b"content"
+    assert cache.get_path("abcdef") == path
+    assert cache.read("missing") is None
+    assert cache.get_path("missing") is None
+
+
+def test_no_temporary_files_left(cache):
+    cache.put("abcdef", b"content")
+    assert os.listdir(cache.location / "ab") == ["abcdef"]
+
+
+@pytest.mark.parametrize("blob_hash", ["../abc", "ab/cd", ""])
+def test_invalid_hash(cache, blob_hash):
+    with pytest.raises(ValueError):
+        cache.put(blob_hash, b"content")
+
+
+def test_evicts_least_recently_used(cache):
+    cache.max_size = 0
+    now = time.time()
+    for i in range(4):
+        cache.put(f"blob{i}", b"a" * 300)
+        _set_last_use(cache, f"blob{i}", now - 1000 + i)
+    # blob0 is the oldest, but it got used recently
+    _set_last_use(cache, "blob0", now - 1000)
+    assert cache.get_path("blob0") is not None
+
+    cache.max_size = 700
+    cache.evict()
+
+    assert cache.get_path("blob1") is None
+    assert cache.get_path("blob2") is None
+    assert cache.read("blob0") is not None
+    assert cache.read("blob3") is not None
+    assert cache.size <= cache.max_size
+
+
+def test_put_evicts_when_over_budget(cache):
+    for i in range(10):
+        cache.put(f"blob{i}", b"a" * 300)
+    assert cache.size <= cache.max_size
+    assert cache.read("blob9") is not None
+
+
+def test_unlimited_cache(tmp_path):
+    cache = BlobCache(tmp_path, max_size=0)
+    for i in range(10):
+        cache.put(f"blob{i}", b"a" * 300)
+    assert cache.size == 3000
+
+
+def test_concurrent_puts(cache):
+    cache.max_size = 0
+    content = b"a" * 10000
+
+    with ThreadPoolExecutor(max_workers=8) as tp:
+        paths = list(tp.map(lambda _: cache.put("same-blob", content), range(32)))
+
+    assert all(p == paths[0] for p in paths)
+    assert cache.read("same-blob") == content
+    assert os.listdir(cache.location / "sa") == ["same-blob"]
+
+
+def test_get_blob_uses_cache(cache, mocker):
+    mocker.patch("dagshub.data_engine.model.datapoint.get_blob_cache", return_value=cache)
+    http_request = mocker.patch("dagshub.data_engine.model.datapoint.http_request")
+    http_request.return_value.status_code = 200
+    http_request.return_value.content = b"blob content"
+
+    path = _get_blob("https://dagshub.com/blob/abcdef", "abcdef", None, True, False)
+    content = _get_blob("https://dagshub.com/blob/abcdef", "abcdef", None, True, True)
+
+    assert path == cache.path("abcdef")
+    assert content == b"blob content"
+    http_request.assert_called_once()
+
+
+def test_read_memory_mapped(cache):
+    cache.put("abcdef", b"content")
+    cache.put("empty", b"")
+
+    view = cache.read("abcdef", memory_map=True)
+    assert isinstance(view, memoryview)
+    assert view.readonly
+    assert view == b"content"
+    assert cache.read("empty", memory_map=True) == b""
+
+
+def test_map_array(cache):
+    arr = np.arange(12, dtype=np.float32).reshape(3, 4)
+    buf = io.BytesIO()
+    np.save(buf, arr)
+    npy_path = cache.put("npy", buf.getvalue())
+    raw_path = cache.put("raw", arr.tobytes())
+
+    npy_arr = map_array(npy_path)
+    raw_arr = map_array(raw_path, dtype=np.float32)
+
+    np.testing.assert_array_equal(npy_arr, arr)
+    np.testing.assert_array_equal(raw_arr, arr.ravel())
+    assert not npy_arr.flags.writeable
+    with pytest.raises(ValueError):
+        map_array(raw_path)
+
+
+def test_get_blob_memory_mapped(cache, some_datapoint, mocker):
+    mocker.patch("dagshub.data_engine.model.datapoint.get_blob_cache", return_value=cache)
+    http_request = mocker.patch("dagshub.data_engine.model.datapoint.http_request")
+    http_request.return_value.status_code = 200
+    http_request.return_value.content = np.arange(4, dtype=np.int64).tobytes()
+    some_datapoint.metadata["blob"] = "abcdef"
+
+    view = some_datapoint.get_blob("blob", memory_map=True)
+    arr = some_datapoint.get_blob_array("blob", dtype=np.int64)
+
+    assert isinstance(view, memoryview)
+    assert view == http_request.return_value.content
+    np.testing.assert_array_equal(arr, np.arange(4))
+    http_request.assert_called_once()
+
+
+def test_memory_mapped_stored_value_can_be_read_again(cache, some_datapoint, mocker):
+    mocker.patch("dagshub.data_engine.model.datapoint.get_blob_cache", return_value=cache)
+    http_request = mocker.patch("dagshub.data_engine.model.datapoint.http_request")
+    http_request.return_value.status_code = 200
+    http_request.return_value.content = np.arange(4, dtype=np.int64).tobytes()
+    some_datapoint.metadata["blob"] = "abcdef"
+
+    some_datapoint.get_blob("blob", memory_map=True, store_value=True)
+    assert isinstance(some_datapoint.metadata["blob"], memoryview)
+
+    assert some_datapoint.get_blob("blob", memory_map=True) == http_request.return_value.content
+    content = some_datapoint.get_blob("blob")
+    assert type(content) is bytes and content == http_request.return_value.content
+    np.testing.assert_array_equal(some_datapoint.get_blob_array("blob", dtype=np.int64), np.arange(4))
+    http_request.assert_called_once()
+
+
+def test_pinned_blobs_are_not_evicted(cache, caplog):
+    with cache.pinning():
+        paths = [cache.put(f"blob{i}", b"x" * 400) for i in range(4)]
+        # All the blobs of the operation stay, even though they're over the budget
+        assert all(p.exists() for p in paths)
+        assert "bigger than the size budget" in caplog.text
+
+    cache.put("another", b"x" * 400)
+    assert sum(p.exists() for p in paths) < 4
+    assert cache.size <= 1000
@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from dagshub.data_engine.model.blob_cache import BlobCache
+from dagshub.data_engine.model.blob_ref import BlobRef
+
+
+@pytest.fixture
+def blob_cache(tmp_path, mocker) -> BlobCache:
+    cache = BlobCache(tmp_path, max_size=0)
+    mocker.patch("dagshub.data_engine.model.datapoint.get_blob_cache", return_value=cache)
+    return cache
+
+
+@pytest.fixture
+def downloaded(mocker):
+    """URLs of the downloaded blobs"""
+    urls = []
+    lock = threading.Lock()
+
+    def http_request(method, url, **kwargs):
+        with lock:
+            urls.append(url)
+        resp = mocker.MagicMock()
+        resp.status_code = 200
+        resp.content = f"content of {url.rsplit('/', 1)[-1]}".encode()
+        return resp
+
+    mocker.patch("dagshub.data_engine.model.datapoint.http_request", side_effect=http_request)
+    return urls
+
+
+@pytest.fixture
+def blob_query_result(query_result):
+    for dp in query_result:
+        dp.metadata["blob"] = f"hash{dp.datapoint_id}"
+    return query_result
+
+
+def test_lazy_blobs_are_not_downloaded(blob_query_result, blob_cache, downloaded):
+    blob_query_result.get_blob_fields("blob", lazy=True)
+
+    assert downloaded == []
+    assert all(isinstance(dp.metadata["blob"], BlobRef) for dp in blob_query_result.entries)
+
+
+def test_blob_ref_downloads_on_access(blob_query_result, blob_cache, downloaded):
+    blob_query_result.get_blob_fields("blob", lazy=True)
+    dp = blob_query_result.entries[0]
+
+    assert dp.get_blob("blob") == b"content of hash0"
+    assert dp.metadata["blob"].path() == blob_cache.path("hash0")
+    assert bytes(dp.metadata["blob"]) == b"content of hash0"
+    # Later accesses are served from the cache
+    assert len(downloaded) == 1
+
+
+def test_iterating_prefetches_window(blob_query_result, blob_cache, downloaded):
+    blob_query_result.get_blob_fields("blob", lazy=True, prefetch_window=2)
+
+    it = iter(blob_query_result)
+    next(it)
+    for dp in blob_query_result.entries[:3]:
+        dp.metadata["blob"]._prefetch_future.result()
+
+    assert sorted(downloaded) == sorted(blob_query_result.entries[i].blob_url(f"hash{i}") for i in range(3))
+    assert blob_query_result.entries[3].metadata["blob"]._prefetch_future is None
+
+    for dp in it:
+        assert dp.get_blob("blob") == f"content of hash{dp.datapoint_id}".encode()
+    assert len(downloaded) == len(blob_query_result)
+
+
+def test_prefetched_blob_without_disk_cache_is_released(blob_query_result, blob_cache, downloaded):
+    blob_query_result.get_blob_fields("blob", lazy=True, cache_on_disk=False, prefetch_window=0)
+
+    for dp in blob_query_result:
+        ref = dp.metadata["blob"]
+        ref._prefetch_future.result()
+        assert ref.get() == f"content of hash{dp.datapoint_id}".encode()
+        assert ref._prefetched is None
+
+    assert blob_cache.size == 0
+
+
+def test_skipped_prefetched_blobs_are_released(blob_query_result, blob_cache, downloaded):
+    blob_query_result.get_blob_fields("blob", lazy=True, cache_on_disk=False, prefetch_window=1)
+    refs = [dp.metadata["blob"] for dp in blob_query_result.entries]
+
+    for i, dp in enumerate(blob_query_result):
+        refs[i]._prefetch_future.result()
+        # Only the current and the next datapoint keep their prefetched blobs
+        assert [ref._prefetched is not None for ref in refs[:i]] == [False] * i
+
+    # Skipped blobs are downloaded again when they're accessed later
+    assert refs[0].get() == b"content of hash0"
+    assert blob_cache.size == 0
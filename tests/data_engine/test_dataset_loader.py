@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from dagshub.data_engine.client.loaders.base import DagsHubDataset, _OrderedPrefetcher
+from dagshub.data_engine.client.models import DatasourceType
+
+
+@pytest.fixture
+def fetches():
+    return Counter()
+
+
+@pytest.fixture
+def dataset(query_result, tmp_path, mocker, fetches):
+    query_result.datasource.source.source_type = DatasourceType.REPOSITORY
+    lock = threading.Lock()
+
+    def fetch(self, path, filepath):
+        with lock:
+            fetches[path] += 1
+        time.sleep(0.02)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        filepath.write_text(path)
+
+    mocker.patch.object(DagsHubDataset, "_fetch", fetch)
+    return DagsHubDataset(query_result, file_columns=[], tensorizers=[lambda x: x], savedir=str(tmp_path))
+
+
+def test_get_and_pull_download_files_once(dataset, fetches, tmp_path):
+    pull = dataset.pull_in_background()
+    with ThreadPoolExecutor(max_workers=4) as tp:
+        results = list(tp.map(dataset.get, [0, 1, 2, 3, 4, 4, 3, 2, 1, 0]))
+    pull.join()
+
+    assert [open(res[0]).read() for res in results[:5]] == [f"dp_{i}" for i in range(5)]
+    assert fetches == {f"dp_{i}": 1 for i in range(5)}
+
+
+def test_waiting_thread_retries_failed_download(dataset, fetches, mocker):
+    fetch = DagsHubDataset._fetch
+    failed = threading.Event()
+
+    def fail_once(self, path, filepath):
+        if not failed.is_set():
+            failed.set()
+            time.sleep(0.05)
+            raise RuntimeError("Connection reset")
+        fetch(self, path, filepath)
+
+    mocker.patch.object(DagsHubDataset, "_fetch", fail_once)
+    with ThreadPoolExecutor(max_workers=2) as tp:
+        first = tp.submit(dataset.get, 0)
+        failed.wait()
+        second = tp.submit(dataset.get, 0)
+        with pytest.raises(RuntimeError):
+            first.result()
+        assert open(second.result()[0]).read() == "dp_0"
+    assert fetches == {"dp_0": 1}
+
+
+def test_download_state_is_not_shared_with_other_processes(dataset):
+    dataset._in_flight["dp_0"] = threading.Event()
+
+    state = dataset.__getstate__()
+    assert "_in_flight_lock" not in state
+    loaded = DagsHubDataset.__new__(DagsHubDataset)
+    loaded.__setstate__(state)
+    assert loaded._in_flight == {}
+
+    # A forked worker starts with a clean state too
+    dataset._download_state_pid = -1
+    in_flight, _ = dataset._get_download_state()
+    assert in_flight == {}
+
+
+def test_prefetcher_keeps_window_ahead():
+    fetched = []
+    prefetcher = _OrderedPrefetcher([5, 3, 8, 1, 0, 9], fetched.append, window=2, num_threads=1)
+
+    prefetcher.on_access(5)
+    prefetcher.on_access(3)
+    # Out of order access - continue from the accessed index
+    prefetcher.on_access(0)
+    prefetcher._executor.shutdown(wait=True)
+
+    assert fetched == [3, 8, 1, 9]
+
+
+def test_prefetch_follows_worker_split(dataset, mocker):
+    dataset.set_epoch_order([[4, 0], [3, 1], [2]])
+    mocker.patch.object(dataset, "_worker_split", return_value=(1, 2))
+
+    assert dataset._get_prefetcher()._order == [3, 1]
+
+
+def test_torch_dataloader_prefetches_in_sampler_order(query_result, tmp_path, mocker, fetches, dataset):
+    pytest.importorskip("torch")
+    from dagshub.data_engine.client.loaders.torch import PyTorchDataLoader, PyTorchDataset
+
+    torch_dataset = PyTorchDataset(
+        query_result, file_columns=[], tensorizers=[lambda x: x], savedir=str(tmp_path), prefetch_window=2
+    )
+    loader = PyTorchDataLoader(torch_dataset, batch_size=2, shuffle=True)
+    batches = iter(loader)
+
+    first = next(batches)
+    torch_dataset._prefetcher._executor.shutdown(wait=True)
+
+    order = [idx for batch in torch_dataset._epoch_batches for idx in batch]
+    assert [path.rsplit("/", 1)[-1] for path in first[0]] == [f"dp_{i}" for i in order[:2]]
+    assert set(fetches) == {f"dp_{i}" for i in order[:4]}
+
+
+def test_torch_dataloader_workers_get_the_order_of_the_epoch(query_result, tmp_path, dataset, mocker):
+    pytest.importorskip("torch")
+    from dagshub.data_engine.client.loaders.torch import PyTorchDataLoader, PyTorchDataset
+
+    torch_dataset = PyTorchDataset(
+        query_result, file_columns=[], tensorizers=[lambda x: x], savedir=str(tmp_path), prefetch_window=2
+    )
+    set_epoch_order = mocker.spy(torch_dataset, "set_epoch_order")
+    loader = PyTorchDataLoader(torch_dataset, batch_size=1, shuffle=True, num_workers=2, multiprocessing_context="fork")
+
+    for _ in range(2):
+        paths = [batch[0][0].rsplit("/", 1)[-1] for batch in loader]
+
+        # The order is generated once per epoch, and it's the order the batches are loaded in
+        assert set_epoch_order.call_count == 1
+        assert paths == [f"dp_{batch[0]}" for batch in set_epoch_order.call_args.args[0]]
+        set_epoch_order.reset_mock()
@@ -1,14 +1,23 @@
+import base64
 import datetime
+import gzip
 from unittest.mock import MagicMock
 
 import pandas as pd
 import pytest
+from gql.transport.exceptions import TransportServerError
 
+import dagshub.common.config
 from dagshub.data_engine.client.models import MetadataFieldSchema
 from dagshub.data_engine.dtypes import MetadataFieldType, ReservedTags
 from dagshub.data_engine.model.datasource import Datasource, DatapointMetadataUpdateEntry, MetadataContextManager
-from dagshub.data_engine.model.metadata import wrap_bytes, MultipleDataTypesUploadedError, StringFieldValueTooLongError
-from tests.data_engine.util import add_string_fields, add_document_fields
+from dagshub.data_engine.model.metadata import (
+    buffer,
+    wrap_bytes,
+    MultipleDataTypesUploadedError,
+    StringFieldValueTooLongError,
+)
+from tests.data_engine.util import add_string_fields, add_document_fields, add_metadata_field
 
 
 @pytest.fixture
@@ -115,7 +124,7 @@ def test_uploading_new_big_file_turns_it_to_document(ds):
             url="a.txt", key="field", value=wrap_bytes(data.encode("utf-8")), valueType=MetadataFieldType.BLOB
         )
     ]
-    client_mock.update_metadata.assert_called_with(ds, expected_data_upload)
+    client_mock.update_metadata.assert_called_with(ds, [e.to_dict() for e in expected_data_upload])
 
 
 def test_uploading_to_document_turns_into_blob(ds):
@@ -131,7 +140,55 @@ def test_uploading_to_document_turns_into_blob(ds):
             url="a.txt", key=field, value=wrap_bytes(data.encode("utf-8")), valueType=MetadataFieldType.BLOB
         )
     ]
-    client_mock.update_metadata.assert_called_with(ds, expected_data_upload)
+    client_mock.update_metadata.assert_called_with(ds, [e.to_dict() for e in expected_data_upload])
+
+
+def test_list_value_promotes_field_to_multivalue(ds):
+    ctx = MetadataContextManager(ds)
+    ctx.update_metadata("a.txt", {"field": 1, "other": "a"})
+    ctx.update_metadata("b.txt", {"field": [2, 3]})
+
+    expected = [
+        DatapointMetadataUpdateEntry("a.txt", "field", "1", MetadataFieldType.INTEGER, allowMultiple=True),
+        DatapointMetadataUpdateEntry("a.txt", "other", "a", MetadataFieldType.STRING, allowMultiple=False),
+        DatapointMetadataUpdateEntry("b.txt", "field", "2", MetadataFieldType.INTEGER, allowMultiple=True),
+        DatapointMetadataUpdateEntry("b.txt", "field", "3", MetadataFieldType.INTEGER, allowMultiple=True),
+    ]
+    assert ctx.get_metadata_entries() == expected
+
+
+def test_list_of_datetimes(ds):
+    tz = datetime.timezone(datetime.timedelta(hours=2))
+    timestamp = datetime.datetime(2024, 1, 1, tzinfo=tz)
+    ctx = MetadataContextManager(ds)
+    ctx.update_metadata("a.txt", {"field": [timestamp]})
+
+    expected = DatapointMetadataUpdateEntry(
+        "a.txt",
+        "field",
+        str(int(timestamp.timestamp() * 1000)),
+        MetadataFieldType.DATETIME,
+        allowMultiple=True,
+        timeZone="+02:00",
+    )
+    assert ctx.get_metadata_entries() == [expected]
+
+
+def test_spilled_metadata_is_uploaded_in_order(ds, monkeypatch):
+    monkeypatch.setattr(dagshub.common.config, "dataengine_metadata_buffer_spill_threshold", 3)
+    monkeypatch.setattr(dagshub.common.config, "dataengine_metadata_upload_batch_size", 4)
+    with ds.metadata_context() as ctx:
+        for i in range(10):
+            ctx.update_metadata(f"{i}.txt", {"idx": i, "score": i / 2})
+
+    client_mock: MagicMock = ds.source.client
+    uploaded = [e for call in client_mock.update_metadata.call_args_list for e in call.args[1]]
+    assert [len(call.args[1]) for call in client_mock.update_metadata.call_args_list] == [4, 4, 4, 4, 4]
+    expected = []
+    for i in range(10):
+        expected.append(DatapointMetadataUpdateEntry(f"{i}.txt", "idx", str(i), MetadataFieldType.INTEGER))
+        expected.append(DatapointMetadataUpdateEntry(f"{i}.txt", "score", str(i / 2), MetadataFieldType.FLOAT))
+    assert uploaded == [e.to_dict() for e in expected]
 
 
 def test_pandas_timestamp(ds):
@@ -158,3 +215,169 @@ def test_pandas_timestamp(ds):
     ]
 
     assert expected == actual
+
+
+def test_df_nan_and_none_values_are_skipped(ds):
+    df = pd.DataFrame.from_dict(
+        {
+            "file": ["test1", "test2"],
+            "key1": [1.0, float("nan")],
+            "key2": [None, "value"],
+        }
+    )
+
+    actual = Datasource._df_to_metadata(ds, df)
+    expected = [
+        DatapointMetadataUpdateEntry("test1", "key1", "1.0", MetadataFieldType.FLOAT),
+        DatapointMetadataUpdateEntry("test2", "key2", "value", MetadataFieldType.STRING),
+    ]
+    assert expected == actual
+
+
+def test_df_list_values_promote_field_to_multivalue(ds):
+    df = pd.DataFrame.from_dict(
+        {
+            "file": ["test1", "test2"],
+            "key1": [1, [2, 3]],
+        }
+    )
+
+    actual = Datasource._df_to_metadata(ds, df)
+    expected = [
+        DatapointMetadataUpdateEntry("test1", "key1", "1", MetadataFieldType.INTEGER, allowMultiple=True),
+        DatapointMetadataUpdateEntry("test2", "key1", "2", MetadataFieldType.INTEGER, allowMultiple=True),
+        DatapointMetadataUpdateEntry("test2", "key1", "3", MetadataFieldType.INTEGER, allowMultiple=True),
+    ]
+    assert expected == actual
+
+
+def test_df_integer_field_from_float_column(ds):
+    add_metadata_field(ds, "key1", MetadataFieldType.INTEGER)
+    df = pd.DataFrame.from_dict(
+        {
+            "file": ["test1", "test2"],
+            "key1": [1.0, float("nan")],
+        }
+    )
+
+    actual = Datasource._df_to_metadata(ds, df)
+    expected = [DatapointMetadataUpdateEntry("test1", "key1", "1", MetadataFieldType.INTEGER)]
+    assert expected == actual
+
+
+def test_df_float32_column_keeps_short_values(ds):
+    df = pd.DataFrame.from_dict({"file": ["test1", "test2"], "key1": [0.1, float("nan")]}).astype({"key1": "float32"})
+
+    actual = Datasource._df_to_metadata(ds, df)
+    expected = [DatapointMetadataUpdateEntry("test1", "key1", "0.1", MetadataFieldType.FLOAT)]
+    assert expected == actual
+
+
+def test_df_document_column(ds):
+    add_document_fields(ds, "doc")
+    df = pd.DataFrame.from_dict({"file": ["test1"], "doc": ["some text"]})
+
+    actual = Datasource._df_to_metadata(ds, df)
+    assert len(actual) == 1
+    assert actual[0].valueType == MetadataFieldType.BLOB
+    assert gzip.decompress(base64.b64decode(actual[0].value)) == b"some text"
+
+
+def test_pandas_timestamp_with_timezone(ds):
+    tz = datetime.timezone(datetime.timedelta(hours=3))
+    timestamps = [
+        datetime.datetime(2020, 10, 10, 10, 10, 0, 123456, tzinfo=tz),
+        None,
+    ]
+    df = pd.DataFrame.from_dict({"file": ["test1", "test2"], "key1": timestamps})
+    df["key1"] = pd.to_datetime(df["key1"])
+
+    actual = Datasource._df_to_metadata(ds, df)
+
+    expected = [
+        DatapointMetadataUpdateEntry(
+            "test1",
+            "key1",
+            str(int(timestamps[0].timestamp() * 1000)),
+            MetadataFieldType.DATETIME,
+            timeZone="+03:00",
+        ),
+    ]
+    assert expected == actual
+
+
+@pytest.mark.parametrize("spill_threshold", [0, 7])
+def test_df_whole_column_conversion_matches_row_by_row(ds, monkeypatch, spill_threshold):
+    monkeypatch.setattr(dagshub.common.config, "dataengine_metadata_buffer_spill_threshold", spill_threshold)
+    tz = datetime.timezone(datetime.timedelta(hours=-5))
+    df = pd.DataFrame.from_dict(
+        {
+            "file": [f"test{i}" for i in range(5)],
+            "int": [1, 2, 3, 4, 5],
+            "float": [0.5, float("nan"), 1.5, float("nan"), 2.5],
+            "str": ["a", None, "ccc", "dd", None],
+            "bool": [True, False, True, True, False],
+            "date": [datetime.datetime(2020, 1, i + 1, tzinfo=tz) if i != 2 else None for i in range(5)],
+        }
+    )
+    df["date"] = pd.to_datetime(df["date"])
+
+    actual = Datasource._df_to_metadata(ds, df)
+    monkeypatch.setattr(buffer, "_uniform_storage_kind", lambda values: None)
+    expected = Datasource._df_to_metadata(ds, df)
+
+    assert len(actual) == 20
+    assert actual == expected
+
+
+def test_delete_datapoints_in_batches(ds, some_datapoints, monkeypatch):
+    monkeypatch.setattr(dagshub.common.config, "dataengine_metadata_upload_batch_size", 2)
+    deleted = ds.delete_datapoints(some_datapoints, force=True)
+
+    client_mock: MagicMock = ds.source.client
+    batches = [call.args[1] for call in client_mock.delete_datapoints.call_args_list]
+    assert deleted == 5
+    assert sorted(len(b) for b in batches) == [1, 2, 2]
+    assert sorted(e.datapointId for b in batches for e in b) == [0, 1, 2, 3, 4]
+
+
+def test_delete_metadata_in_batches(ds, some_datapoints, monkeypatch):
+    monkeypatch.setattr(dagshub.common.config, "dataengine_metadata_upload_batch_size", 3)
+    deleted = ds.delete_metadata_from_datapoints(some_datapoints, ["col0", "col1"])
+
+    client_mock: MagicMock = ds.source.client
+    batches = [call.args[1] for call in client_mock.delete_metadata_for_datapoint.call_args_list]
+    assert deleted == 10
+    assert len(batches) == 4
+    assert sorted((e.datapointId, e.key) for b in batches for e in b) == [
+        (i, f"col{j}") for i in range(5) for j in range(2)
+    ]
+
+
+def test_delete_dry_run(ds, some_datapoints):
+    assert ds.delete_datapoints(some_datapoints, dry_run=True) == 5
+    assert ds.delete_metadata_from_datapoints(some_datapoints, ["col0"], dry_run=True) == 5
+
+    client_mock: MagicMock = ds.source.client
+    client_mock.delete_datapoints.assert_not_called()
+    client_mock.delete_metadata_for_datapoint.assert_not_called()
+
+
+def test_delete_retries_server_errors(ds, some_datapoints, monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda _: None)
+    client_mock: MagicMock = ds.source.client
+    client_mock.delete_datapoints.side_effect = [TransportServerError("Bad gateway", 502), None]
+
+    ds.delete_datapoints(some_datapoints, force=True)
+    assert client_mock.delete_datapoints.call_count == 2
+
+
+def test_delete_doesnt_retry_query_errors(ds, some_datapoints, monkeypatch):
+    monkeypatch.setattr(dagshub.common.config, "dataengine_metadata_upload_batch_size", 2)
+    client_mock: MagicMock = ds.source.client
+    client_mock.delete_datapoints.side_effect = [ValueError("bad query"), None, None]
+
+    with pytest.raises(ValueError):
+        ds.delete_datapoints(some_datapoints, force=True)
+    # The other batches still get sent
+    assert client_mock.delete_datapoints.call_count == 3
@@ -0,0 +1,100 @@
+import datetime
+
+import pytest
+
+from dagshub.data_engine.client.models import MetadataSelectFieldSchema
+from dagshub.data_engine.model.arrow_export import ArrowBatchConverter
+from dagshub.data_engine.model.datapoint import Datapoint
+from dagshub.data_engine.model.datasource import Datasource
+from dagshub.data_engine.model.query_result import QueryResult
+from tests.data_engine.util import add_datetime_fields, add_int_fields, add_string_fields
+
+datasets = pytest.importorskip("datasets")
+
+
+def make_page(ds, start, count) -> QueryResult:
+    dps = [
+        Datapoint(datapoint_id=i, path=f"dp_{i}", metadata={"size": i, "name": f"file_{i}"}, datasource=ds)
+        for i in range(start, start + count)
+    ]
+    fields = [MetadataSelectFieldSchema.from_metadata_field_schema(f) for f in ds.fields]
+    return QueryResult(_entries=dps, datasource=ds, fields=fields)
+
+
+@pytest.fixture
+def export_ds(ds, mocker):
+    add_int_fields(ds, "size")
+    add_string_fields(ds, "name")
+    mocker.patch.object(Datasource, "_check_preprocess")
+    ds.source.client.iter_pages.side_effect = lambda *args, **kwargs: iter([make_page(ds, 0, 3), make_page(ds, 3, 2)])
+    return ds
+
+
+def test_query_result_as_hf_dataset(query_result):
+    dataset = query_result.as_hf_dataset(download_datapoints=False, download_blobs=False, batch_size=2)
+
+    assert dataset.column_names == ["path", "col0", "col1", "col2", "col3", "col4"]
+    assert dataset["path"] == [f"dp_{i}" for i in range(5)]
+    assert dataset["col3"] == list(range(5))
+    assert str(dataset.features["col0"].dtype) == "int64"
+
+
+def test_query_result_as_hf_dataset_on_disk(query_result, tmp_path):
+    dataset = query_result.as_hf_dataset(download_datapoints=False, download_blobs=False, cache_dir=tmp_path)
+
+    assert len(list(tmp_path.glob("*.arrow"))) == 1
+    assert dataset.to_dict() == query_result.as_hf_dataset(download_datapoints=False, download_blobs=False).to_dict()
+
+
+def test_datasource_as_hf_dataset_writes_pages(export_ds, tmp_path):
+    dataset = export_ds.as_hf_dataset(download_datapoints=False, download_blobs=False, cache_dir=tmp_path)
+
+    assert dataset["path"] == [f"dp_{i}" for i in range(5)]
+    assert dataset["size"] == list(range(5))
+    assert dataset["name"] == [f"file_{i}" for i in range(5)]
+
+
+def test_datasource_as_hf_dataset_streaming(export_ds, mocker):
+    # HuggingFace hashes the generator, which can't be done with the mocked client of the datasource
+    mocker.patch.object(datasets.fingerprint.Hasher, "hash", return_value="hash")
+    dataset = export_ds.as_hf_dataset(download_datapoints=False, download_blobs=False, streaming=True)
+
+    rows = list(dataset)
+    assert [r["path"] for r in rows] == [f"dp_{i}" for i in range(5)]
+    assert rows[4] == {"path": "dp_4", "name": "file_4", "size": 4}
+
+
+def test_converter_types(ds):
+    add_datetime_fields(ds, "created")
+    add_int_fields(ds, "size")
+    fields = [MetadataSelectFieldSchema.from_metadata_field_schema(f) for f in ds.fields]
+    tz = datetime.timezone(datetime.timedelta(hours=3))
+    dps = [
+        Datapoint(
+            datapoint_id=0, path="a", metadata={"created": datetime.datetime(2020, 1, 1, 3, tzinfo=tz)}, datasource=ds
+        ),
+        Datapoint(datapoint_id=1, path="b", metadata={"size": 1, "blob": b"content"}, datasource=ds),
+    ]
+    converter = ArrowBatchConverter(fields, ["blob", "created", "size"])
+
+    batch = converter.convert(dps)
+
+    assert str(batch.schema.field("created").type) == "timestamp[ms, tz=UTC]"
+    assert str(batch.schema.field("blob").type) == "binary"
+    assert batch.column("created")[0].as_py() == datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    assert batch.column("size").to_pylist() == [None, 1]
+    # Empty batches keep the schema
+    assert converter.convert([]).schema == batch.schema
+
+
+def test_datasource_as_hf_dataset_replaces_previous_export(export_ds, tmp_path):
+    first = export_ds.as_hf_dataset(download_datapoints=False, download_blobs=False, cache_dir=tmp_path)
+    second = export_ds.as_hf_dataset(download_datapoints=False, download_blobs=False, cache_dir=tmp_path)
+
+    assert len(list(tmp_path.glob("*.arrow"))) == 1
+    assert first.cache_files == second.cache_files
+    # The first dataset is still readable from the memory map of the replaced file
+    assert first["path"] == second["path"]
+
+    (export_ds["size"] > 1).as_hf_dataset(download_datapoints=False, download_blobs=False, cache_dir=tmp_path)
+    assert len(list(tmp_path.glob("*.arrow"))) == 2
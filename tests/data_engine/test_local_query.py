@@ -0,0 +1,153 @@
+import datetime
+
+import pytest
+
+from dagshub.data_engine.client.models import MetadataSelectFieldSchema
+from dagshub.data_engine.model.datapoint import Datapoint
+from dagshub.data_engine.model.datasource import Field
+from dagshub.data_engine.model.errors import QueryNotLocallyEvaluableError
+from dagshub.data_engine.model.query_result import QueryResult
+from tests.data_engine.util import add_int_fields, add_string_fields, add_datetime_fields, add_blob_fields
+
+UTC_PLUS_3 = datetime.timezone(datetime.timedelta(hours=3))
+
+
+@pytest.fixture
+def local_ds(ds):
+    add_int_fields(ds, "size")
+    add_string_fields(ds, "name")
+    add_datetime_fields(ds, "created")
+    add_blob_fields(ds, "blob")
+    return ds
+
+
+def make_result(ds, query_ds=None) -> QueryResult:
+    dps = []
+    for i in range(6):
+        metadata = {
+            "name": f"file_{i}",
+            # Still January 1st in UTC
+            "created": datetime.datetime(2020 + i % 2, 1, 2, i % 2, tzinfo=UTC_PLUS_3),
+            "blob": f"hash{i}",
+        }
+        if i != 4:
+            metadata["size"] = 10 - i
+        dps.append(Datapoint(datapoint_id=i, path=f"dp_{i}", metadata=metadata, datasource=ds))
+    query_ds = query_ds if query_ds is not None else ds
+    fields = [MetadataSelectFieldSchema.from_metadata_field_schema(f) for f in ds.fields]
+    res = QueryResult(_entries=dps, datasource=query_ds, fields=fields)
+    res._full_query = query_ds.get_query().__deepcopy__()
+    return res
+
+
+def paths(res: QueryResult):
+    return [dp.path for dp in res]
+
+
+@pytest.mark.parametrize(
+    "make_query, expected",
+    [
+        (lambda ds: ds["size"] > 7, ["dp_0", "dp_1", "dp_2"]),
+        (lambda ds: (ds["size"] <= 7) & (ds["name"] == "file_5"), ["dp_5"]),
+        (lambda ds: (ds["size"] == 10) | ds["name"].endswith("_3"), ["dp_0", "dp_3"]),
+        (lambda ds: ds["size"] != 9, ["dp_0", "dp_2", "dp_3", "dp_4", "dp_5"]),
+        (lambda ds: ds["size"].is_null(), ["dp_4"]),
+        (lambda ds: ds["size"].is_not_null() & ds["name"].contains("le_4"), []),
+        (
+            lambda ds: ds["created"] >= datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc),
+            ["dp_1", "dp_3", "dp_5"],
+        ),
+        (lambda ds: ds["created"].date_field_in_years(2020), ["dp_0", "dp_2", "dp_4"]),
+        (lambda ds: ds["created"].date_field_in_timeofday("00:30-02:00"), ["dp_1", "dp_3", "dp_5"]),
+    ],
+)
+def test_refine_filters(local_ds, make_query, expected):
+    res = make_result(local_ds)
+    assert paths(res.refine(local_ds[make_query(local_ds)])) == expected
+
+
+def test_refine_with_time_zone(local_ds):
+    res = make_result(local_ds.with_time_zone("+00:00"))
+    utc_ds = res.datasource
+
+    assert len(res.refine(utc_ds[utc_ds["created"].date_field_in_days(1)])) == 6
+    assert len(res.refine(utc_ds[utc_ds["created"].date_field_in_days(2)])) == 0
+
+
+def test_refine_narrowed_query(local_ds):
+    base = local_ds[local_ds["size"] > 6]
+    res = make_result(local_ds, base)
+    res.entries = res.entries[:4]
+
+    narrowed = base[base["name"] == "file_3"]
+    refined = res.refine(narrowed)
+    assert paths(refined) == ["dp_3"]
+    assert refined.datasource is narrowed
+
+    # The refined result can be refined further
+    assert paths(refined.refine(narrowed[narrowed["size"] < 5])) == []
+
+    with pytest.raises(QueryNotLocallyEvaluableError):
+        res.refine(local_ds[local_ds["size"] > 2])
+    with pytest.raises(QueryNotLocallyEvaluableError):
+        res.refine(narrowed.as_of(datetime.datetime.now()))
+
+
+def test_refine_order_and_select(local_ds):
+    res = make_result(local_ds)
+    q = local_ds[local_ds["size"] < 9].order_by("size").select("size")
+
+    refined = res.refine(q)
+
+    assert paths(refined) == ["dp_5", "dp_3", "dp_2"]
+    assert [f.name for f in refined.fields] == ["size"]
+    assert refined.entries[0].metadata == {"size": 5}
+    # Original datapoints aren't changed
+    assert "name" in res["dp_5"].metadata
+
+    descending = res.refine(local_ds.order_by(("size", "desc")))
+    assert paths(descending) == ["dp_0", "dp_1", "dp_2", "dp_3", "dp_5", "dp_4"]
+
+
+@pytest.mark.parametrize(
+    "make_query",
+    [
+        lambda ds: ds[ds["blob"] == "hash1"],
+        lambda ds: ds[Field("size", as_of=datetime.datetime.now())] > 5,
+        lambda ds: ds.select(Field("size", alias="other_size")),
+    ],
+)
+def test_refine_unsupported_queries(local_ds, make_query):
+    res = make_result(local_ds)
+    with pytest.raises(QueryNotLocallyEvaluableError):
+        res.refine(make_query(local_ds))
+
+
+def test_refine_partial_result(local_ds):
+    res = make_result(local_ds)[:3]
+    q = local_ds[local_ds["size"] > 8]
+
+    with pytest.raises(QueryNotLocallyEvaluableError):
+        res.refine(q)
+    assert paths(res.refine(q, check_superset=False)) == ["dp_0", "dp_1"]
+
+
+def test_columns_are_rebuilt_on_new_entries(local_ds):
+    res = make_result(local_ds)
+    q = local_ds[local_ds["size"] == 10]
+    assert paths(res.refine(q)) == ["dp_0"]
+
+    res._extend_entries([Datapoint(datapoint_id=10, path="new", metadata={"size": 10}, datasource=local_ds)])
+    assert paths(res.refine(q)) == ["dp_0", "new"]
+
+
+def test_columns_are_rebuilt_on_changed_metadata(local_ds):
+    res = make_result(local_ds)
+    q = local_ds[local_ds["size"] == 10]
+    assert paths(res.refine(q)) == ["dp_0"]
+    column = res._column("name")
+
+    res.entries[3].metadata["size"] = 10
+    assert paths(res.refine(q)) == ["dp_0", "dp_3"]
+    # Unchanged columns are reused
+    assert res._column("name") is column
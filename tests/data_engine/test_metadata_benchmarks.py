@@ -0,0 +1,117 @@
+"""
+Benchmarks of building metadata uploads, compared to the way the entries were built before.
+Tests marked with ``benchmark`` measure time and memory, they're skipped by default. Run them with ``-m benchmark``.
+"""
+
+import gc
+import math
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dagshub.data_engine.dtypes import MetadataFieldType
+from dagshub.data_engine.model.datasource import Datasource, DatapointMetadataUpdateEntry
+from dagshub.data_engine.model.metadata.buffer import MetadataUpdateBuffer
+from dagshub.data_engine.model.schema_util import metadataTypeLookup
+
+NUM_DATAPOINTS = 5_000
+
+
+def _peak_memory(build):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        res = build()
+        _, peak_size = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return res, peak_size
+
+
+def _metadata_updates():
+    for i in range(NUM_DATAPOINTS):
+        path = f"images/{i}.jpg"
+        yield path, "idx", i, MetadataFieldType.INTEGER
+        yield path, "score", i / 7, MetadataFieldType.FLOAT
+        for j in range(3):
+            yield path, f"label{j}", f"label_{i % 100}_{j}", MetadataFieldType.STRING
+
+
+def _entries_list():
+    # What MetadataContextManager used to keep: a dataclass with the stringified value for every update
+    return [
+        DatapointMetadataUpdateEntry(path, key, str(value), value_type)
+        for path, key, value, value_type in _metadata_updates()
+    ]
+
+
+def _buffer(spill_threshold: int):
+    res = MetadataUpdateBuffer(spill_threshold=spill_threshold)
+    for path, key, value, value_type in _metadata_updates():
+        res.add(path, key, value, value_type)
+    return res
+
+
+@pytest.mark.benchmark
+def test_buffer_memory():
+    entries, entries_size = _peak_memory(_entries_list)
+    buffer, buffer_size = _peak_memory(lambda: _buffer(spill_threshold=0))
+    spilled_buffer, spilled_size = _peak_memory(lambda: _buffer(spill_threshold=2_000))
+
+    assert len(buffer) == len(spilled_buffer) == len(entries)
+    assert buffer_size < entries_size / 2
+    assert spilled_size < buffer_size / 4
+
+
+def _df_to_metadata_row_by_row(df: pd.DataFrame, path_column: str):
+    # The conversion before it was done column by column, for a frame with only scalar values
+    res = []
+    field_value_types = {}
+    for _, row in df.iterrows():
+        datapoint = row[path_column]
+        for key, val in row.items():
+            if key == path_column or val is None or (isinstance(val, float) and math.isnan(val)):
+                continue
+            value_type = field_value_types.get(key)
+            if value_type is None:
+                value_type = metadataTypeLookup[type(val)]
+                field_value_types[key] = value_type
+            if value_type == MetadataFieldType.INTEGER:
+                val = int(val)
+            res.append(DatapointMetadataUpdateEntry(datapoint, key, str(val), value_type))
+    return res
+
+
+def _make_df(num_rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    columns = {"path": [f"images/{i}.jpg" for i in range(num_rows)]}
+    for j in range(5):
+        columns[f"int{j}"] = rng.integers(0, 1000, num_rows)
+        columns[f"float{j}"] = rng.random(num_rows)
+        columns[f"str{j}"] = [f"value_{i % 100}" for i in range(num_rows)]
+        columns[f"bool{j}"] = rng.random(num_rows) > 0.5
+    return pd.DataFrame(columns)
+
+
+def test_dataframe_conversion_matches_row_by_row(ds):
+    df = _make_df(100)
+
+    assert Datasource._df_to_metadata(ds, df, "path") == _df_to_metadata_row_by_row(df, "path")
+
+
+@pytest.mark.benchmark
+def test_dataframe_conversion_speed(ds):
+    df = _make_df(NUM_DATAPOINTS)
+
+    start = time.perf_counter()
+    _df_to_metadata_row_by_row(df, "path")
+    row_by_row_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    Datasource._df_to_metadata_buffer(ds, df, "path")
+    buffer_time = time.perf_counter() - start
+
+    assert buffer_time < row_by_row_time / 5
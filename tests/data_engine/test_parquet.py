@@ -0,0 +1,111 @@
+import datetime
+
+import pytest
+
+from dagshub.data_engine.annotation import MetadataAnnotations
+from dagshub.data_engine.client.models import DatasourceType, MetadataSelectFieldSchema, PreprocessingStatus
+from dagshub.data_engine.dtypes import MetadataFieldType, ReservedTags
+from dagshub.data_engine.model.datapoint import Datapoint
+from dagshub.data_engine.model.datasource import Datasource
+from dagshub.data_engine.model.query_result import QueryResult
+from tests.data_engine.util import add_datetime_fields, add_int_fields, add_metadata_field, add_string_fields
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+@pytest.fixture
+def snapshot_ds(ds):
+    ds.source.source_type = DatasourceType.REPOSITORY
+    ds.source.preprocessing_status = PreprocessingStatus.READY
+    add_int_fields(ds, "size")
+    add_string_fields(ds, "name")
+    add_datetime_fields(ds, "created")
+    return ds
+
+
+def make_result(ds, start, count) -> QueryResult:
+    created = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+    dps = [
+        Datapoint(
+            datapoint_id=i,
+            path=f"dp_{i}",
+            metadata={"size": i, "name": f"file_{i}", "created": created + datetime.timedelta(days=i)},
+            datasource=ds,
+        )
+        for i in range(start, start + count)
+    ]
+    # A datapoint without a value in a field
+    del dps[0].metadata["name"]
+    fields = [MetadataSelectFieldSchema.from_metadata_field_schema(f) for f in ds.fields]
+    return QueryResult(_entries=dps, datasource=ds, fields=fields)
+
+
+def test_parquet_round_trip(snapshot_ds, tmp_path):
+    res = make_result(snapshot_ds, 0, 25)
+    path = res.to_parquet(tmp_path / "snapshot.parquet", row_group_size=10)
+
+    assert pq.ParquetFile(path).num_row_groups == 3
+
+    loaded = QueryResult.from_parquet(path)
+    assert [dp.path for dp in loaded] == [dp.path for dp in res]
+    assert [dp.datapoint_id for dp in loaded] == [dp.datapoint_id for dp in res]
+    assert [dp.metadata for dp in loaded] == [dp.metadata for dp in res]
+    assert loaded.fields == res.fields
+    assert "name" not in loaded[0].metadata
+
+
+def test_from_parquet_recreates_datasource(snapshot_ds, tmp_path):
+    filtered = snapshot_ds["size"] > 5
+    res = make_result(filtered, 6, 4)
+    res._full_query = filtered.get_query()
+    path = res.to_parquet(tmp_path / "snapshot.parquet")
+
+    loaded = QueryResult.from_parquet(path)
+
+    source = loaded.datasource.source
+    assert (source.repo, source.id, source.name, source.path) == (
+        "kirill/repo",
+        1,
+        "test-dataset",
+        "repo://kirill/repo/data/",
+    )
+    assert source.metadata_fields == snapshot_ds.source.metadata_fields
+    assert loaded.datasource.get_query().to_dict() == filtered.get_query().to_dict()
+    # The snapshot is the whole result of the query, so it can be refined locally
+    assert [dp.path for dp in loaded.refine(loaded.datasource["size"] > 7)] == ["dp_8", "dp_9"]
+
+
+def test_iter_parquet_reads_row_groups(snapshot_ds, tmp_path):
+    path = make_result(snapshot_ds, 0, 25).to_parquet(tmp_path / "snapshot.parquet", row_group_size=10)
+
+    parts = list(QueryResult.iter_parquet(path, datasource=snapshot_ds))
+
+    assert [len(part) for part in parts] == [10, 10, 5]
+    assert all(part.datasource is snapshot_ds for part in parts)
+
+
+def test_annotations_are_loaded_from_parquet(snapshot_ds, tmp_path):
+    add_metadata_field(snapshot_ds, "annotation", MetadataFieldType.BLOB, tags={ReservedTags.ANNOTATION.value})
+    res = make_result(snapshot_ds, 0, 2)
+    res[0].metadata["annotation"] = b'{"annotations": [{"result": []}], "data": {"image": "dp_0"}}'
+    res._convert_annotation_fields("annotation", load_into_memory=True)
+    assert isinstance(res[0].metadata["annotation"], MetadataAnnotations)
+
+    loaded = QueryResult.from_parquet(res.to_parquet(tmp_path / "snapshot.parquet"))
+
+    assert isinstance(loaded[0].metadata["annotation"], MetadataAnnotations)
+    assert isinstance(loaded[1].metadata["annotation"], MetadataAnnotations)
+
+
+def test_datasource_export_parquet_writes_pages(snapshot_ds, tmp_path, mocker):
+    mocker.patch.object(Datasource, "_check_preprocess")
+    snapshot_ds.source.client.iter_pages.side_effect = lambda *args, **kwargs: iter(
+        [make_result(snapshot_ds, 0, 7), make_result(snapshot_ds, 7, 7)]
+    )
+
+    path = snapshot_ds.export_parquet(tmp_path / "snapshot.parquet", row_group_size=5)
+
+    metadata = pq.ParquetFile(path).metadata
+    assert [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)] == [5, 5, 4]
+    loaded = QueryResult.from_parquet(path)
+    assert [dp.metadata["size"] for dp in loaded] == list(range(14))
@@ -0,0 +1,85 @@
+import os
+import time
+
+import pytest
+
+from dagshub.common import config
+from dagshub.data_engine.client.loaders.base import DagsHubDataset
+from dagshub.data_engine.client.models import DatasourceType
+from dagshub.data_engine.model import prediction_pipeline
+
+
+@pytest.fixture
+def predict_result(query_result, mocker, monkeypatch):
+    query_result.datasource.source.source_type = DatasourceType.REPOSITORY
+    mocker.patch.object(DagsHubDataset, "_download")
+    monkeypatch.setattr(config, "dataengine_metadata_upload_batch_size", 4)
+    return query_result
+
+
+def uploaded_paths(ds):
+    return [entry["url"] for call in ds.source.client.update_metadata.call_args_list for entry in call.args[1]]
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_generate_predictions_batches(predict_result, pipelined):
+    batches = []
+
+    def predict(paths):
+        batches.append([p.rsplit("/", 1)[-1] for p in paths])
+        return [(f"label_{p[-1]}", 0.5) for p in paths]
+
+    res = predict_result.generate_predictions(predict, batch_size=2, pipelined=pipelined)
+
+    assert batches == [["dp_0", "dp_1"], ["dp_2", "dp_3"], ["dp_4"]]
+    assert res == {f"dp_{i}": (f"label_{i}", 0.5) for i in range(5)}
+
+
+def test_pipelined_predictions_are_uploaded_in_chunks(predict_result):
+    ds = predict_result.datasource
+    uploads_during_inference = []
+
+    def predict(paths):
+        uploads_during_inference.append(ds.source.client.update_metadata.call_count)
+        return [("label", 0.5) for _ in paths]
+
+    predict_result.generate_predictions(predict, log_to_field="prediction", pipelined=True)
+
+    # Every prediction has a value and a score entry, so a chunk of 4 entries is uploaded every 2 datapoints
+    assert ds.source.client.update_metadata.call_count == 3
+    assert uploads_during_inference[-1] > 0
+    assert sorted(uploaded_paths(ds)) == sorted([f"dp_{i}" for i in range(5) for _ in range(2)])
+
+
+def test_prefetch_batches_keeps_order():
+    def fetch(idx):
+        # The first items take the longest to fetch
+        time.sleep((6 - idx) / 100)
+        return idx * 10
+
+    batches = prediction_pipeline.prefetch_batches([range(0, 2), range(2, 4), range(4, 6)], fetch, 3, 4)
+
+    assert list(batches) == [[0, 10], [20, 30], [40, 50]]
+
+
+class UpperModel:
+    def predict(self, paths):
+        return [(p.upper(), os.getpid()) for p in paths]
+
+
+def load_upper_model():
+    return UpperModel()
+
+
+def test_predict_in_processes_keeps_order():
+    batches = [[f"dp_{i}", f"dp_{i + 1}"] for i in range(0, 20, 2)]
+
+    predictions = list(prediction_pipeline.predict_in_processes(iter(batches), 2, load_upper_model, list, list))
+
+    assert [label for batch in predictions for label, _ in batch] == [f"DP_{i}" for i in range(20)]
+    assert os.getpid() not in {pid for batch in predictions for _, pid in batch}
+
+
+def test_predict_in_processes_requires_picklable_hooks():
+    with pytest.raises(ValueError, match="picklable"):
+        list(prediction_pipeline.predict_in_processes(iter([["dp_0"]]), 2, load_upper_model, lambda x: x, list))
@@ -1,5 +1,9 @@
+import datetime
 import math
 
+import dagshub.data_engine.model.query_result
+from dagshub.data_engine.client.models import DatapointHistoryResult
+from dagshub.data_engine.model.datapoint import Datapoint
 from dagshub.data_engine.model.query_result import QueryResult
 
 
@@ -21,3 +25,75 @@ def test_getitem_slice_returns_query_result(query_result):
     assert len(qr) == math.ceil(len(query_result) / 2)
     for i in range(len(qr)):
         assert qr[i].datapoint_id is query_result[i * 2].datapoint_id
+
+
+def test_version_timestamps_are_fetched_in_batches(query_result, monkeypatch):
+    monkeypatch.setattr(dagshub.data_engine.model.query_result, "DATAPOINT_HISTORY_BATCH_SIZE", 2)
+
+    def get_history(datapoints, fields, from_time, to_time):
+        return {
+            dp.path: [
+                DatapointHistoryResult(datetime.datetime.fromtimestamp(dp.datapoint_id * 10 + v)) for v in range(2)
+            ]
+            for dp in datapoints
+            if dp.datapoint_id != 3
+        }
+
+    client_mock = query_result.datasource.source.client
+    client_mock.get_datapoint_history.side_effect = get_history
+
+    res = query_result.get_version_timestamps(fields=["col0"])
+
+    assert sorted(len(call.args[0]) for call in client_mock.get_datapoint_history.call_args_list) == [1, 2, 2]
+    assert list(res.columns) == ["path", "datapoint_id", "timestamp"]
+    assert list(res["datapoint_id"]) == [0, 0, 1, 1, 2, 2, 4, 4]
+    assert res["timestamp"].iloc[-1] == datetime.datetime.fromtimestamp(41)
+
+
+def test_extend_entries_updates_lookups(query_result, ds):
+    query_result.create_index("col0")
+    new_dps = [Datapoint(datasource=ds, path=f"new_{i}", datapoint_id=10 + i, metadata={"col0": i}) for i in range(2)]
+
+    query_result._extend_entries(new_dps)
+
+    assert len(query_result) == 7
+    assert query_result["new_1"] is new_dps[1]
+    assert [dp.path for dp in query_result.where(col0=1)] == ["dp_1", "new_1"]
+
+
+def test_where(query_result):
+    query_result["dp_3"].metadata["col1"] = 1
+    query_result["dp_2"].metadata["tags"] = ["a", "b"]
+
+    assert [dp.path for dp in query_result.where(col1=1)] == ["dp_1", "dp_3"]
+    assert [dp.path for dp in query_result.where(col0=3, col1=1)] == ["dp_3"]
+    assert [dp.path for dp in query_result.where(tags=["a", "b"])] == ["dp_2"]
+    assert len(query_result.where(col0=100)) == 0
+
+
+def test_where_with_index_matches_scan(query_result):
+    query_result["dp_3"].metadata["col1"] = 1
+    query_result["dp_2"].metadata["col1"] = ["a", "b"]
+    query_result.create_index("col1")
+
+    # Value changed after indexing - stale index hits are filtered out
+    query_result["dp_1"].metadata["col1"] = 5
+
+    assert [dp.path for dp in query_result.where(col1=1)] == ["dp_3"]
+    assert [dp.path for dp in query_result.where(col1=["a", "b"])] == ["dp_2"]
+
+    query_result.entries = query_result.entries[:3]
+    assert len(query_result.where(col1=1)) == 0
+
+
+def test_where_with_index_keeps_result_order(query_result):
+    query_result["dp_1"].metadata["col1"] = ["a", "b"]
+    query_result["dp_3"].metadata["col1"] = 1
+    query_result.create_index("col1")
+    # Indexed with an unhashable value, found again with a hashable one
+    query_result["dp_1"].metadata["col1"] = 1
+
+    assert [dp.path for dp in query_result.where(col1=1)] == ["dp_1", "dp_3"]
+    assert [dp.path for dp in query_result.where(col1=1)] == [
+        dp.path for dp in query_result if dp.metadata["col1"] == 1
+    ]
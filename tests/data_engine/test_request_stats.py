@@ -0,0 +1,79 @@
+import io
+import json
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from dagshub.data_engine.client.data_client import DataClient
+from dagshub.data_engine.client.gql_queries import GqlQueries
+from dagshub.data_engine.client.stats import add_request_stats_callback, remove_request_stats_callback
+
+
+class FakeAdapter(BaseAdapter):
+    def __init__(self, body: bytes):
+        super().__init__()
+        self.body = body
+
+    def send(self, request, **kwargs):
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.headers["Content-Type"] = "application/json"
+        resp.raw = io.BytesIO(self.body)
+        resp.request = request
+        resp.url = request.url
+        return resp
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def data_client(mocker) -> DataClient:
+    mocker.patch("dagshub.auth.get_authenticator", return_value=None)
+    return DataClient("user/repo")
+
+
+@pytest.fixture
+def stats_callback():
+    received = []
+    add_request_stats_callback(received.append)
+    yield received
+    remove_request_stats_callback(received.append)
+
+
+def test_request_stats_are_recorded(data_client, stats_callback, mocker):
+    body = json.dumps({"data": {"datasource": [{"id": 1, "name": "ds"}]}}).encode()
+    mocker.patch.object(requests.Session, "get_adapter", return_value=FakeAdapter(body))
+
+    res = data_client._exec(GqlQueries.datasource(), GqlQueries.datasource_params(1, None), validate=False)
+
+    assert res == {"datasource": [{"id": 1, "name": "ds"}]}
+    assert len(stats_callback) == 1
+    stats = stats_callback[0]
+    assert stats.operation == "datasource"
+    assert stats.response_bytes == len(body)
+    assert stats.request_bytes > 0
+    assert stats.time_to_headers is not None
+    assert stats.download_time is not None
+    assert stats.json_decode_time is not None
+    assert stats.total_time >= stats.json_decode_time
+    assert stats.retries == 0
+
+
+def test_query_result_has_stats(data_client, stats_callback, ds, mocker):
+    page = {
+        "edges": [{"node": {"id": 1, "path": "a.txt", "metadata": []}}],
+        "pageInfo": {"hasNextPage": False, "endCursor": None},
+        "queryDataTime": 1700000000,
+        "selectFields": [],
+    }
+    mocker.patch.object(data_client, "_datasource_query", return_value=page)
+
+    res = data_client.head(ds)
+
+    assert len(res) == 1
+    assert res.stats.pages == 1
+    assert res.stats.requests[0].operation == "datasourceQuery"
+    assert res.stats.requests[0].parse_time is not None
+    assert stats_callback == res.stats.requests
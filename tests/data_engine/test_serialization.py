@@ -0,0 +1,70 @@
+import pytest
+
+from dagshub.data_engine.client.serialization import (
+    serialize_metadata_update_entries,
+    serialize_delete_metadata_entries,
+    serialize_delete_entries,
+)
+from dagshub.data_engine.dtypes import MetadataFieldType
+from dagshub.data_engine.model.datasource import (
+    DatapointMetadataUpdateEntry,
+    DatapointDeleteMetadataEntry,
+    DatapointDeleteEntry,
+)
+from dagshub.data_engine.model.metadata.buffer import MetadataUpdateBuffer
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [
+        DatapointMetadataUpdateEntry("a.txt", "field", "1", MetadataFieldType.INTEGER),
+        DatapointMetadataUpdateEntry("a.txt", "field", "aaa", MetadataFieldType.STRING, allowMultiple=True),
+        DatapointMetadataUpdateEntry("a.txt", "field", "1700000000000", MetadataFieldType.DATETIME, timeZone="+02:00"),
+    ],
+)
+def test_metadata_update_serialization(entry):
+    assert serialize_metadata_update_entries([entry]) == [entry.to_dict()]
+
+
+def test_serialized_entries_are_passed_through():
+    entry = DatapointMetadataUpdateEntry("a.txt", "field", "1", MetadataFieldType.INTEGER)
+    serialized = entry.to_dict()
+    assert serialize_metadata_update_entries([serialized, entry]) == [serialized, serialized]
+
+
+def test_delete_entries_serialization():
+    delete_metadata = DatapointDeleteMetadataEntry(datapointId="1", key="field")
+    delete_datapoint = DatapointDeleteEntry(datapointId="1")
+    assert serialize_delete_metadata_entries([delete_metadata]) == [delete_metadata.to_dict()]
+    assert serialize_delete_entries([delete_datapoint]) == [delete_datapoint.to_dict()]
+
+
+def test_buffer_payload_matches_entries():
+    buffer = MetadataUpdateBuffer()
+    buffer.add("a.txt", "int", 1, MetadataFieldType.INTEGER)
+    buffer.add("a.txt", "float", 0.5, MetadataFieldType.FLOAT)
+    buffer.add("b.txt", "bool", True, MetadataFieldType.BOOLEAN)
+    buffer.add("b.txt", "date", 1700000000000, MetadataFieldType.DATETIME, "-05:00")
+    buffer.add("b.txt", "long_string", "a" * 1000, MetadataFieldType.STRING)
+    buffer.mark_multivalue("int")
+    buffer.convert_strings_to_documents("long_string")
+
+    payload = [d for batch in buffer.iter_payload_batches(2) for d in batch]
+    assert payload == [e.to_dict() for e in buffer.get_entries()]
+
+
+def test_cleared_buffer_starts_over():
+    buffer = MetadataUpdateBuffer(multivalue_fields={"existing_multivalue"})
+    buffer.add("a.txt", "old_key", 1, MetadataFieldType.INTEGER)
+    buffer.add("a.txt", "promoted", 1, MetadataFieldType.INTEGER)
+    buffer.mark_multivalue("promoted")
+
+    buffer.clear()
+    buffer.add("b.txt", "promoted", 2, MetadataFieldType.INTEGER)
+    buffer.add("b.txt", "existing_multivalue", 3, MetadataFieldType.INTEGER)
+
+    assert buffer._keys == ["promoted", "existing_multivalue"]
+    assert [(e.key, e.allowMultiple) for e in buffer.get_entries()] == [
+        ("promoted", False),
+        ("existing_multivalue", True),
+    ]
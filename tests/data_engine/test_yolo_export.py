@@ -0,0 +1,160 @@
+import os
+
+import pytest
+from dagshub_annotation_converter.formats.label_studio.task import LabelStudioTask
+from dagshub_annotation_converter.ir.image import CoordinateStyle, IRBBoxImageAnnotation
+
+from dagshub.data_engine.annotation import MetadataAnnotations
+from dagshub.data_engine.client.models import DatasourceType
+from dagshub.data_engine.model import yolo_export
+from dagshub.data_engine.model.query_result import QueryResult
+
+
+def _ls_task(path: str, category: str, left: float = 0.1) -> bytes:
+    task = LabelStudioTask(user_id=1)
+    task.data["image"] = path
+    task.add_ir_annotations(
+        [
+            IRBBoxImageAnnotation(
+                filename=path,
+                categories={category: 1.0},
+                coordinate_style=CoordinateStyle.NORMALIZED,
+                top=0.1,
+                left=left,
+                width=0.2,
+                height=0.2,
+                image_width=640,
+                image_height=480,
+            )
+        ]
+    )
+    return task.model_dump_json().encode()
+
+
+def set_annotation(dp, category: str, left: float = 0.1):
+    dp.metadata["annotation"] = MetadataAnnotations.from_ls_task(dp, "annotation", _ls_task(dp.path, category, left))
+
+
+@pytest.fixture
+def yolo_result(query_result, tmp_path, monkeypatch, mocker):
+    query_result.datasource.source.source_type = DatasourceType.REPOSITORY
+    for i, dp in enumerate(query_result):
+        dp.path = f"images/train/dp_{i}.jpg"
+        set_annotation(dp, "cat")
+
+    cache = tmp_path / "cache"
+
+    def download_files(self, target_dir=None, *args, **kwargs):
+        assert target_dir is None
+        for dp in self:
+            path = cache / self.datasource.source.source_prefix / dp.path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            if not path.exists():
+                path.write_bytes(dp.path.encode())
+        return cache
+
+    mocker.patch.object(QueryResult, "download_files", download_files)
+    monkeypatch.chdir(tmp_path)
+    return query_result
+
+
+def label_path(i: int):
+    return os.path.join("dagshub_export", "data", "data", "labels", "train", f"dp_{i}.txt")
+
+
+def image_path(i: int):
+    return os.path.join("dagshub_export", "data", "data", "images", "train", f"dp_{i}.jpg")
+
+
+def test_export_links_images_from_cache(yolo_result, tmp_path):
+    yaml_path = yolo_result.export_as_yolo(annotation_field="annotation")
+
+    assert yaml_path == tmp_path / "yolo_dagshub.yaml"
+    assert "train: data/images/train" in yaml_path.read_text()
+    for i in range(5):
+        assert os.path.samefile(image_path(i), tmp_path / "cache" / "data" / "images" / "train" / f"dp_{i}.jpg")
+        assert open(label_path(i)).read().startswith("0 ")
+
+
+def test_export_finds_split_folders(yolo_result):
+    for i, dp in enumerate(yolo_result):
+        dp.path = f"images/{['train', 'val', 'test'][i % 3]}/dp_{i}.jpg"
+        set_annotation(dp, "cat")
+
+    yaml_text = yolo_result.export_as_yolo(annotation_field="annotation").read_text()
+
+    assert "train: data/images/train" in yaml_text
+    assert "val: data/images/val" in yaml_text
+    assert "test: data/images/test" in yaml_text
+
+
+def test_reexport_only_writes_changed_labels(yolo_result, mocker):
+    yolo_result.export_as_yolo(annotation_field="annotation")
+    set_annotation(yolo_result[2], "cat", left=0.5)
+
+    write = mocker.spy(yolo_export, "annotations_to_string")
+    yolo_result.export_as_yolo(annotation_field="annotation")
+
+    assert [call.args[0][0].filename for call in write.call_args_list] == ["images/train/dp_2.jpg"]
+    assert open(label_path(2)).read().startswith("0 0.6")
+
+
+def test_new_category_rewrites_all_labels(yolo_result, mocker):
+    yolo_result.export_as_yolo(annotation_field="annotation")
+    # The new category comes first, so the ids of all categories change
+    set_annotation(yolo_result[0], "another_cat")
+
+    write = mocker.spy(yolo_export, "annotations_to_string")
+    yolo_result.export_as_yolo(annotation_field="annotation")
+
+    assert write.call_count == 5
+
+
+def test_reexport_removes_stale_files(yolo_result):
+    yolo_result.export_as_yolo(annotation_field="annotation")
+
+    yolo_result[:3].export_as_yolo(annotation_field="annotation")
+
+    assert [os.path.exists(label_path(i)) for i in range(5)] == [True, True, True, False, False]
+    assert [os.path.exists(image_path(i)) for i in range(5)] == [True, True, True, False, False]
+
+
+@pytest.mark.parametrize("mode", ["symlink", "copy"])
+def test_link_file_modes(tmp_path, mode):
+    src = tmp_path / "src.jpg"
+    src.write_bytes(b"image")
+    dst = tmp_path / "export" / "dst.jpg"
+
+    assert yolo_export.link_file(src, dst, mode) == mode
+    assert dst.read_bytes() == b"image"
+    assert dst.is_symlink() == (mode == "symlink")
+    # Already linked - nothing to do
+    assert yolo_export._is_linked(src, dst, mode)
+
+
+def test_hardlink_falls_back_to_copy(tmp_path, mocker):
+    mocker.patch("os.link", side_effect=OSError("Invalid cross-device link"))
+    src = tmp_path / "src.jpg"
+    src.write_bytes(b"image")
+
+    assert yolo_export.link_file(src, tmp_path / "dst.jpg", "hardlink") == "copy"
+    assert (tmp_path / "dst.jpg").read_bytes() == b"image"
+
+
+def test_reexport_from_another_working_directory(yolo_result, tmp_path, monkeypatch, mocker):
+    yolo_result.export_as_yolo(annotation_field="annotation")
+    other_cwd = tmp_path / "other"
+    other_cwd.mkdir()
+    # A file at the same relative path from the other working directory must not be touched
+    decoy = other_cwd / label_path(4)
+    decoy.parent.mkdir(parents=True)
+    decoy.write_text("not part of the export")
+    monkeypatch.chdir(other_cwd)
+
+    write = mocker.spy(yolo_export, "annotations_to_string")
+    yolo_result[:3].export_as_yolo(download_dir=tmp_path / "dagshub_export", annotation_field="annotation")
+
+    assert write.call_count == 0
+    assert decoy.read_text() == "not part of the export"
+    assert [(tmp_path / label_path(i)).exists() for i in range(5)] == [True, True, True, False, False]
+    assert [(tmp_path / image_path(i)).exists() for i in range(5)] == [True, True, True, False, False]
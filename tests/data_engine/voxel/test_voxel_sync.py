@@ -0,0 +1,51 @@
+from pathlib import Path
+
+from dagshub.data_engine.annotation import MetadataAnnotations
+from dagshub.data_engine.annotation.voxel_conversion import plan_sync, sample_digest
+
+
+def digest(dp, fields=("annotation",)):
+    return sample_digest(dp, Path("/data") / dp.path, "add_ls_annotations", list(fields))
+
+
+def test_sample_digest_changes_with_metadata(some_datapoint):
+    before = digest(some_datapoint)
+    assert digest(some_datapoint) == before
+
+    some_datapoint.metadata["col0"] = 100
+    assert digest(some_datapoint) != before
+
+
+def test_sample_digest_changes_with_annotations(some_datapoint):
+    task = b'{"annotations": [{"result": []}], "data": {"image": "dp_0"}}'
+    some_datapoint.metadata["annotation"] = MetadataAnnotations(
+        datapoint=some_datapoint, field="annotation", original_value=task
+    )
+    before = digest(some_datapoint)
+
+    some_datapoint.metadata["annotation"] = MetadataAnnotations(
+        datapoint=some_datapoint, field="annotation", original_value=task.replace(b"dp_0", b"dp_1")
+    )
+    assert digest(some_datapoint) != before
+    # Loading the labels from other fields also creates a different sample
+    assert digest(some_datapoint, fields=()) != digest(some_datapoint)
+
+
+def test_plan_sync():
+    existing = [
+        ("unchanged", 1, "a"),
+        ("changed", 2, "b"),
+        ("removed", 3, "c"),
+        ("duplicate", 1, "a"),
+        ("not_from_datapoint", None, None),
+        ("no_digest", 5, None),
+        ("changed_duplicate", 2, "new"),
+    ]
+    digests = {1: "a", 2: "new", 4: "d", 5: "e"}
+
+    to_delete, to_update, to_create = plan_sync(existing, digests)
+
+    assert to_delete == ["removed", "duplicate", "changed_duplicate"]
+    # Changed samples are updated in place, so the tags and labels added in FiftyOne are kept
+    assert to_update == {2: "changed", 5: "no_digest"}
+    assert to_create == {4}